@@ -0,0 +1,262 @@
+"""Measures the construction, parsing, conversion, help and suggestions of runrun.
+
+python -m benchmarks.run --output results.json
+python -m benchmarks.run --baseline results.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import timeit
+from typing import Callable, Optional
+
+from runrun.command_parser import CommandParser
+from runrun.completion import complete_at
+from runrun.converters import registry
+from runrun.exceptions import DefaultExceptionHandler, UnknownArgumentException
+
+from benchmarks.tree import (
+    ARGUMENT_KINDS,
+    leaf_path,
+    make_argparse_parser,
+    make_click_group,
+    make_tree,
+    typical_argv,
+    worst_case_argv,
+)
+
+# completion runs on every Tab press, these are upper limits in seconds
+LATENCY_TARGETS = {
+    "complete_sub_command": 0.002,
+    "complete_option": 0.002,
+    "complete_enum_value": 0.002,
+    "complete_path": 0.002,
+}
+
+# tree of the completion benchmarks, 8 + 64 + 512 sub commands
+COMPLETION_TREE = {"depth": 3, "fan_out": 8, "arguments": 20}
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """Best time of a single call, in seconds"""
+
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def quiet(fn: Callable[[], object]) -> Callable[[], None]:
+    """Call fn without letting it print to the terminal"""
+
+    def call():
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+
+    return call
+
+
+def get_benchmarks(
+    depth: int, fan_out: int, arguments: int
+) -> dict[str, Callable[[], object]]:
+    root_class = make_tree(depth, fan_out, arguments)
+    lazy_root_class = make_tree(depth, fan_out, arguments, lazy=True)
+
+    typical = typical_argv(depth, arguments)
+    worst = worst_case_argv(depth, arguments)
+    path = leaf_path(depth)
+
+    benchmarks: dict[str, Callable[[], object]] = {
+        "construct_root": root_class,
+        "construct_root_lazy": lazy_root_class,
+        "parse_typical": lambda: CommandParser(root_class()).parse(typical),
+        "parse_worst_case": lambda: CommandParser(root_class()).parse(worst),
+        "parse_typical_lazy": lambda: CommandParser(lazy_root_class()).parse(typical),
+    }
+
+    for t, value in ARGUMENT_KINDS:
+        name = getattr(t, "__name__", str(t))
+        converter = registry.resolve(t)
+        benchmarks[f"convert_{name}"] = lambda c=converter, v=value: c(v)
+
+    long_list = ",".join(str(i) for i in range(10_000))
+    list_converter = registry.resolve(list[int])
+    benchmarks["convert_list_10000"] = lambda: list_converter(long_list)
+
+    def help(format: str) -> Callable[[], None]:
+        argv = path + ["help", "--format", format]
+        return quiet(lambda: CommandParser(root_class()).parse(argv).run())
+
+    benchmarks["help_std"] = help("std")
+    benchmarks["help_json"] = help("json")
+
+    handler = DefaultExceptionHandler()
+    leaf = CommandParser(root_class()).parse(path)
+
+    argument_exception = UnknownArgumentException(leaf, "--optoin-1")
+    benchmarks["suggest_argument"] = lambda: handler.get_argument_suggestions(
+        argument_exception
+    )
+
+    command_exception = UnknownArgumentException(root_class(), "cdm-1")
+    benchmarks["suggest_sub_command"] = lambda: handler.get_sub_command_suggestions(
+        command_exception
+    )
+    benchmarks["print_suggestions"] = quiet(
+        lambda: handler.handle_exception(argument_exception)
+    )
+
+    # typos on a lazy tree, the sub commands are not instantiated
+    lazy_argument_exception = UnknownArgumentException(lazy_root_class(), "--optoin-1")
+    lazy_command_exception = UnknownArgumentException(lazy_root_class(), "cdm-1")
+    benchmarks["print_suggestions_lazy"] = quiet(
+        lambda: (
+            handler.handle_exception(lazy_argument_exception),
+            handler.handle_exception(lazy_command_exception),
+        )
+    )
+
+    # a typo of a leaf option given to the root, matched across the levels
+    tree_exception = UnknownArgumentException(root_class(), "--optoin-1")
+    benchmarks["suggest_tree"] = lambda: handler.get_tree_suggestions(tree_exception)
+
+    # a new root each time, like a completion process would do
+    completion_class = make_tree(**COMPLETION_TREE, lazy=True)
+    completion_path = leaf_path(COMPLETION_TREE["depth"])
+
+    def complete(words: list[str]) -> Callable[[], object]:
+        return lambda: complete_at(completion_class(), words, len(words) - 1)
+
+    benchmarks["complete_sub_command"] = complete(completion_path[:-1] + ["cmd-"])
+    benchmarks["complete_option"] = complete(completion_path + ["--option-1"])
+    benchmarks["complete_enum_value"] = complete(completion_path + ["--option-5", "g"])
+    benchmarks["complete_path"] = complete(completion_path + ["--option-4", "./"])
+
+    # reference parsers, building the tree is measured on its own
+    argparse_parser = make_argparse_parser(depth, fan_out, arguments)
+    benchmarks["reference_argparse_build"] = lambda: make_argparse_parser(
+        depth, fan_out, arguments
+    )
+    benchmarks["reference_argparse_parse_typical"] = lambda: argparse_parser.parse_args(
+        typical
+    )
+    benchmarks["reference_argparse_parse_worst_case"] = (
+        lambda: argparse_parser.parse_args(worst)
+    )
+
+    click_group = make_click_group(depth, fan_out, arguments)
+    if click_group is not None:
+        benchmarks["reference_click_build"] = lambda: make_click_group(
+            depth, fan_out, arguments
+        )
+        benchmarks["reference_click_parse_typical"] = lambda: click_group.main(
+            typical, standalone_mode=False
+        )
+        benchmarks["reference_click_parse_worst_case"] = lambda: click_group.main(
+            worst, standalone_mode=False
+        )
+
+    return benchmarks
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Print the ratio to the baseline and return the regressions"""
+
+    regressions = []
+
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"  {name:<32} {seconds * 1e6:>12.2f} us  (new)")
+            continue
+
+        ratio = seconds / baseline[name]
+        flag = ""
+        if ratio > 1 + threshold and not name.startswith("reference_"):
+            regressions.append(name)
+            flag = "  REGRESSION"
+
+        print(f"  {name:<32} {seconds * 1e6:>12.2f} us  x{ratio:.2f}{flag}")
+
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fan-out", type=int, default=5)
+    parser.add_argument("--arguments", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="only run matching benchmarks")
+    parser.add_argument("--output", help="save the results to this json file")
+    parser.add_argument("--baseline", help="json results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed slowdown from the baseline, 0.25 is 25%%",
+    )
+    options = parser.parse_args(argv)
+
+    benchmarks = get_benchmarks(options.depth, options.fan_out, options.arguments)
+
+    results = {}
+    for name, fn in benchmarks.items():
+        if options.filter in name:
+            results[name] = measure(fn, options.repeat)
+
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tree": {
+            "depth": options.depth,
+            "fan_out": options.fan_out,
+            "arguments": options.arguments,
+        },
+        "results": results,
+    }
+
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent="  ")
+
+    too_slow = [
+        name
+        for name, seconds in results.items()
+        if seconds > LATENCY_TARGETS.get(name, float("inf"))
+    ]
+
+    if not options.baseline:
+        for name, seconds in results.items():
+            flag = "  TOO SLOW" if name in too_slow else ""
+            print(f"  {name:<32} {seconds * 1e6:>12.2f} us{flag}")
+        return check_targets(too_slow)
+
+    with open(options.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+
+    if baseline.get("tree") != data["tree"]:
+        print("The baseline was measured on a different tree", file=sys.stderr)
+        return 2
+
+    regressions = compare(results, baseline["results"], options.threshold)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+
+    return check_targets(too_slow)
+
+
+def check_targets(too_slow: list[str]) -> int:
+    if too_slow:
+        print(f"{len(too_slow)} over the latency target: {', '.join(too_slow)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
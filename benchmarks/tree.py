@@ -0,0 +1,161 @@
+import argparse
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+from runrun import Command, LazyCommand
+from runrun.models import Argument, BaseCommand
+
+
+class Color(Enum):
+    RED = 0
+    GREEN = 1
+    BLUE = 2
+
+
+class Point:
+    def __init__(self, x: float, y: float):
+        self.x = x
+        self.y = y
+
+
+# (type, value given on the command line), arguments cycle through them
+ARGUMENT_KINDS: list[tuple[Any, str]] = [
+    (str, "text"),
+    (int, "42"),
+    (float, "4.2"),
+    (bool, "true"),
+    (Path, "./a/b"),
+    (Color, "green"),
+    (list[int], "1,2,3,4"),
+    (dict[str, int], "a=1,b=2"),
+    (Point, "x=1,y=2"),
+]
+
+
+def option_name(i: int) -> str:
+    return f"option-{i}"
+
+
+def make_tree(
+    depth: int, fan_out: int, arguments: int, lazy: bool = False
+) -> type[BaseCommand]:
+    """Generates the class of a root command with a synthetic tree.
+
+    Every command has the given number of arguments and, until the depth is
+    reached, fan_out sub commands named cmd-0, cmd-1, ... They are instantiated
+    by the constructor of their parent, or declared as LazyCommand when lazy.
+    """
+
+    return _make_command_class("root", depth, fan_out, arguments, lazy)
+
+
+def _make_command_class(
+    name: str, depth: int, fan_out: int, arguments: int, lazy: bool
+) -> type[BaseCommand]:
+    namespace: dict[str, Any] = {}
+
+    for i in range(arguments):
+        t, _ = ARGUMENT_KINDS[i % len(ARGUMENT_KINDS)]
+        namespace[f"option_{i}"] = Argument(
+            t,
+            option_name(i),
+            description=f"Option number {i} of {name}",
+            short=f"o{i}",
+            required=False,
+        )
+
+    # eager sub commands, created by the constructor of their parent so the
+    # construction of the root builds the whole tree
+    children: list[tuple[str, type[BaseCommand]]] = []
+
+    if depth > 0:
+        for i in range(fan_out):
+            child = _make_command_class(f"cmd-{i}", depth - 1, fan_out, arguments, lazy)
+            if lazy:
+                namespace[f"cmd_{i}"] = LazyCommand(child, name=f"cmd-{i}")
+            else:
+                children.append((f"cmd_{i}", child))
+
+    def __init__(self):
+        Command.__init__(self, name=name, description=f"The {name} command")
+
+        for attribute, child in children:
+            setattr(self, attribute, child())
+
+    def run(self):
+        pass
+
+    namespace["__init__"] = __init__
+    namespace["run"] = run
+
+    return type(f"{name.title()}Command", (Command,), namespace)
+
+
+def leaf_path(depth: int) -> list[str]:
+    """Command names leading to the first leaf"""
+    return ["cmd-0"] * depth
+
+
+def typical_argv(depth: int, arguments: int) -> list[str]:
+    """Path to a leaf with a couple of arguments"""
+    argv = leaf_path(depth)
+    for i in range(min(arguments, 3)):
+        argv += ["--" + option_name(i), ARGUMENT_KINDS[i % len(ARGUMENT_KINDS)][1]]
+    return argv
+
+
+def worst_case_argv(depth: int, arguments: int) -> list[str]:
+    """Path to a leaf with every argument given, the last ones by their short"""
+    argv = leaf_path(depth)
+    for i in range(arguments):
+        flag = "--" + option_name(i) if i % 2 == 0 else f"-o{i}"
+        argv += [flag, ARGUMENT_KINDS[i % len(ARGUMENT_KINDS)][1]]
+    return argv
+
+
+def make_argparse_parser(
+    depth: int, fan_out: int, arguments: int
+) -> argparse.ArgumentParser:
+    """Equivalent tree built with argparse, every value stays a string"""
+
+    parser = argparse.ArgumentParser(prog="root")
+    _add_argparse_level(parser, depth, fan_out, arguments)
+    return parser
+
+
+def _add_argparse_level(
+    parser: argparse.ArgumentParser, depth: int, fan_out: int, arguments: int
+) -> None:
+    for i in range(arguments):
+        parser.add_argument("--" + option_name(i), f"-o{i}")
+
+    if depth > 0:
+        sub_parsers = parser.add_subparsers()
+        for i in range(fan_out):
+            child = sub_parsers.add_parser(f"cmd-{i}")
+            _add_argparse_level(child, depth - 1, fan_out, arguments)
+
+
+def make_click_group(depth: int, fan_out: int, arguments: int):
+    """Equivalent tree built with click, None if it is not installed"""
+
+    try:
+        import click
+    except ImportError:
+        return None
+
+    def make(name: str, depth: int):
+        params = [
+            click.Option(["--" + option_name(i), f"-o{i}"]) for i in range(arguments)
+        ]
+
+        if depth == 0:
+            return click.Command(name, params=params, callback=lambda **_: None)
+
+        group = click.Group(name, params=params, callback=lambda **_: None)
+        for i in range(fan_out):
+            group.add_command(make(f"cmd-{i}", depth - 1))
+        return group
+
+    return make("root", depth)
@@ -1,12 +1,24 @@
-from runrun.models import BaseCommand, BaseApplication, Argument
-from runrun.builtin_command import HelpCommand, VersionCommand, InfoCommand
+from runrun.models import BaseCommand, BaseApplication, Argument, LazyCommand
+from runrun.streams import Stream
+from runrun.builtin_command import (
+    HelpCommand,
+    VersionCommand,
+    InfoCommand,
+    ShellCommand,
+)
 
 
 class Command(BaseCommand):
-    help = HelpCommand()
+    help = LazyCommand(HelpCommand, name="help")
 
 
 class Application(BaseApplication):
-    help = HelpCommand()
-    version = VersionCommand()
-    info = InfoCommand()
+    help = LazyCommand(HelpCommand, name="help")
+    version = LazyCommand(VersionCommand, name="version")
+    info = LazyCommand(InfoCommand, name="info")
+
+
+class ShellMixin:
+    """Adds the interactive shell to an application, class App(ShellMixin, Application)"""
+
+    shell = LazyCommand(ShellCommand, name="shell")
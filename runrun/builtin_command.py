@@ -1,16 +1,12 @@
 from typing import Union, Optional, Type
-import os
 from enum import Enum
-from importlib.metadata import version
-import importlib.metadata
-from pathlib import Path
-import json
-import textwrap
+import functools
+import _thread  # the lock of threading, without importing threading
+import os
 import sys
 
-from colorama import Fore, Style, Back
-
-from runrun.models import BaseCommand, Argument, BaseApplication
+from runrun.style import Fore, Style, Back
+from runrun.models import BaseCommand, Argument, BaseApplication, LazyCommand
 
 
 class HelpFormat(Enum):
@@ -18,8 +14,46 @@ class HelpFormat(Enum):
     JSON = 1
 
 
+# number of rendered helps kept by HelpCommand
+RENDERED_CACHE_SIZE = 128
+
+
+def get_terminal_width() -> int:
+    """Columns of the terminal, from $COLUMNS first, 80 when not in a terminal"""
+
+    try:
+        return int(os.environ["COLUMNS"])
+    except (KeyError, ValueError):
+        pass
+
+    try:
+        return os.get_terminal_size(sys.__stdout__.fileno()).columns
+    except (AttributeError, ValueError, OSError):
+        return 80
+
+
+# the descriptions wrap at this width at least, even on narrow terminals
+MIN_LAST_COLUMN_WIDTH = 20
+
+
+@functools.lru_cache(maxsize=4096)
+def wrap_text(text: str, width: int) -> tuple[str, ...]:
+    """textwrap.wrap, kept for the texts shown again, like the help of help"""
+    import textwrap
+
+    return tuple(textwrap.wrap(text, width=width))
+
+
 class HelpCommand(BaseCommand):
 
+    # widest the columns of the arguments and of the commands can get
+    argument_widths = [16, 29, 12, 60]
+    command_widths = [16, 42, 60]
+
+    # rendered helps by get_render_key, shared by the threads of run_parallel
+    _rendered: dict[tuple, str] = {}
+    _rendered_lock = _thread.allocate_lock()
+
     format = Argument(
         HelpFormat,
         "format",
@@ -45,6 +79,9 @@ class HelpCommand(BaseCommand):
         default_value=False,
     )
 
+    # help of help can create a recursive loop, stop at the second level
+    help = LazyCommand(lambda: HelpCommand(help_of_help=False), name="help")
+
     def __init__(self, help_of_help=True):
         super().__init__(
             name="help",
@@ -52,13 +89,17 @@ class HelpCommand(BaseCommand):
             description="Show help about this command",
         )
 
-        # help of help can create a recursive loop
-        if help_of_help:
-            self.help = HelpCommand(help_of_help=False)
-        else:
+        if not help_of_help:
             self.help = None
 
     def print_json(self):
+        import json
+        from runrun.schema_cache import (
+            describe_argument,
+            describe_command,
+            describe_application,
+        )
+
         data = {}
 
         parent_command = self.context.parent_command
@@ -67,55 +108,16 @@ class HelpCommand(BaseCommand):
         arguments = self.get_parent_arguments()
         sub_commands = self.get_parent_sub_commands()
 
-        data["command"] = (
-            {
-                "name": parent_command.command_name,
-                "display_name": parent_command.command_display_name,
-                "description": parent_command.command_description,
-                "aliases": parent_command.command_aliases,
-            }
-            if parent_command
-            else None
-        )
+        data["command"] = describe_command(parent_command) if parent_command else None
 
-        data["arguments"] = [
-            {
-                "name": arg.name,
-                "display_name": arg.display_name,
-                "description": arg.description,
-                "position": arg.position,
-                "required": arg.required,
-                "short": arg.short,
-                "type": arg.type.__name__,
-                "aliases": arg.aliases,
-            }
-            for arg in arguments
-        ]
+        data["arguments"] = [describe_argument(arg) for arg in arguments]
 
-        data["sub_commands"] = [
-            {
-                "name": cmd.command_name,
-                "display_name": cmd.command_display_name,
-                "description": cmd.command_description,
-                "aliases": cmd.command_aliases,
-            }
-            for cmd in sub_commands
-        ]
+        data["sub_commands"] = [describe_command(cmd) for cmd in sub_commands]
 
         data["usage"] = self.get_usage()
 
         data["application"] = (
-            {
-                "name": root_command.command_name,
-                "display_name": root_command.command_display_name,
-                "description": root_command.command_description,
-                "version": root_command.application_version,
-                "author": root_command.application_author,
-                "website": root_command.application_website,
-                "copyright": root_command.application_copyright,
-            }
-            if isinstance(root_command, BaseApplication)
-            else None
+            describe_application(root_command) if root_command else None
         )
 
         print(json.dumps(data, indent="  "))
@@ -140,7 +142,7 @@ class HelpCommand(BaseCommand):
         text = self.get_full_command_name(parent_command)
 
         # checking bigger than 1 to filter out the included help
-        if len(parent_command.get_sub_commands()) > 1:
+        if len(parent_command.get_sub_command_slots()) > 1:
             text += " [command]"
 
         positional_arguments = filter(lambda arg: arg.position is not None, arguments)
@@ -160,9 +162,43 @@ class HelpCommand(BaseCommand):
         return text
 
     def print_usage(self):
-        print(f"  {self.get_usage()}")
+        sys.stdout.write(self.render_usage())
+
+    def render_usage(self) -> str:
+        return f"  {self.get_usage()}\n"
 
     def print_argument(self, argument: Argument):
+        sys.stdout.write(self.render_argument(argument))
+
+    def render_argument(
+        self, argument: Argument, widths: Optional[list[int]] = None
+    ) -> str:
+        columns = self.get_argument_columns(argument)
+
+        if widths is None:
+            widths = self.get_column_widths(
+                [columns], self.argument_widths, 8, get_terminal_width()
+            )
+
+        text = self.columned_text(columns, widths)
+
+        # just in case there is not text returned
+        if len(text) == 0:
+            return ""
+
+        # the first line gets a slightly different style
+        lines = [
+            f"  {Style.BRIGHT}{text[0][0]}{Style.RESET_ALL}  {text[0][1]} {text[0][2]} | {text[0][3]}\n"
+        ]
+
+        for line in text[1:]:
+            lines.append(
+                f"  {Style.BRIGHT}{line[0]}  {Style.DIM}{line[1]}{Style.RESET_ALL} {line[2]}   {line[3]}\n"
+            )
+
+        return "".join(lines)
+
+    def get_argument_columns(self, argument: Argument) -> list[str]:
         aliases = ["--" + alias for alias in argument.aliases]
 
         if argument.short:
@@ -175,61 +211,83 @@ class HelpCommand(BaseCommand):
         if argument.type == bool:
             # boolean value are optional (using square brackets)
             argument_type_text = "[true|false]"
-        elif issubclass(argument.type, Enum):
+        elif isinstance(argument.type, type) and issubclass(argument.type, Enum):
             # if enum, write the options
             argument_type_text = "{" + ", ".join(argument.type.__members__) + "}"
         else:
             argument_type_text = "<" + argument.type.__name__ + ">"
 
-        columns = [
+        return [
             f"{argument.display_name}",
             f"--{argument.name} {argument_type_text}\n{aliases_text}",
             f'{"Required" if argument.required else ""}',
             f"{argument.description}",
         ]
-        widths = [16, 29, 12, 60]  # TODO: this should be at the class level
+
+    def print_command(self, cmd: BaseCommand):
+        sys.stdout.write(self.render_command(cmd))
+
+    def render_command(
+        self, cmd: BaseCommand, widths: Optional[list[int]] = None
+    ) -> str:
+        columns = self.get_command_columns(cmd)
+
+        if widths is None:
+            widths = self.get_column_widths(
+                [columns], self.command_widths, 7, get_terminal_width()
+            )
 
         text = self.columned_text(columns, widths)
 
         # just in case there is not text returned
         if len(text) == 0:
-            return
+            return ""
 
         # the first line gets a slightly different style
-        print(
-            f"  {Style.BRIGHT}{text[0][0]}{Style.RESET_ALL}  {text[0][1]} {text[0][2]} | {text[0][3]}"
-        )
+        lines = [
+            f"  {Style.BRIGHT}{text[0][0]}{Style.RESET_ALL}  {text[0][1]} | {text[0][2]}\n"
+        ]
 
         for line in text[1:]:
-            print(
-                f"  {Style.BRIGHT}{line[0]}  {Style.DIM}{line[1]}{Style.RESET_ALL}   {line[2]}"
+            lines.append(
+                f"  {Style.BRIGHT}{line[0]}  {Style.DIM}{line[1]}{Style.RESET_ALL}   {line[2]}\n"
             )
 
-    def print_command(self, cmd: BaseCommand):
+        return "".join(lines)
+
+    def get_command_columns(self, cmd: BaseCommand) -> list[str]:
         aliases_text = ", ".join(cmd.command_aliases)
 
-        columns = [
+        return [
             f"{cmd.command_display_name}",
             f"{cmd.command_name}\n{aliases_text}",
             f"{cmd.command_description}",
         ]
-        widths = [16, 42, 60]  # TODO: this should be at the class level
 
-        text = self.columned_text(columns, widths)
+    def get_column_widths(
+        self,
+        rows: list[list[str]],
+        max_widths: list[int],
+        margin: int,
+        terminal_width: int,
+    ) -> list[int]:
+        """Fit the columns to their content, up to their maximum width.
+
+        The last column wraps in what is left of the terminal, the margin is
+        the space taken by the indentation and the separators.
+        """
+        widths = []
+
+        for i, max_width in enumerate(max_widths):
+            longest = max(
+                (len(line) for row in rows for line in row[i].split("\n")), default=0
+            )
+            widths.append(max(1, min(longest, max_width)))
 
-        # just in case there is not text returned
-        if len(text) == 0:
-            return
+        space = terminal_width - margin - sum(widths[:-1])
+        widths[-1] = min(widths[-1], max(space, MIN_LAST_COLUMN_WIDTH))
 
-        # the first line gets a slightly different style
-        print(
-            f"  {Style.BRIGHT}{text[0][0]}{Style.RESET_ALL}  {text[0][1]} | {text[0][2]}"
-        )
-
-        for line in text[1:]:
-            print(
-                f"  {Style.BRIGHT}{line[0]}  {Style.DIM}{line[1]}{Style.RESET_ALL}   {line[2]}"
-            )
+        return widths
 
     def columned_text(
         self, columns: list[str], widths: list[int] = [40, 40]
@@ -244,8 +302,7 @@ class HelpCommand(BaseCommand):
             col_lines = col.split("\n")
             wrapped_col_lines = []
             for line in col_lines:
-                wrapped_lines = textwrap.wrap(line, width=widths[i])
-                wrapped_col_lines.extend(wrapped_lines)
+                wrapped_col_lines.extend(wrap_text(line, widths[i]))
 
             lines.append(wrapped_col_lines)
 
@@ -266,17 +323,21 @@ class HelpCommand(BaseCommand):
         return final_lines
 
     def print_header(self, text: str):
-        print()
-        print(f"{Back.WHITE}{Style.BRIGHT} {text.upper()} {Style.RESET_ALL}")
+        sys.stdout.write(self.render_header(text))
+
+    def render_header(self, text: str) -> str:
+        return f"\n{Back.WHITE}{Style.BRIGHT} {text.upper()} {Style.RESET_ALL}\n"
 
     def print_parent_description(self):
+        sys.stdout.write(self.render_parent_description())
+
+    def render_parent_description(self) -> str:
         parent_command = self.context.parent_command
 
         if parent_command is None:
-            return
+            return ""
 
-        print()
-        print(f"  {parent_command.command_description}")
+        return f"\n  {parent_command.command_description}\n"
 
     def get_parent_arguments(self) -> list[Argument]:
         if self.context.parent_command is None:
@@ -310,28 +371,113 @@ class HelpCommand(BaseCommand):
         return sub_commands
 
     def print_std(self):
+        # written at once, a big help is slow to print line by line
+        sys.stdout.write(self.render_std())
+        sys.stdout.flush()
 
-        self.print_parent_description()
-
-        self.print_header("Usage")
-        self.print_usage()
-
+    def render_std(self) -> str:
         arguments = self.get_parent_arguments()
         commands = self.get_parent_sub_commands()
 
+        # read once, the columns of every row are fitted to it
+        terminal_width = get_terminal_width()
+
+        key = self.get_render_key(arguments, commands, terminal_width)
+
+        with HelpCommand._rendered_lock:
+            text = HelpCommand._rendered.get(key)
+
+        if text is None:
+            text = self.render_std_text(arguments, commands, terminal_width)
+
+            with HelpCommand._rendered_lock:
+                # forget the oldest help when full
+                rendered = HelpCommand._rendered
+                if key not in rendered and len(rendered) >= RENDERED_CACHE_SIZE:
+                    del rendered[next(iter(rendered))]
+                rendered[key] = text
+
+        return text
+
+    def render_std_text(
+        self,
+        arguments: list[Argument],
+        commands: list[BaseCommand],
+        terminal_width: int,
+    ) -> str:
+        argument_rows = [self.get_argument_columns(arg) for arg in arguments]
+        argument_widths = self.get_column_widths(
+            argument_rows, self.argument_widths, 8, terminal_width
+        )
+
+        command_rows = [self.get_command_columns(cmd) for cmd in commands]
+        command_widths = self.get_column_widths(
+            command_rows, self.command_widths, 7, terminal_width
+        )
+
+        parts = [
+            self.render_parent_description(),
+            self.render_header("Usage"),
+            self.render_usage(),
+        ]
+
         if len(arguments) > 0:
-            self.print_header("Arguments")
+            parts.append(self.render_header("Arguments"))
 
         for arg in arguments:
-            self.print_argument(arg)
+            parts.append(self.render_argument(arg, argument_widths))
 
         if len(commands) > 0:
-            self.print_header("Commands")
+            parts.append(self.render_header("Commands"))
 
         for cmd in commands:
-            self.print_command(cmd)
+            parts.append(self.render_command(cmd, command_widths))
 
-        print()
+        parts.append("\n")
+
+        return "".join(parts)
+
+    def get_render_key(
+        self,
+        arguments: list[Argument],
+        commands: list[BaseCommand],
+        terminal_width: int,
+    ) -> tuple:
+        """Everything the rendered help depends on.
+
+        The commands are described by what is shown of them rather than by
+        their identity, so bound copies of a command share their help.
+        """
+        parent_command = self.context.parent_command
+
+        return (
+            terminal_width,
+            self.filter.value,
+            self.required_only.value,
+            self.get_usage(),
+            parent_command.command_description if parent_command else None,
+            tuple(
+                (
+                    arg.name,
+                    arg.display_name,
+                    arg.description,
+                    arg.type,
+                    arg.short,
+                    tuple(arg.aliases),
+                    arg.required,
+                )
+                for arg in arguments
+            ),
+            tuple(
+                (
+                    cmd.command_name,
+                    cmd.command_display_name,
+                    cmd.command_description,
+                    tuple(cmd.command_aliases),
+                )
+                for cmd in commands
+            ),
+        )
 
     def run(self):
         if self.format.value == HelpFormat.JSON:
@@ -396,3 +542,133 @@ class VersionCommand(BaseCommand):
 
         version = self.context.parent_command.application_version
         print(version)
+
+
+class ShellCommand(BaseCommand):
+
+    # lines ending the shell
+    exit_words = ("exit", "quit")
+
+    def __init__(self, history_file: Optional[str] = None):
+        super().__init__(
+            name="shell",
+            display_name="Shell",
+            description="Start an interactive shell running the commands",
+        )
+
+        # history kept between sessions, only in memory if not given
+        self.history_file = (
+            os.path.expanduser(history_file) if history_file is not None else None
+        )
+
+    def run(self):
+        from runrun.runner import Runner
+
+        parent_command = self.context.parent_command
+        if parent_command is None:
+            print("Could not start the shell, there is no parent command")
+            return
+
+        readline = self.setup_readline(parent_command)
+        prompt = self.get_prompt(parent_command)
+
+        # the settings of the runner that started the shell are kept
+        outer_runner = self.context.runner
+        if outer_runner is None:
+            outer_runner = Runner(parent_command)
+
+        # the values of a line are never written in the tree, see Runner.run_isolated
+        with outer_runner.with_command(parent_command, keep_loop=True) as runner:
+            while True:
+                try:
+                    line = input(prompt)
+                except EOFError:
+                    print()
+                    break
+                except KeyboardInterrupt:
+                    print()
+                    continue
+
+                if not self.run_line(runner, line):
+                    break
+
+        if readline is not None and self.history_file is not None:
+            try:
+                readline.write_history_file(self.history_file)
+            except OSError:
+                pass
+
+    def run_line(self, runner, line: str) -> bool:
+        """Run a line of the shell, returns False when the shell should stop"""
+
+        import shlex
+
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as e:
+            print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+            return True
+
+        if len(args) == 0:
+            return True
+
+        if len(args) == 1 and args[0] in self.exit_words:
+            return False
+
+        try:
+            runner.run_isolated(args)
+        except KeyboardInterrupt:
+            print()
+
+        return True
+
+    def get_prompt(self, parent_command: BaseCommand) -> str:
+        names = []
+        command: Optional[BaseCommand] = parent_command
+        while command is not None:
+            names.insert(0, command.command_name)
+            command = command.context.parent_command
+
+        return f"{Style.BRIGHT}{' '.join(names)}>{Style.RESET_ALL} "
+
+    def setup_readline(self, parent_command: BaseCommand):
+        """Enable the history and tab completion, if readline is available"""
+
+        try:
+            import readline
+        except ImportError:
+            return None
+
+        from runrun.completion import complete
+
+        candidates: list[str] = []
+
+        # readline asks for the candidates one by one, state is the index
+        def completer(text: str, state: int) -> Optional[str]:
+            if state == 0:
+                words = readline.get_line_buffer()[: readline.get_begidx()].split()
+                candidates[:] = complete(parent_command, words, text)
+
+            if state >= len(candidates):
+                return None
+
+            # keep going in a directory
+            candidate = candidates[state]
+            return candidate if candidate.endswith("/") else candidate + " "
+
+        readline.set_completer(completer)
+        readline.set_completer_delims(" \t\n")
+
+        # macos ships libedit instead of gnu readline
+        if "libedit" in (readline.__doc__ or ""):
+            readline.parse_and_bind("bind ^I rl_complete")
+        else:
+            readline.parse_and_bind("tab: complete")
+
+        if self.history_file is not None:
+            try:
+                readline.read_history_file(self.history_file)
+            except OSError:
+                pass
+
+        return readline
@@ -0,0 +1,47 @@
+"""Runs a command on a server started with Runner.serve
+
+python -m runrun.client SOCKET_PATH [arguments]
+"""
+
+import os
+import sys
+import socket
+
+from runrun.daemon import send_request, receive_exit_code
+
+
+def run_client(
+    socket_path: str,
+    args: list[str],
+    stdin: int = 0,
+    stdout: int = 1,
+    stderr: int = 2,
+) -> int:
+    """Send the arguments and file descriptors to the server, returns the exit code"""
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        send_request(
+            sock,
+            args,
+            os.getcwd(),
+            dict(os.environ),
+            [stdin, stdout, stderr],
+        )
+        return receive_exit_code(sock)
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("usage: python -m runrun.client SOCKET_PATH [arguments]", file=sys.stderr)
+        return 2
+
+    try:
+        return run_client(sys.argv[1], sys.argv[2:])
+    except (ConnectionError, FileNotFoundError) as e:
+        print(f"Could not reach the server: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
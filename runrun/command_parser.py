@@ -1,31 +1,61 @@
-from typing import Union, Optional, Type, Any
-import typing
+from typing import Union, Optional, Type
 from enum import Enum
-import re
-import json
-import inspect
-from pathlib import Path
 import copy
 import sys
 
-from runrun.models import BaseCommand, Argument, Context
+from runrun.models import (
+    BaseCommand,
+    Argument,
+    Context,
+    ParseResult,
+    SubCommandSlot,
+    build_argument_index,
+)
+from runrun.streams import is_stream_type
+from runrun.converters import (
+    registry,
+    is_path_type,
+    is_list_type,
+    is_numeric_list_type,
+)
 from runrun.exceptions import (
     ParserException,
     ValidationException,
     UnknownArgumentException,
     MissingArgumentException,
     InvalidValueException,
+    AmbiguousCommandException,
 )
 
 
 class CommandParser:
     def __init__(
-        self, command: BaseCommand, parent_command: Optional[BaseCommand] = None
+        self,
+        command: BaseCommand,
+        parent_command: Optional[BaseCommand] = None,
+        allow_abbreviations: bool = False,
+        response_files: bool = False,
     ) -> None:
         self.command = command
-        self._sub_commands = self.command.get_sub_commands()
+        self.parent_command = parent_command
+        self.allow_abbreviations = allow_abbreviations
+
+        # expand '@path' arguments, only done by the parser of the root command
+        self.response_files = response_files
         self._arguments = self.command.get_arguments()
 
+        self.validate_command()
+
+        self._argument_index = self.get_argument_index()
+        self._positional_index = {
+            arg.position: arg for arg in self._arguments if arg.position is not None
+        }
+
+    def set_context(self):
+        """Fill the context of the command, parse_result leaves it untouched"""
+
+        parent_command = self.parent_command
+
         # pass the context from the parent command
         if parent_command is not None:
             self.command.context.original_arguments = (
@@ -37,12 +67,33 @@ class CommandParser:
 
         # set the root command
         if self.command.context.root_command == None:
-            self.command.context.root_command = command
+            self.command.context.root_command = self.command
 
-        self.validate_command()
+    def get_argument_index(self) -> dict[str, int]:
+        """Positions of the arguments by name.
+
+        The index of the command class is built once and shared, unless the
+        instance has arguments of its own.
+        """
+
+        schema = self.command.get_schema()
+        specs = schema.argument_specs
+
+        if len(specs) == len(self._arguments) and all(
+            argument.spec is spec for argument, spec in zip(self._arguments, specs)
+        ):
+            return schema.get_argument_index()
+
+        return build_argument_index(self._arguments)
 
     def validate_command(self):
 
+        for arg in self._arguments:
+            if arg.compact and not is_numeric_list_type(arg.type):
+                raise ValidationException(
+                    f"'{arg.name}' can't be compact, only list[int] and list[float] can"
+                )
+
         # validate positions are in order and not duplicated
         counter = 0
 
@@ -61,6 +112,20 @@ class CommandParser:
                 )
 
     def walk_and_set_arguments_values(self, args: list[str]):
+        for argument, value in self.walk_arguments_values(args):
+            argument.value = value
+
+    def walk_arguments_values(self, args: list[str]) -> list[tuple[Argument, object]]:
+        """Get the arguments with their converted values, in the given order.
+
+        The values of a list argument given more than once are appended to
+        the first one.
+        """
+
+        values: list[tuple[Argument, object]] = []
+
+        # index in values of the first value of each list argument
+        lists: dict[int, int] = {}
 
         i = -1
         pos_i = 0
@@ -77,7 +142,7 @@ class CommandParser:
                 and len(args) > i + 1
                 and args[i + 1].startswith("-")
             ):
-                argument_by_name.value = True
+                values.append((argument_by_name, True))
                 continue
 
             # type is boolean at the end of the list
@@ -86,13 +151,13 @@ class CommandParser:
                 and argument_by_name.type == bool
                 and len(args) <= i + 1
             ):
-                argument_by_name.value = True
+                values.append((argument_by_name, True))
                 continue
 
             # any key value arguments
             if argument_by_name and len(args) > i + 1:
                 try:
-                    self.set_value_to_argument(argument_by_name, args[i + 1])
+                    value = self.convert_value(argument_by_name, args[i + 1])
                 except ValueError:
                     raise InvalidValueException(
                         command=self.command,
@@ -100,6 +165,17 @@ class CommandParser:
                         given_value=args[i + 1],
                     )
                 i += 1
+
+                # repeated list flags add to the first value
+                first = lists.get(id(argument_by_name))
+                if first is not None:
+                    values[first][1].extend(value)  # type: ignore
+                    continue
+
+                if argument_by_name.compact or is_list_type(argument_by_name.type):
+                    lists[id(argument_by_name)] = len(values)
+
+                values.append((argument_by_name, value))
                 continue
 
             argument_by_position = self.get_matching_argument_by_position(pos_i)
@@ -107,7 +183,12 @@ class CommandParser:
             # any positional arguments
             if argument_by_position:
                 try:
-                    self.set_value_to_argument(argument_by_position, arg)
+                    values.append(
+                        (
+                            argument_by_position,
+                            self.convert_value(argument_by_position, arg),
+                        )
+                    )
                 except ValueError:
                     raise InvalidValueException(
                         command=self.command,
@@ -119,7 +200,9 @@ class CommandParser:
 
             raise UnknownArgumentException(command=self.command, unknown_argument=arg)
 
-    def parse(self, args: Union[str, list[str]]) -> BaseCommand:
+        return values
+
+    def split_arguments(self, args: Union[str, list[str]]) -> list[str]:
         splitted_args: list[str] = []
 
         # make sure to use a list
@@ -128,10 +211,64 @@ class CommandParser:
         elif type(args) == list:
             splitted_args = args
 
+        return splitted_args
+
+    def expand_arguments(self, args: list[str]) -> list[str]:
+        """Expand the response files, once for the whole command line"""
+
+        if not self.response_files or self.parent_command is not None:
+            return args
+
+        from runrun.response_files import expand_response_files
+
+        return expand_response_files(args, self.is_kept_value)
+
+    def is_kept_value(self, args: list[str]) -> bool:
+        """Whether the '@' argument following args is left as is.
+
+        The values of options are never read as response files, '--user @bob'
+        gives '@bob'. Streams read their '@path' themselves, one item at a time.
+        """
+        from runrun.completion import (
+            get_sub_command,
+            get_option,
+            get_positional,
+            count_positionals,
+        )
+
+        command = self.command
+
+        # walk down the sub commands like the parser, abbreviations included
+        i = 0
+        while i < len(args):
+            slot = self.get_matching_slot(command, args[i])
+            if slot is None:
+                break
+            command = get_sub_command(command, slot)
+            i += 1
+
+        remaining = args[i:]
+
+        argument = get_option(command, remaining[-1]) if remaining else None
+        if argument is not None:
+            return argument.type != bool
+
+        argument = get_positional(command, count_positionals(command, remaining))
+
+        return argument is not None and is_stream_type(argument.type)
+
+    def parse(self, args: Union[str, list[str]]) -> BaseCommand:
+        self.set_context()
+
+        splitted_args = self.split_arguments(args)
+
         # if never set before, set the arguments
         if self.command.context.original_arguments == []:
+            # the arguments as given, response files can be huge once expanded
             self.command.context.original_arguments = splitted_args
 
+        args = splitted_args = self.expand_arguments(splitted_args)
+
         # check if first argument is a sub command
         sub_command = None
         if len(args) > 0:
@@ -139,9 +276,11 @@ class CommandParser:
 
         # if it is a sub command, pass it down
         if sub_command != None:
-            return CommandParser(sub_command, parent_command=self.command).parse(
-                args[1:]
-            )
+            return CommandParser(
+                sub_command,
+                parent_command=self.command,
+                allow_abbreviations=self.allow_abbreviations,
+            ).parse(args[1:])
 
         # set the scoped argumetns for this command
         self.command.context.scoped_arguments = splitted_args
@@ -152,6 +291,73 @@ class CommandParser:
 
         return self.command
 
+    def parse_result(self, args: Union[str, list[str]]) -> ParseResult:
+        """Parse without writing to the commands, so a tree can be shared.
+
+        The values are only kept in the result, result.bind() gives a copy of
+        the selected command ready to run.
+        """
+
+        original_arguments = self.split_arguments(args)
+        scoped_arguments = self.expand_arguments(original_arguments)
+        commands = [self.command]
+        parser = self
+
+        try:
+            # walk down the sub commands
+            while len(scoped_arguments) > 0:
+                sub_command = parser.get_matching_sub_command(scoped_arguments[0])
+                if sub_command is None:
+                    break
+
+                parser = CommandParser(
+                    sub_command,
+                    parent_command=parser.command,
+                    allow_abbreviations=self.allow_abbreviations,
+                )
+                commands.append(sub_command)
+                scoped_arguments = scoped_arguments[1:]
+
+            values = parser.get_default_values()
+            for argument, value in parser.walk_arguments_values(scoped_arguments):
+                values[argument.name] = value
+
+            parser.check_required_values(values)
+        except ParserException as e:
+            # the contexts are left untouched, the handler needs the root to
+            # search the whole tree
+            e.root_command = self.command
+            raise
+
+        return ParseResult(
+            tuple(commands), values, original_arguments, scoped_arguments
+        )
+
+    def get_default_values(self) -> dict[str, object]:
+        values: dict[str, object] = {}
+
+        for arg in self._arguments:
+            spec = arg.spec
+            if spec.default_value is None:
+                continue
+
+            # the default is shared by every parse, the result gets its own
+            if spec.mutable_default:
+                values[arg.name] = copy.deepcopy(spec.default_value)
+            else:
+                values[arg.name] = spec.default_value
+
+        return values
+
+    def check_required_values(self, values: dict[str, object]):
+        required_missing = [
+            arg for arg in self._arguments if arg.required and arg.name not in values
+        ]
+        if len(required_missing) > 0:
+            raise MissingArgumentException(
+                command=self.command, missing_arguments=required_missing
+            )
+
     def check_required(self):
         required_missing: list[Argument] = []
         for arg in self._arguments:
@@ -165,285 +371,86 @@ class CommandParser:
     def string_to_primitive_instance(self, string_value: str, t: Type) -> object:
         """Converts a string to an instance of a given type"""
 
-        if t == str:
-            return string_value
-
-        if t == bool:
-            if string_value.lower() in [
-                "true",
-                "yes",
-                "yup",
-                "👍",
-                ":)",
-                "😊",
-                "1",
-                "positive",
-                "ok",
-            ]:
-                return True
-            if string_value.lower() in [
-                "false",
-                "no",
-                "nah",
-                "👎",
-                ":(",
-                "☹",
-                "0",
-                "negative",
-            ]:
-                return False
-            raise ValueError("Invalid boolean value")
-
-        if t == int:
-            return int(string_value)
-
-        if t == float:
-            return float(string_value)
+        if t in (str, bool, int, float):
+            return registry.resolve(t)(string_value)
 
         return None
 
     def string_to_known_instance(self, string_value: str, t: Type) -> object:
         """Converts a string to an instance of a given type"""
 
-        if t == Path:
-            return Path(string_value)
-
-        if t in Enum.__subclasses__():
-            # get value ignoring case
-            for member in t.__members__.keys():
-                if member.lower() == string_value.lower():
-                    return t[member]
+        if is_path_type(t) or (isinstance(t, type) and issubclass(t, Enum)):
+            try:
+                return registry.resolve(t)(string_value)
+            except ValueError:
+                return None
 
         return None
 
     def string_to_unknown_instance(self, string_value: str, t: Type) -> object:
         """Attempts at instanciating an object of the given class from a string of arguments"""
-
-        #
-        # the format of the value should look something like this:
-        #
-        # 1,2,3,4             <- only args
-        # x=5,y=7             <- only kwargs
-        # center,x=5,y=7      <- both args and kwargs
-        #
-        # they should map to the __init__ method's parameters
-        #
-        # center,x=5,y=7 -> Label.__init__(*['center'],**{'x':5.0,'y':7.0})
-        # __init__ is defined as this: def __init__(name: str, x: float, y:float)
-        # each values needs to be converted to 'center' -> str, '5' -> float, '7' -> float
-        #
-
-        args: list[Any] = []
-        kwargs: dict[str, Any] = {}
-
-        # split at all comma unless escaped
-        args = re.split(r"(?<!\\),", string_value)
-
-        # replace escaped comma to comma
-        for i, arg in enumerate(args):
-            args[i] = arg.replace(r"\,", ",")
-
-        # find the keyword arguments
-        for arg in args[:]:
-
-            # split at equal unless escaped
-            key_value = re.split(r"(?<!\\)=", arg, maxsplit=1)
-
-            # if it did split, it's a keyword argument
-            if len(key_value) > 1:
-
-                # replace escaped equals to equals
-                key_value[0] = key_value[0].replace(r"\=", "=")
-                key_value[1] = key_value[1].replace(r"\=", "=")
-
-                # keyword argument should not be in the args list
-                args.remove(arg)
-
-                if key_value[0] in kwargs:
-                    raise ValueError("Duplicated key")
-
-                kwargs[key_value[0]] = key_value[1]
-
-        # this part is to convert the argument to the expected type
-
-        init_signature = inspect.signature(t.__init__)
-
-        # convert the keyword arguments
-        for key, value in kwargs.items():
-
-            # skip if in the parameters
-            if key not in init_signature.parameters:
-                continue
-
-            parameter = init_signature.parameters[key]
-
-            # convert the keyword argument using the parameter type
-
-            instanced_value = self.string_to_primitive_instance(
-                value, parameter.annotation
-            )
-
-            if instanced_value == None:
-                instanced_value = self.string_to_known_instance(
-                    value, parameter.annotation
-                )
-
-            kwargs[key] = instanced_value
-
-        parameters = list(init_signature.parameters.values())
-
-        # convert the arguments
-        for i, value in enumerate(args):
-
-            # if there are more arguments than parameters, break. (+1 to skip the self param)
-            if i + 1 >= len(init_signature.parameters):
-                break
-
-            parameter = parameters[i + 1]
-
-            # convert the keyword argument using the parameter type
-            instanced_value = self.string_to_primitive_instance(
-                value, parameter.annotation
-            )
-
-            if instanced_value == None:
-                instanced_value = self.string_to_known_instance(
-                    value, parameter.annotation
-                )
-
-            args[i] = instanced_value
-
-        return t(*args, **kwargs)
+        return registry.unknown_converter(t)(string_value)
 
     def string_to_list_instance(self, string_value: str, t: list[type]) -> list[object]:
-        # split at all comma unless escaped
-        args = re.split(r"(?<!\\),", string_value)
-
-        # get type (default to str if not there)
-        type = str
-        if len(typing.get_args(t)) > 0:
-            type = typing.get_args(t)[0]
-
-        for i, arg in enumerate(args):
-            # replace escaped comma to comma
-            arg = arg.replace(r"\,", ",")
-
-            args[i] = self.string_to_primitive_instance(arg, type)
-
-            if args[i] != None:
-                continue
-
-            args[i] = self.string_to_known_instance(arg, type)
-
-        return args
+        return registry.resolve(t)(string_value)
 
     def string_to_dict_instance(
         self, string_value: str, t: dict[str, type]
     ) -> dict[str, object]:
-
-        kwargs = {}
-
-        # split at all comma unless escaped
-        args = re.split(r"(?<!\\),", string_value)
-
-        # get type of the key (default to str if not there)
-        key_type = str
-        if len(typing.get_args(t)) > 0:
-            key_type = typing.get_args(t)[0]
-
-        # get type of the value (default to str if not there)
-        value_type = str
-        if len(typing.get_args(t)) > 1:
-            value_type = typing.get_args(t)[1]
-
-        for i, arg in enumerate(args):
-            # replace escaped comma to comma
-            arg = arg.replace(r"\,", ",")
-
-            # split at equal unless escaped
-            key_value = re.split(r"(?<!\\)=", arg, maxsplit=1)
-
-            # if it did not split, it's not valid
-            if len(key_value) <= 1:
-                raise ValueError("Not a valid key=value pair")
-
-            # replace escaped equals to equals
-            key = key_value[0].replace(r"\=", "=")
-            value = key_value[1].replace(r"\=", "=")
-
-            key_value[0] = self.string_to_primitive_instance(key, key_type)
-            if key_value[0] == None:
-                key_value[0] = self.string_to_known_instance(key, key_type)
-
-            key_value[1] = self.string_to_primitive_instance(value, value_type)
-            if key_value[1] == None:
-                key_value[1] = self.string_to_known_instance(value, value_type)
-
-            kwargs.update({key_value[0]: key_value[1]})
-
-        return kwargs
+        return registry.resolve(t)(string_value)
 
     def set_value_to_argument(self, argument: Argument, value: str):
+        argument.value = self.convert_value(argument, value)
 
-        # handle lists
-        if typing.get_origin(argument.type) == list:
-            argument._value = self.string_to_list_instance(value, argument.type)
-            return
-
-        # handle dicts
-        if typing.get_origin(argument.type) == dict:
-            argument._value = self.string_to_dict_instance(value, argument.type)
-            return
+    def convert_value(self, argument: Argument, value: str) -> object:
+        converter = argument.converter
 
-        argument._value = self.string_to_primitive_instance(value, argument.type)
+        # arguments outside of a command schema are resolved here
+        if converter is None:
+            converter = registry.resolve(argument.type)
 
-        if argument._value is not None:
-            return
+        return converter(value)
 
-        argument._value = self.string_to_known_instance(value, argument.type)
+    def get_matching_argument_by_position(self, pos: int) -> Optional[Argument]:
+        return self._positional_index.get(pos)
 
-        if argument._value is not None:
-            return
+    def get_matching_argument_by_name(self, arg: str) -> Optional[Argument]:
+        if not arg.startswith("-"):
+            return None
 
-        argument.value = self.string_to_unknown_instance(value, argument.type)
+        i = self._argument_index.get(arg.casefold())
+        return self._arguments[i] if i is not None else None
 
-    def get_matching_argument_by_position(self, pos: int) -> Optional[Argument]:
-        for arg in self._arguments:
-            if arg.position == pos:
-                return arg
+    def get_matching_sub_command(self, arg: str) -> Optional[BaseCommand]:
+        slot = self.get_matching_slot(self.command, arg)
 
-    def get_matching_argument_by_name(self, arg: str) -> Optional[Argument]:
-        arg = arg.lower()
+        if slot is None:
+            return None
 
-        if arg.startswith("--"):
-            arg = arg.removeprefix("--")
+        # only the selected sub command gets instantiated
+        return getattr(self.command, slot.attribute)
 
-            for argument in self._arguments:
-                name = argument.name.lower()
-                if arg == name:
-                    return argument
-                aliases = [a.lower() for a in argument.aliases]
-                if arg in aliases:
-                    return argument
+    def get_matching_slot(
+        self, command: BaseCommand, arg: str
+    ) -> Optional[SubCommandSlot]:
+        """Get the slot of the sub command of the command selected by the argument"""
 
-        elif arg.startswith("-"):
-            arg = arg.removeprefix("-")
+        index = command.get_sub_command_index()
 
-            for argument in self._arguments:
-                if argument.short != None and arg == argument.short.lower():
-                    return argument
+        slot = index.get(arg)
 
-        return None
+        # unique prefixes, 'dep' for 'deploy'
+        if slot is None and self.allow_abbreviations and arg and arg[0] != "-":
+            slots = index.find_prefix(arg)
 
-    def get_matching_sub_command(self, arg: str) -> Optional[BaseCommand]:
-        arg = arg.lower()
+            if len(slots) > 1:
+                raise AmbiguousCommandException(
+                    command=command,
+                    given_value=arg,
+                    candidates=[s.name for s in slots],
+                )
 
-        for sub_command in self._sub_commands:
-            name = sub_command.command_name.lower()
-            if name == arg:
-                return sub_command
-            aliases = [a.lower() for a in sub_command.command_aliases]
-            if arg in aliases:
-                return sub_command
+            if len(slots) == 1:
+                slot = slots[0]
 
-        return None
+        return slot
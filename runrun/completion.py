@@ -0,0 +1,218 @@
+"""Candidates of the word being typed, used by the shell and the __complete entry point.
+
+Completion runs on every Tab press, only the commands on the typed path are
+looked at and no value is converted.
+"""
+
+from enum import Enum
+from typing import Optional, Union
+import os
+
+from runrun.models import (
+    BaseCommand,
+    Argument,
+    LazyCommand,
+    SubCommandSlot,
+    SubCommandIndex,
+)
+from runrun.converters import is_path_type
+from runrun.schema_cache import CachedCommand
+
+
+class CommandClassView:
+    """Stands for a lazy command that is not instantiated, from the schema of its class.
+
+    Only the arguments and sub commands declared on the class are seen.
+    """
+
+    def __init__(self, command_class: type[BaseCommand]) -> None:
+        self.command_class = command_class
+        self.schema = command_class.get_schema()
+
+    def get_arguments(self) -> list[Argument]:
+        return [argument for _, argument in self.schema.arguments]
+
+    def get_sub_command_slots(self) -> tuple[SubCommandSlot, ...]:
+        return self.schema.sub_commands
+
+    def get_sub_command_index(self) -> SubCommandIndex:
+        return self.schema.get_sub_command_index()
+
+
+Node = Union[BaseCommand, CommandClassView, CachedCommand]
+
+
+def get_sub_command(node: Node, slot: SubCommandSlot) -> Node:
+    """Get a sub command, lazy ones declared by their class are not instantiated"""
+
+    if isinstance(node, CachedCommand):
+        return node.get_sub_command(slot)
+
+    if isinstance(node, BaseCommand):
+        value = vars(node).get(slot.attribute)
+        if isinstance(value, BaseCommand):
+            return value
+        owner = type(node)
+    else:
+        owner = node.command_class
+
+    value = getattr(owner, slot.attribute, None)
+
+    if isinstance(value, BaseCommand):
+        return value
+
+    if isinstance(value, LazyCommand):
+        if isinstance(value.factory, type) and issubclass(value.factory, BaseCommand):
+            return CommandClassView(value.factory)
+        return value.factory()
+
+    return getattr(node, slot.attribute)
+
+
+def complete_at(command: BaseCommand, words: list[str], cursor: int) -> list[str]:
+    """Get the candidates for the word at the cursor index of the words"""
+
+    current = words[cursor] if cursor < len(words) else ""
+    return complete(command, words[:cursor], current)
+
+
+def complete(command: BaseCommand, words: list[str], current: str) -> list[str]:
+    """Get the candidates for the word being typed after the given words.
+
+    The words select the sub commands from the given command, the candidates
+    are the sub command names, the options or the values of the option or
+    positional argument at the current word.
+    """
+
+    node: Node = command
+
+    # walk down the sub commands
+    i = 0
+    while i < len(words):
+        slot = node.get_sub_command_index().get(words[i])
+        if slot is None:
+            break
+        node = get_sub_command(node, slot)
+        i += 1
+
+    remaining = words[i:]
+
+    # the value of an option, booleans don't need one
+    if len(remaining) > 0:
+        argument = get_option(node, remaining[-1])
+        if argument is not None and argument.type != bool:
+            return starting_with(get_value_candidates(argument, current), current)
+
+    if current.startswith("-"):
+        names = []
+        for argument in node.get_arguments():
+            names += get_option_names(argument)
+        return starting_with(names, current)
+
+    candidates = []
+
+    # sub commands are only given before the arguments
+    if len(remaining) == 0:
+        for slot in node.get_sub_command_slots():
+            candidates.append(slot.name)
+            candidates += slot.aliases
+
+    positional = get_positional(node, count_positionals(node, remaining))
+    if positional is not None:
+        candidates += get_value_candidates(positional, current)
+
+    return starting_with(candidates, current)
+
+
+def starting_with(candidates: list[str], prefix: str) -> list[str]:
+    prefix = prefix.casefold()
+    return sorted({c for c in candidates if c.casefold().startswith(prefix)})
+
+
+def get_option_names(argument: Argument) -> list[str]:
+    """Get '--name', '--alias' and '-short' of an argument"""
+
+    names = ["--" + argument.name]
+    names += ["--" + alias for alias in argument.aliases]
+    if argument.short is not None:
+        names.append("-" + argument.short)
+    return names
+
+
+def get_option(command: Node, word: str) -> Optional[Argument]:
+    if not word.startswith("-"):
+        return None
+
+    word = word.casefold()
+
+    for argument in command.get_arguments():
+        if any(name.casefold() == word for name in get_option_names(argument)):
+            return argument
+
+    return None
+
+
+def count_positionals(command: Node, words: list[str]) -> int:
+    """Count the positional values in the words, skipping the options and their values"""
+
+    count = 0
+    i = 0
+    while i < len(words):
+        argument = get_option(command, words[i])
+
+        if argument is None:
+            count += 1
+        elif argument.type != bool:
+            i += 1
+        elif i + 1 < len(words) and not words[i + 1].startswith("-"):
+            # like the parser, a boolean takes the value following it
+            i += 1
+
+        i += 1
+
+    return count
+
+
+def get_positional(command: Node, position: int) -> Optional[Argument]:
+    for argument in command.get_arguments():
+        if argument.position == position:
+            return argument
+    return None
+
+
+def get_value_candidates(argument: Argument, current: str) -> list[str]:
+    if isinstance(argument.type, type) and issubclass(argument.type, Enum):
+        return [name.lower() for name in argument.type.__members__]
+
+    # arguments read from a schema cache only have a stand in for Path
+    if is_path_type(argument.type) or getattr(argument, "path", False):
+        return get_path_candidates(current)
+
+    return []
+
+
+def get_path_candidates(current: str) -> list[str]:
+    """Get the files and directories starting with the current value"""
+
+    directory, separator, prefix = current.rpartition("/")
+    base = directory + separator
+
+    candidates = []
+
+    try:
+        with os.scandir(os.path.expanduser(base) or ".") as entries:
+            for entry in entries:
+                # hidden files only when asked for
+                if not entry.name.startswith(prefix) or (
+                    entry.name.startswith(".") and not prefix.startswith(".")
+                ):
+                    continue
+
+                name = base + entry.name
+                if entry.is_dir():
+                    name += "/"
+                candidates.append(name)
+    except OSError:
+        pass
+
+    return candidates
@@ -0,0 +1,348 @@
+"""Generates bash, zsh and fish completion scripts with the command tree in them.
+
+The scripts never start python, the tree is written as lookup tables:
+
+- subs: command path -> names and aliases of its sub commands
+- next: command path and a sub command name or alias -> path of the sub command
+- opts: command path -> its options
+- vals: command path and an option taking a value -> its choices, '@path'
+  for files or nothing when anything goes
+
+Names, aliases and options are matched ignoring case, like the parser.
+"""
+
+from enum import Enum
+from typing import Optional
+import hashlib
+import os
+
+from runrun.models import BaseCommand
+from runrun.converters import is_path_type
+from runrun.completion import get_option_names
+
+SHELLS = ("bash", "zsh", "fish")
+
+# changing the scripts must change the fingerprints
+SCRIPT_VERSION = "1"
+
+FINGERPRINT_PREFIX = "# runrun-fingerprint: "
+
+# value of the vals table for path arguments
+PATH_VALUE = "@path"
+
+
+class CompletionTables:
+    """Lookup tables of a command tree, built by walking it once"""
+
+    def __init__(self, command: BaseCommand, program_name: Optional[str] = None):
+        self.program_name = program_name or command.command_name
+
+        self.subs: dict[str, list[str]] = {}
+        self.next: dict[str, str] = {}
+        self.opts: dict[str, list[str]] = {}
+        self.vals: dict[str, list[str]] = {}
+
+        self._add(command, self.program_name, set())
+
+    def _add(self, command: BaseCommand, path: str, visiting: set[int]) -> None:
+        # a command containing itself would never end
+        if id(command) in visiting:
+            return
+        visiting.add(id(command))
+
+        options = []
+
+        for argument in command.get_arguments():
+            names = get_option_names(argument)
+            options += names
+
+            # booleans are flags, they don't take a value
+            if argument.type == bool:
+                continue
+
+            values = []
+            if isinstance(argument.type, type) and issubclass(argument.type, Enum):
+                values = [name.lower() for name in argument.type.__members__]
+            elif is_path_type(argument.type):
+                values = [PATH_VALUE]
+
+            for name in names:
+                self.vals[f"{path} {name.casefold()}"] = values
+
+        self.opts[path] = options
+
+        names = []
+        for sub_command in command.get_sub_commands():
+            sub_path = f"{path} {sub_command.command_name}"
+
+            for name in [sub_command.command_name, *sub_command.command_aliases]:
+                names.append(name)
+                self.next.setdefault(f"{path} {name.casefold()}", sub_path)
+
+            self._add(sub_command, sub_path, visiting)
+
+        self.subs[path] = names
+
+        visiting.discard(id(command))
+
+    def fingerprint(self) -> str:
+        digest = hashlib.sha256(SCRIPT_VERSION.encode())
+
+        for table in (self.subs, self.next, self.opts, self.vals):
+            for key in sorted(table):
+                value = table[key]
+                if isinstance(value, list):
+                    value = "\0".join(value)
+                digest.update(f"{key}\1{value}\2".encode())
+            digest.update(b"\3")
+
+        return digest.hexdigest()
+
+
+def generate_completion_script(
+    command: BaseCommand, shell: str, program_name: Optional[str] = None
+) -> str:
+    """Get the completion script of the command tree for bash, zsh or fish"""
+
+    tables = CompletionTables(command, program_name)
+    return render(tables, shell)
+
+
+def write_completion_script(
+    command: BaseCommand, shell: str, path: str, program_name: Optional[str] = None
+) -> bool:
+    """Write the completion script to a file, unless the tree did not change.
+
+    Returns True when the file was written.
+    """
+
+    tables = CompletionTables(command, program_name)
+    fingerprint = tables.fingerprint() + " " + shell
+
+    if read_fingerprint(path) == fingerprint:
+        return False
+
+    script = render(tables, shell)
+
+    # replace the file at once, a shell may be reading it
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(script)
+    os.replace(temporary_path, path)
+
+    return True
+
+
+def read_fingerprint(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            first_line = file.readline()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if not first_line.startswith(FINGERPRINT_PREFIX):
+        return None
+
+    return first_line[len(FINGERPRINT_PREFIX) :].strip()
+
+
+def render(tables: CompletionTables, shell: str) -> str:
+    if shell not in SHELLS:
+        raise ValueError(f"Unknown shell '{shell}', use one of {', '.join(SHELLS)}")
+
+    header = f"{FINGERPRINT_PREFIX}{tables.fingerprint()} {shell}\n"
+    header += f"# completion of {tables.program_name}, generated by runrun\n"
+
+    if shell == "bash":
+        return header + render_bash(tables)
+    if shell == "zsh":
+        return header + render_zsh(tables)
+    return header + render_fish(tables)
+
+
+def function_name(tables: CompletionTables) -> str:
+    name = "".join(c if c.isalnum() else "_" for c in tables.program_name)
+    return f"_runrun_{name}"
+
+
+def quote(text: str) -> str:
+    """Single quotes for bash and zsh"""
+    return "'" + text.replace("'", "'\\''") + "'"
+
+
+def quote_fish(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def table_items(tables: CompletionTables) -> dict[str, dict[str, str]]:
+    """The tables with their values joined by spaces"""
+
+    return {
+        "subs": {k: " ".join(v) for k, v in tables.subs.items()},
+        "next": dict(tables.next),
+        "opts": {k: " ".join(v) for k, v in tables.opts.items()},
+        "vals": {k: " ".join(v) for k, v in tables.vals.items()},
+    }
+
+
+def render_bash(tables: CompletionTables) -> str:
+    name = function_name(tables)
+    lines = []
+
+    for table, items in table_items(tables).items():
+        lines.append(f"declare -gA {name}_{table}=(")
+        for key, value in items.items():
+            lines.append(f"  [{quote(key)}]={quote(value)}")
+        lines.append(")")
+
+    lines.append(f"""
+{name}() {{
+  local cur=${{COMP_WORDS[COMP_CWORD]}} cmd_path={quote(tables.program_name)} key i
+  local walking=1
+
+  # walk down the sub commands, the other words are arguments
+  for ((i = 1; i < COMP_CWORD; i++)); do
+    key="$cmd_path ${{COMP_WORDS[i],,}}"
+    if [[ $walking == 1 && -n ${{{name}_next[$key]+x}} ]]; then
+      cmd_path=${{{name}_next[$key]}}
+    else
+      walking=0
+    fi
+  done
+
+  if ((COMP_CWORD > 1)); then
+    key="$cmd_path ${{COMP_WORDS[COMP_CWORD - 1],,}}"
+    if [[ -n ${{{name}_vals[$key]+x}} ]]; then
+      if [[ ${{{name}_vals[$key]}} == {PATH_VALUE} ]]; then
+        COMPREPLY=($(compgen -f -- "$cur"))
+      else
+        COMPREPLY=($(compgen -W "${{{name}_vals[$key]}}" -- "$cur"))
+      fi
+      return
+    fi
+  fi
+
+  if [[ $cur == -* ]]; then
+    COMPREPLY=($(compgen -W "${{{name}_opts[$cmd_path]}}" -- "$cur"))
+  elif [[ $walking == 1 ]]; then
+    COMPREPLY=($(compgen -W "${{{name}_subs[$cmd_path]}}" -- "$cur"))
+  fi
+}}
+
+complete -o default -F {name} {quote(tables.program_name)}
+""")
+
+    return "\n".join(lines)
+
+
+def render_zsh(tables: CompletionTables) -> str:
+    name = function_name(tables)
+    lines = []
+
+    for table, items in table_items(tables).items():
+        lines.append(f"typeset -gA {name}_{table}")
+        lines.append(f"{name}_{table}=(")
+        for key, value in items.items():
+            lines.append(f"  {quote(key)} {quote(value)}")
+        lines.append(")")
+
+    lines.append(f"""
+{name}() {{
+  # not 'path', zsh ties it to PATH
+  local cur=${{words[CURRENT]}} cmd_path={quote(tables.program_name)} key i
+  local walking=1
+
+  # walk down the sub commands, the other words are arguments
+  for ((i = 2; i < CURRENT; i++)); do
+    key="$cmd_path ${{(L)words[i]}}"
+    if [[ $walking == 1 && -n ${{{name}_next[$key]+x}} ]]; then
+      cmd_path=${{{name}_next[$key]}}
+    else
+      walking=0
+    fi
+  done
+
+  if ((CURRENT > 2)); then
+    key="$cmd_path ${{(L)words[CURRENT - 1]}}"
+    if [[ -n ${{{name}_vals[$key]+x}} ]]; then
+      if [[ ${{{name}_vals[$key]}} == {PATH_VALUE} ]]; then
+        _files
+      else
+        compadd -- ${{={name}_vals[$key]}}
+      fi
+      return
+    fi
+  fi
+
+  if [[ $cur == -* ]]; then
+    compadd -- ${{={name}_opts[$cmd_path]}}
+  elif [[ $walking == 1 ]]; then
+    compadd -- ${{={name}_subs[$cmd_path]}}
+  fi
+}}
+
+compdef {name} {quote(tables.program_name)}
+""")
+
+    return "\n".join(lines)
+
+
+def render_fish(tables: CompletionTables) -> str:
+    name = function_name(tables)
+    lines = []
+
+    # fish has no dictionaries, keys and values are two lists
+    for table, items in table_items(tables).items():
+        keys = " ".join(quote_fish(key) for key in items)
+        values = " ".join(quote_fish(value) for value in items.values())
+        lines.append(f"set -g {name}_{table}_keys {keys}")
+        lines.append(f"set -g {name}_{table}_values {values}")
+
+    lines.append(f"""
+function {name}_get
+    set -l keys {name}_$argv[1]_keys
+    set -l values {name}_$argv[1]_values
+    set -l i (contains -i -- $argv[2] $$keys); or return 1
+    echo $$values[1][$i]
+end
+
+function {name}
+    set -l words (commandline -opc)
+    set -l cur (commandline -ct)
+    set -l cmd_path {quote_fish(tables.program_name)}
+    set -l walking 1
+
+    # walk down the sub commands, the other words are arguments
+    for word in $words[2..-1]
+        set -l next ({name}_get next "$cmd_path "(string lower -- $word))
+        if test $walking = 1 -a -n "$next"
+            set cmd_path $next
+        else
+            set walking 0
+        end
+    end
+
+    if test (count $words) -gt 1
+        set -l key "$cmd_path "(string lower -- $words[-1])
+        if contains -- $key ${name}_vals_keys
+            set -l values ({name}_get vals $key)
+            if test "$values" = {PATH_VALUE}
+                __fish_complete_path $cur
+            else if test -n "$values"
+                string split ' ' -- $values
+            end
+            return
+        end
+    end
+
+    if string match -q -- '-*' $cur
+        string split ' ' -- ({name}_get opts $cmd_path)
+    else if test $walking = 1
+        string split ' ' -- ({name}_get subs $cmd_path)
+    end
+end
+
+complete -c {quote_fish(tables.program_name)} -f -a '({name})'
+""")
+
+    return "\n".join(lines)
@@ -0,0 +1,444 @@
+from typing import Any, Callable, Optional
+import typing
+from enum import Enum
+import re
+import sys
+
+from runrun.streams import Stream, is_stream_type
+
+Converter = Callable[[str], Any]
+
+TRUE_VALUES = {
+    "true",
+    "yes",
+    "yup",
+    "👍",
+    ":)",
+    "😊",
+    "1",
+    "positive",
+    "ok",
+}
+
+FALSE_VALUES = {
+    "false",
+    "no",
+    "nah",
+    "👎",
+    ":(",
+    "☹",
+    "0",
+    "negative",
+}
+
+
+# escaped separators, separators, runs of plain text or a lone backslash
+_TOKENS = re.compile(r"\\[,=\[\]]|[,=\[\]]|[^,=\[\]\\]+|\\")
+
+
+def split_values(string_value: str) -> list[str]:
+    """Split a value at the commas, unless escaped (\\,) or between brackets"""
+
+    # nothing to unescape or to nest, let str.split do the work
+    if "\\" not in string_value and "[" not in string_value:
+        return string_value.split(",")
+
+    return [value for _, value in _scan(string_value, pairs=False, brackets=True)]
+
+
+def split_key_values(string_value: str) -> list[tuple[Optional[str], str]]:
+    """Split a value in (key, value) pairs, the key is None when there is no equal sign.
+
+    Commas and equal signs can be escaped (\\, and \\=) and are ignored
+    between brackets, a=1,b=[1,2] gives [('a', '1'), ('b', '[1,2]')].
+    """
+
+    if "\\" not in string_value and "[" not in string_value:
+        pairs: list[tuple[Optional[str], str]] = []
+        for item in string_value.split(","):
+            key, equal, value = item.partition("=")
+            pairs.append((key, value) if equal else (None, item))
+        return pairs
+
+    return _scan(string_value, pairs=True, brackets=True)
+
+
+def _scan(
+    string_value: str, pairs: bool, brackets: bool
+) -> list[tuple[Optional[str], str]]:
+    items: list[tuple[Optional[str], str]] = []
+    key: Optional[str] = None
+    parts: list[str] = []
+    depth = 0
+
+    for token in _TOKENS.findall(string_value):
+
+        # nested values are kept as is, their own converter will scan them
+        if depth > 0:
+            parts.append(token)
+            if token == "[":
+                depth += 1
+            elif token == "]":
+                depth -= 1
+            continue
+
+        if token == ",":
+            items.append((key, "".join(parts)))
+            key = None
+            parts = []
+        elif token == "=" and pairs and key is None:
+            key = "".join(parts)
+            parts = []
+        elif token == "[" and brackets:
+            depth += 1
+            parts.append(token)
+        elif len(token) == 2 and token[0] == "\\" and (pairs or token[1] != "="):
+            # escaped separator
+            parts.append(token[1])
+        else:
+            parts.append(token)
+
+    # a bracket was never closed, treat them as plain text
+    if depth > 0:
+        return _scan(string_value, pairs, brackets=False)
+
+    items.append((key, "".join(parts)))
+
+    return items
+
+
+def strip_brackets(string_value: str) -> str:
+    """Remove the brackets around a nested value, [1,2] gives 1,2"""
+
+    if not (string_value.startswith("[") and string_value.endswith("]")):
+        return string_value
+
+    depth = 0
+    for match in _TOKENS.finditer(string_value):
+        token = match.group()
+        if token == "[":
+            depth += 1
+        elif token == "]":
+            depth -= 1
+            if depth == 0:
+                # only if the first bracket is closed by the last one
+                if match.end() == len(string_value):
+                    return string_value[1:-1]
+                return string_value
+
+    return string_value
+
+
+def is_path_type(t: Any) -> bool:
+    # pathlib is slow to import, if it is not imported t can't be a Path
+    pathlib = sys.modules.get("pathlib")
+    return pathlib is not None and t == pathlib.Path
+
+
+# array.array typecodes of the compact lists, 64 bits integers and doubles
+ARRAY_TYPECODES = {int: "q", float: "d"}
+
+
+def is_list_type(t: Any) -> bool:
+    return typing.get_origin(t) == list
+
+
+def is_numeric_list_type(t: Any) -> bool:
+    args = typing.get_args(t)
+    return is_list_type(t) and len(args) == 1 and args[0] in ARRAY_TYPECODES
+
+
+def string_to_bool(string_value: str) -> bool:
+    value = string_value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError("Invalid boolean value")
+
+
+def string_to_str(string_value: str) -> str:
+    return string_value
+
+
+def enum_converter(t: type[Enum]) -> Converter:
+    """Converter getting the enum member by name, ignoring case"""
+
+    members = {name.lower(): member for name, member in t.__members__.items()}
+
+    def convert(string_value: str) -> Enum:
+        try:
+            return members[string_value.lower()]
+        except KeyError:
+            raise ValueError(f"'{string_value}' is not a member of {t.__name__}")
+
+    return convert
+
+
+class ConverterRegistry:
+    """Finds the function converting a string to a given type.
+
+    Converters are resolved once per type, a registered converter takes
+    precedence over the built in ones.
+    """
+
+    def __init__(self) -> None:
+        self._converters: dict[Any, Converter] = {}
+        self._resolved: dict[Any, Converter] = {}
+        self._constructors: dict[Any, "ConstructorConverter"] = {}
+
+    def register(self, t: Any, converter: Optional[Converter] = None):
+        """Register a converter for a type, can be used as a decorator"""
+
+        if converter is None:
+            return lambda converter: self.register(t, converter)
+
+        self._converters[t] = converter
+
+        # resolved converters may use the previous one
+        self._resolved.clear()
+        self._constructors.clear()
+
+        return converter
+
+    def resolve(self, t: Any) -> Converter:
+        try:
+            return self._resolved[t]
+        except KeyError:
+            pass
+        except TypeError:
+            # not hashable, can't be cached
+            return self._resolve(t)
+
+        converter = self._resolve(t)
+        self._resolved[t] = converter
+        return converter
+
+    def _resolve(self, t: Any) -> Converter:
+
+        if t in self._converters:
+            return self._converters[t]
+
+        # handle streams, before the generic types
+        if is_stream_type(t):
+            return self.stream_converter(t)
+
+        # handle lists
+        if typing.get_origin(t) == list:
+            return self.list_converter(t)
+
+        # handle dicts
+        if typing.get_origin(t) == dict:
+            return self.dict_converter(t)
+
+        if t == str:
+            return string_to_str
+
+        if t == bool:
+            return string_to_bool
+
+        if t == int:
+            return int
+
+        if t == float:
+            return float
+
+        if is_path_type(t):
+            return t
+
+        if isinstance(t, type) and issubclass(t, Enum):
+            return enum_converter(t)
+
+        return self.unknown_converter(t)
+
+    def list_converter(self, t: Any) -> Converter:
+
+        # get type (default to str if not there)
+        item_type = str
+        if len(typing.get_args(t)) > 0:
+            item_type = typing.get_args(t)[0]
+
+        convert_item = self.resolve(item_type)
+
+        def convert(string_value: str) -> list:
+            values = split_values(strip_brackets(string_value))
+            return [convert_item(value) for value in values]
+
+        return convert
+
+    def array_converter(self, t: Any) -> Converter:
+        """Converter of a list[int] or list[float] giving an array.array"""
+        from array import array
+
+        item_type = typing.get_args(t)[0] if is_numeric_list_type(t) else None
+        if item_type is None:
+            raise ValueError(f"Only list[int] and list[float] can be compact, not {t}")
+
+        typecode = ARRAY_TYPECODES[item_type]
+
+        def convert(string_value: str) -> array:
+            values = split_values(strip_brackets(string_value))
+            try:
+                return array(typecode, map(item_type, values))
+            except OverflowError as e:
+                raise ValueError(str(e))
+
+        return convert
+
+    def stream_converter(self, t: Any) -> Converter:
+        # get type (default to str if not there)
+        item_type = str
+        if len(typing.get_args(t)) > 0:
+            item_type = typing.get_args(t)[0]
+
+        convert_item = self.resolve(item_type)
+
+        def convert(string_value: str) -> Stream:
+            return Stream(string_value, convert_item)
+
+        return convert
+
+    def dict_converter(self, t: Any) -> Converter:
+
+        # get type of the key (default to str if not there)
+        key_type = str
+        if len(typing.get_args(t)) > 0:
+            key_type = typing.get_args(t)[0]
+
+        # get type of the value (default to str if not there)
+        value_type = str
+        if len(typing.get_args(t)) > 1:
+            value_type = typing.get_args(t)[1]
+
+        convert_key = self.resolve(key_type)
+        convert_value = self.resolve(value_type)
+
+        def convert(string_value: str) -> dict:
+            kwargs = {}
+
+            for key, value in split_key_values(strip_brackets(string_value)):
+
+                # if it did not split, it's not valid
+                if key is None:
+                    raise ValueError("Not a valid key=value pair")
+
+                kwargs[convert_key(key)] = convert_value(value)
+
+            return kwargs
+
+        return convert
+
+    def unknown_converter(self, t: Any) -> Converter:
+        """Attempts at instanciating an object of the given class from a string of arguments"""
+
+        try:
+            return self._constructors[t]
+        except KeyError:
+            converter = ConstructorConverter(t, self)
+            self._constructors[t] = converter
+            return converter
+
+
+class ConstructorConverter:
+    """Instanciates an object of the given class from a string of arguments.
+
+    The signature of the constructor and the converters of its parameters are
+    looked up on the first conversion, then reused for every other one.
+    """
+
+    #
+    # the format of the value should look something like this:
+    #
+    # 1,2,3,4             <- only args
+    # x=5,y=7             <- only kwargs
+    # center,x=5,y=7      <- both args and kwargs
+    #
+    # they should map to the __init__ method's parameters
+    #
+    # center,x=5,y=7 -> Label.__init__(*['center'],**{'x':5.0,'y':7.0})
+    # __init__ is defined as this: def __init__(name: str, x: float, y:float)
+    # each values needs to be converted to 'center' -> str, '5' -> float, '7' -> float
+    #
+
+    def __init__(self, t: Any, registry: ConverterRegistry) -> None:
+        self.type = t
+        self.registry = registry
+
+        # filled on the first conversion
+        self._positional: Optional[list[Converter]] = None
+        self._var_positional: Optional[Converter] = None
+        self._keywords: dict[str, Converter] = {}
+        self._var_keyword: Optional[Converter] = None
+
+    def compile(self) -> None:
+        import inspect
+
+        parameters = list(inspect.signature(self.type.__init__).parameters.values())
+
+        positional: list[Converter] = []
+
+        # skip the self param
+        for parameter in parameters[1:]:
+            annotation = parameter.annotation
+
+            # parameters without annotation are given the string
+            if annotation is parameter.empty:
+                annotation = str
+
+            converter = self.registry.resolve(annotation)
+
+            if parameter.kind in (
+                parameter.POSITIONAL_ONLY,
+                parameter.POSITIONAL_OR_KEYWORD,
+            ):
+                positional.append(converter)
+
+            if parameter.kind in (
+                parameter.POSITIONAL_OR_KEYWORD,
+                parameter.KEYWORD_ONLY,
+            ):
+                self._keywords[parameter.name] = converter
+
+            if parameter.kind == parameter.VAR_POSITIONAL:
+                self._var_positional = converter
+
+            if parameter.kind == parameter.VAR_KEYWORD:
+                self._var_keyword = converter
+
+        self._positional = positional
+
+    def __call__(self, string_value: str) -> Any:
+        if self._positional is None:
+            self.compile()
+
+        positional: list[Converter] = self._positional  # type: ignore
+
+        args: list[Any] = []
+        kwargs: dict[str, Any] = {}
+
+        for key, value in split_key_values(strip_brackets(string_value)):
+
+            # if it did not split, it's a positional argument
+            if key is None:
+                i = len(args)
+                if i < len(positional):
+                    args.append(positional[i](value))
+                elif self._var_positional is not None:
+                    args.append(self._var_positional(value))
+                else:
+                    # let the constructor complain about it
+                    args.append(value)
+                continue
+
+            if key in kwargs:
+                raise ValueError("Duplicated key")
+
+            converter = self._keywords.get(key, self._var_keyword)
+            kwargs[key] = converter(value) if converter is not None else value
+
+        return self.type(*args, **kwargs)
+
+
+# registry used by the parser, custom types can be added to it with
+# registry.register(MyType, my_converter)
+registry = ConverterRegistry()
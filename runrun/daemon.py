@@ -0,0 +1,295 @@
+"""Keeps an application warm in a process listening on a unix socket.
+
+The server has the application imported and its command tree built. Each
+client sends its arguments, working directory and environment along with its
+stdin, stdout and stderr file descriptors. The server forks a child using
+these descriptors to run the command, so the output goes straight to the
+client, then sends the exit code back.
+
+Start the server with Runner(App()).serve("/tmp/app.sock") and call it with
+python -m runrun.client /tmp/app.sock [arguments]
+"""
+
+from typing import TYPE_CHECKING, Optional
+import os
+import sys
+import json
+import time
+import errno
+import signal
+import socket
+import struct
+import selectors
+import traceback
+
+if TYPE_CHECKING:
+    from runrun.runner import Runner
+
+# a message is prefixed by its length
+_LENGTH = struct.Struct("!I")
+
+# the server answers with the exit code
+_EXIT_CODE = struct.Struct("!i")
+
+
+def send_request(
+    sock: socket.socket,
+    args: list[str],
+    cwd: str,
+    env: dict[str, str],
+    fds: list[int],
+) -> None:
+    body = json.dumps({"args": args, "cwd": cwd, "env": env}).encode()
+
+    # the descriptors travel with the length, the body may be too big for one message
+    socket.send_fds(sock, [_LENGTH.pack(len(body))], fds)
+    sock.sendall(body)
+
+
+def receive_request(sock: socket.socket) -> tuple[dict, list[int]]:
+    data, fds, _, _ = socket.recv_fds(sock, _LENGTH.size, 3)
+
+    if len(data) != _LENGTH.size:
+        raise ConnectionError("Invalid request")
+
+    (length,) = _LENGTH.unpack(data)
+    body = receive_exactly(sock, length)
+
+    return json.loads(body), fds
+
+
+def receive_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_exit_code(sock: socket.socket, code: int) -> None:
+    sock.sendall(_EXIT_CODE.pack(code))
+
+
+def receive_exit_code(sock: socket.socket) -> int:
+    (code,) = _EXIT_CODE.unpack(receive_exactly(sock, _EXIT_CODE.size))
+    return code
+
+
+class DaemonServer:
+    """Serves the runner to clients connecting on a unix socket.
+
+    Every client is handled by a forked child, several can run at once. The
+    server stops after idle_timeout seconds without any client, or when it
+    receives SIGTERM or SIGINT.
+    """
+
+    def __init__(
+        self,
+        runner: "Runner",
+        socket_path: str,
+        idle_timeout: float | None = 600.0,
+    ) -> None:
+        if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+            raise NotImplementedError("The daemon mode needs fork and unix sockets")
+
+        self.runner = runner
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+
+        # pid of the running children, with the connection of their client,
+        # None once the client is gone
+        self.children: dict[int, Optional[socket.socket]] = {}
+
+        self._stopping = False
+        self._listener: socket.socket | None = None
+        self._selector = selectors.DefaultSelector()
+
+    def serve(self) -> None:
+        self._listener = self._listen()
+
+        previous_handlers = {
+            sig: signal.signal(sig, self._stop)
+            for sig in (signal.SIGTERM, signal.SIGINT)
+        }
+
+        try:
+            self._selector.register(self._listener, selectors.EVENT_READ)
+            self._loop()
+        finally:
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+            self._shutdown()
+
+    def _listen(self) -> socket.socket:
+        if os.path.exists(self.socket_path):
+            # refuse to steal the socket of a running server
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                raise RuntimeError(
+                    f"A server is already listening on {self.socket_path}"
+                )
+            finally:
+                probe.close()
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen()
+        listener.setblocking(False)
+        return listener
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _loop(self) -> None:
+        last_activity = time.monotonic()
+
+        while not self._stopping:
+            for key, _ in self._selector.select(timeout=0.1):
+                if key.fileobj is self._listener:
+                    self._accept()
+                else:
+                    # a client left before the end of its command
+                    self._abandon(key.data)
+
+            self._reap()
+
+            if self.children:
+                last_activity = time.monotonic()
+            elif (
+                self.idle_timeout is not None
+                and time.monotonic() - last_activity > self.idle_timeout
+            ):
+                break
+
+    def _accept(self) -> None:
+        try:
+            conn, _ = self._listener.accept()  # type: ignore
+        except BlockingIOError:
+            return
+
+        conn.setblocking(True)
+        conn.settimeout(5)
+
+        try:
+            request, fds = receive_request(conn)
+        except (OSError, ValueError):
+            conn.close()
+            return
+
+        # don't let the child print what the server still has in its buffers
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        pid = os.fork()
+
+        if pid == 0:
+            self._child(conn, request, fds)
+
+        for fd in fds:
+            os.close(fd)
+
+        conn.settimeout(None)
+        self.children[pid] = conn
+        self._selector.register(conn, selectors.EVENT_READ, data=pid)
+
+    def _child(self, conn: socket.socket, request: dict, fds: list[int]) -> None:
+        code = 1
+        try:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+
+            self._listener.close()  # type: ignore
+            conn.close()
+
+            # the client's stdin, stdout and stderr become ours
+            for target, fd in enumerate(fds[:3]):
+                os.dup2(fd, target)
+                os.close(fd)
+
+            # the sys streams may not be on 0, 1 and 2, like when captured by a test runner
+            sys.stdin = open(0, "r", closefd=False)
+            sys.stdout = open(1, "w", closefd=False)
+            sys.stderr = open(2, "w", closefd=False)
+
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            sys.argv[1:] = request["args"]
+
+            code = self.runner.run(request["args"])
+        except SystemExit as e:
+            from runrun.runner import get_exit_code
+
+            code = get_exit_code(e)
+
+            # like Python does, the message of sys.exit("...") goes to stderr
+            if e.code is not None and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _abandon(self, pid: int) -> None:
+        conn = self.children.get(pid)
+
+        # the child is still reaped, but there is nobody to answer anymore
+        if conn is not None:
+            self._selector.unregister(conn)
+            conn.close()
+            self.children[pid] = None
+
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self) -> None:
+        for pid in list(self.children):
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done, status = pid, 1
+
+            if done == 0:
+                continue
+
+            conn = self.children.pop(pid)
+            if conn is None:
+                continue
+
+            self._selector.unregister(conn)
+
+            try:
+                send_exit_code(conn, os.waitstatus_to_exitcode(status))
+            except OSError as e:
+                # the client is gone, nobody to tell
+                if e.errno not in (errno.EPIPE, errno.ECONNRESET):
+                    raise
+            finally:
+                conn.close()
+
+    def _shutdown(self) -> None:
+        if self._listener is not None:
+            self._selector.unregister(self._listener)
+            self._listener.close()
+            self._listener = None
+
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+        # let the running commands finish
+        while self.children:
+            self._reap()
+            time.sleep(0.01)
+
+        self._selector.close()
@@ -1,8 +1,7 @@
 from enum import Enum
+from typing import Optional
 
-import Levenshtein
-from colorama import Fore, Style
-
+from runrun.style import Fore, Style
 from runrun.models import BaseCommand, Argument
 
 
@@ -13,6 +12,10 @@ class CLIException(Exception):
 class ParserException(CLIException):
     def __init__(self, command: BaseCommand, *args: object) -> None:
         self.command = command
+
+        # the command the parsing started from, set by parse_result
+        self.root_command: Optional[BaseCommand] = None
+
         super().__init__(*args)
 
 
@@ -42,10 +45,44 @@ class InvalidValueException(ParserException):
         self.given_value = given_value
 
 
+class AmbiguousCommandException(ParserException):
+    def __init__(
+        self, command: BaseCommand, given_value: str, candidates: list[str] = []
+    ) -> None:
+        super().__init__(
+            command,
+            f"Ambiguous command '{given_value}', could be: {', '.join(candidates)}",
+        )
+        self.given_value = given_value
+        self.candidates = candidates
+
+
 class ValidationException(CLIException):
     pass
 
 
+class StreamException(CLIException):
+    def __init__(self, source: str, reason: str) -> None:
+        super().__init__(f"Could not read '{source}': {reason}")
+        self.source = source
+        self.reason = reason
+
+
+class InvalidStreamValueException(CLIException):
+    def __init__(self, source: str, line: int, given_value: str) -> None:
+        super().__init__(f"Invalid value '{given_value}' on line {line} of {source}")
+        self.source = source
+        self.line = line
+        self.given_value = given_value
+
+
+class ResponseFileException(CLIException):
+    def __init__(self, path: str, reason: str) -> None:
+        super().__init__(f"Could not read the response file '{path}': {reason}")
+        self.path = path
+        self.reason = reason
+
+
 class BaseExceptionHandler:
     def handle_exception(self, exception: Exception):
         print(str(exception))
@@ -71,6 +108,25 @@ class DefaultExceptionHandler(BaseExceptionHandler):
         if isinstance(exception, InvalidValueException):
             self.print_invalid_value_exception(exception)
 
+        # print the commands matching the abbreviation
+        if isinstance(exception, AmbiguousCommandException):
+            self.print_ambiguous_command_exception(exception)
+
+        # print why the @file could not be expanded or what could not be streamed
+        if isinstance(
+            exception,
+            (ResponseFileException, StreamException, InvalidStreamValueException),
+        ):
+            print(f"{Fore.RED}{exception}{Style.RESET_ALL}")
+
+    def print_ambiguous_command_exception(self, exception: AmbiguousCommandException):
+
+        print(f"{Fore.RED}Ambiguous command '{exception.given_value}'{Style.RESET_ALL}")
+        print("Do you mean:")
+
+        for name in exception.candidates:
+            print(f"  {Style.BRIGHT}{name}{Style.RESET_ALL}")
+
     def print_invalid_value_exception(self, exception: InvalidValueException):
 
         # TODO: print usage
@@ -91,7 +147,9 @@ class DefaultExceptionHandler(BaseExceptionHandler):
             print("Expected an integer")
             return
 
-        if issubclass(exception.argument.type, Enum):
+        if isinstance(exception.argument.type, type) and issubclass(
+            exception.argument.type, Enum
+        ):
             valid_values = [e.name for e in exception.argument.type]
             valid_values_str = ", ".join(valid_values)
             print(f"Valid values are {valid_values_str}")
@@ -119,7 +177,7 @@ class DefaultExceptionHandler(BaseExceptionHandler):
         argument_suggestions: list[Argument] = []
         command_suggestions: list[BaseCommand] = []
 
-        if exception.unknown_argument.startswith("--"):
+        if exception.unknown_argument.startswith("-"):
             print(
                 f"{Fore.RED}Unknown argument '{exception.unknown_argument}'{Style.RESET_ALL}"
             )
@@ -130,8 +188,16 @@ class DefaultExceptionHandler(BaseExceptionHandler):
             )
             command_suggestions += self.get_sub_command_suggestions(exception)
 
-        # if there is no suggestion, nothing else to do
+        # look for it on the other levels of the tree
         if len(argument_suggestions) == 0 and len(command_suggestions) == 0:
+            tree_suggestions = self.get_tree_suggestions(exception)
+
+            if len(tree_suggestions) > 0:
+                print("Do you mean:")
+
+            for text in tree_suggestions:
+                print(f"  {Style.BRIGHT}{text}{Style.RESET_ALL}")
+
             return
 
         print("Do you mean:")
@@ -150,32 +216,41 @@ class DefaultExceptionHandler(BaseExceptionHandler):
     def get_argument_suggestions(
         self, exception: UnknownArgumentException
     ) -> list[Argument]:
-        suggestions = []
+        from runrun.suggestions import search_level_arguments
 
-        for arg in exception.command.get_arguments():
-            distance = Levenshtein.distance(
-                exception.unknown_argument.removeprefix("--").lower(),
-                arg.name.lower(),
-                score_cutoff=2,
-            )
-            if distance <= 2:
-                suggestions.append(arg)
-
-        return suggestions
+        return search_level_arguments(exception.command, exception.unknown_argument)
 
     def get_sub_command_suggestions(
         self, exception: UnknownArgumentException
     ) -> list[BaseCommand]:
-        suggestions = []
+        from runrun.suggestions import search_level_commands
 
-        for sub_command in exception.command.get_sub_commands():
+        return search_level_commands(exception.command, exception.unknown_argument)
 
-            distance = Levenshtein.distance(
-                exception.unknown_argument.lower(),
-                sub_command.command_name.lower(),
-                score_cutoff=2,
-            )
-            if distance <= 2:
-                suggestions.append(sub_command)
+    def get_tree_suggestions(
+        self, exception: UnknownArgumentException, limit: int = 5
+    ) -> list[str]:
+        """Get the full command lines of the matches declared on other commands"""
+        from runrun.suggestions import get_suggestion_index
+
+        root_command = (
+            exception.root_command
+            or exception.command.context.root_command
+            or exception.command
+        )
+        index = get_suggestion_index(root_command)
+
+        if exception.unknown_argument.startswith("-"):
+            matches = index.search_arguments(exception.unknown_argument)
+        else:
+            matches = index.search_commands(exception.unknown_argument)
+
+        texts: list[str] = []
+
+        for suggestion in matches:
+            if len(texts) == limit:
+                break
+            if suggestion.owner is not exception.command:
+                texts.append(suggestion.text)
 
-        return suggestions
+        return texts
@@ -1,13 +1,131 @@
-from typing import TypeVar, Generic, Optional, Union
+from typing import TypeVar, Generic, Optional, Union, Callable, Iterable, Sequence
+from bisect import bisect_left
+from enum import Enum
 import typing
-import inspect
 import copy
 
+if typing.TYPE_CHECKING:
+    from runrun.runner import Runner
+
+from runrun.converters import registry, is_numeric_list_type
+
 T = TypeVar("T")
 
 
+class ArgumentSpec:
+    """What is declared of an argument, shared by all the copies of the argument.
+
+    It can't be changed, except for the converter resolved once by the
+    command schema when none was given.
+    """
+
+    __slots__ = (
+        "type",
+        "name",
+        "display_name",
+        "description",
+        "aliases",
+        "short",
+        "position",
+        "required",
+        "default_value",
+        "mutable_default",
+        "compact",
+        "converter",
+    )
+
+    type: type
+    name: str
+    display_name: str
+    description: str
+    aliases: list[str]
+    short: Optional[str]
+    position: Optional[int]
+    required: bool
+    default_value: object
+    mutable_default: bool
+    compact: bool
+    converter: Optional[Callable[[str], object]]
+
+    def __init__(
+        self,
+        t: type,
+        name: str,
+        display_name: str,
+        description: str,
+        aliases: list[str],
+        short: Optional[str],
+        position: Optional[int],
+        required: bool,
+        default_value: object,
+        converter: Optional[Callable[[str], object]],
+        compact: bool = False,
+    ) -> None:
+        init = object.__setattr__
+        init(self, "type", t)
+        init(self, "name", name)
+        init(self, "display_name", display_name)
+        init(self, "description", description)
+        init(self, "aliases", aliases)
+        init(self, "short", short)
+        init(self, "position", position)
+        init(self, "required", required)
+        init(self, "default_value", default_value)
+        init(self, "converter", converter)
+        init(self, "compact", compact)
+
+        # a default that can be modified is copied before it is given out
+        init(
+            self,
+            "mutable_default",
+            default_value is not None
+            and not isinstance(default_value, IMMUTABLE_TYPES),
+        )
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"Can't set '{name}', the argument spec is immutable")
+
+    def __reduce__(self):
+        # copied and pickled through the constructor, setattr is refused
+        return (
+            ArgumentSpec,
+            (
+                self.type,
+                self.name,
+                self.display_name,
+                self.description,
+                self.aliases,
+                self.short,
+                self.position,
+                self.required,
+                self.default_value,
+                self.converter,
+                self.compact,
+            ),
+        )
+
+    def resolve_converter(self) -> None:
+        if self.converter is not None:
+            return
+
+        # other compact types are refused when the command is validated
+        if self.compact and is_numeric_list_type(self.type):
+            converter = registry.array_converter(self.type)
+        else:
+            converter = registry.resolve(self.type)
+
+        object.__setattr__(self, "converter", converter)
+
+
+# defaults of these types are shared by all the copies of an argument
+IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, tuple, frozenset, Enum)
+
+
 class Argument(Generic[T]):
 
+    # the spec is shared, a copy of an argument only owns its value
+    __slots__ = ("spec", "_value")
+
     def __init__(
         self,
         t: type[T],
@@ -20,39 +138,91 @@ class Argument(Generic[T]):
         default_value: T = None,  # type: ignore
         position: Optional[int] = None,
         required: bool = True,
-        # str_to_type: Optional[Callable[[str], T]] = None,
+        converter: Optional[Callable[[str], T]] = None,
+        compact: bool = False,
     ) -> None:
 
-        self.type = t
-
         if display_name is None:
             display_name = name
 
-        self.name = name
-        self.display_name = display_name
-        self.description = description
+        # an argument with a default is never required
+        if default_value is not None:
+            required = False
+
+        self.spec = ArgumentSpec(
+            t,
+            name,
+            display_name,
+            description,
+            aliases if aliases is not None else [],
+            short,
+            position,
+            required,
+            default_value,
+            # resolved with the command schema if not given
+            converter,
+            # list[int] and list[float] values kept in an array.array
+            compact,
+        )
 
-        self.aliases = aliases if aliases is not None else []
-        self.short = short
-        self.position = position
+        # value will be populated later, or is the default
+        self._value: T = default_value
 
-        if default_value is not None:
-            self.default_value: T = default_value
-            self.required = False
-            self._value: T = default_value
-        else:
-            self.required = required
+    @property
+    def type(self) -> type[T]:
+        return self.spec.type
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    @property
+    def display_name(self) -> str:
+        return self.spec.display_name
 
-            # value will be populated later
-            self._value: T = None  # type: ignore
+    @property
+    def description(self) -> str:
+        return self.spec.description
+
+    @property
+    def aliases(self) -> list[str]:
+        return self.spec.aliases
 
-        # self.str_to_type = str_to_type
+    @property
+    def short(self) -> Optional[str]:
+        return self.spec.short
+
+    @property
+    def position(self) -> Optional[int]:
+        return self.spec.position
+
+    @property
+    def required(self) -> bool:
+        return self.spec.required
+
+    @property
+    def default_value(self) -> T:
+        return self.spec.default_value
+
+    @property
+    def converter(self) -> Optional[Callable[[str], T]]:
+        return self.spec.converter
+
+    @property
+    def compact(self) -> bool:
+        return self.spec.compact
 
     @property
     def value(self) -> T:
-        if self._value is None:
+        value = self._value
+        if value is None:
             raise Exception("_value was never set")
-        return self._value
+
+        # the default is shared by every copy, this one gets its own
+        if value is self.spec.default_value and self.spec.mutable_default:
+            value = self._value = copy.deepcopy(value)
+
+        return value
 
     @value.setter
     def value(self, value: T):
@@ -60,6 +230,17 @@ class Argument(Generic[T]):
             raise Exception("value cannot be None")
         self._value = value
 
+    def reset(self) -> None:
+        """Put the value back to the default, or unset it when there is none"""
+        self._value = self.spec.default_value
+
+    def clone(self) -> "Argument[T]":
+        """Copy of the argument with its own value, the spec is shared"""
+        argument = Argument.__new__(Argument)
+        argument.spec = self.spec
+        argument._value = self._value
+        return argument
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, self.__class__):
             return False
@@ -70,10 +251,210 @@ class Argument(Generic[T]):
         return str(self.value)
 
 
+def build_argument_index(
+    arguments: Sequence[Union[Argument, ArgumentSpec]],
+) -> dict[str, int]:
+    """Maps every case folded '--name', '--alias' and '-short' to the position of its argument"""
+
+    index: dict[str, int] = {}
+
+    for i, argument in enumerate(arguments):
+        keys = ["--" + argument.name.casefold()]
+        keys += ["--" + alias.casefold() for alias in argument.aliases]
+        if argument.short is not None:
+            keys.append("-" + argument.short.casefold())
+
+        for key in keys:
+            other = index.get(key)
+            if other is not None and other != i:
+                from runrun.exceptions import ValidationException
+
+                raise ValidationException(
+                    f"'{key}' is used by both '{arguments[other].name}' and '{argument.name}'"
+                )
+            index[key] = i
+
+    return index
+
+
+class LazyCommand:
+    """Sub command declared by its class or a factory.
+
+    The command is only instantiated the first time it is accessed on its
+    parent, the parser selects it by the declared name and aliases until then.
+    The name defaults to the attribute name, the created command must have the
+    same name.
+    """
+
+    # lazy commands instantiated in the process, what was built from a tree
+    # compares it to know when it is stale
+    created = 0
+
+    def __init__(
+        self,
+        factory: Callable[[], "BaseCommand"],
+        name: Optional[str] = None,
+        aliases: Optional[list[str]] = None,
+    ) -> None:
+        self.factory = factory
+        self.name = name
+        self.aliases = aliases if aliases is not None else []
+        self.attribute: Optional[str] = None
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.attribute = name
+        if self.name is None:
+            self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        command = self.factory()
+
+        # the help, the index and the dispatch must agree on the name
+        if command.command_name != self.name:
+            from runrun.exceptions import ValidationException
+
+            raise ValidationException(
+                f"Lazy command '{self.attribute}' is declared as '{self.name}'"
+                f" but its command is named '{command.command_name}'"
+            )
+
+        # keep it on the instance, the descriptor is not used again after that
+        instance.__dict__[self.attribute] = command
+        LazyCommand.created += 1
+
+        return command
+
+
+class SubCommandSlot:
+    """Attribute holding a sub command, with the names it can be called by"""
+
+    def __init__(
+        self, attribute: str, name: str, aliases: list[str], lazy: bool = False
+    ) -> None:
+        self.attribute = attribute
+        self.name = name
+        self.aliases = aliases
+        self.lazy = lazy
+
+
+class SubCommandIndex:
+    """Dispatch table from the case folded names and aliases to the sub command slots"""
+
+    def __init__(self, slots: Iterable[SubCommandSlot]) -> None:
+        self.names: dict[str, SubCommandSlot] = {}
+
+        for slot in slots:
+            for name in [slot.name, *slot.aliases]:
+                # the first slot claiming a name keeps it
+                self.names.setdefault(name.casefold(), slot)
+
+        # sorted so names sharing a prefix are next to each other
+        self.sorted_names = sorted(self.names)
+
+    def get(self, name: str) -> Optional[SubCommandSlot]:
+        return self.names.get(name.casefold())
+
+    def find_prefix(self, prefix: str) -> list[SubCommandSlot]:
+        """Get every slot with a name or an alias starting with the prefix"""
+        prefix = prefix.casefold()
+        slots: list[SubCommandSlot] = []
+
+        i = bisect_left(self.sorted_names, prefix)
+        while i < len(self.sorted_names) and self.sorted_names[i].startswith(prefix):
+            slot = self.names[self.sorted_names[i]]
+            if slot not in slots:
+                slots.append(slot)
+            i += 1
+
+        return slots
+
+
+class CommandSchema:
+    """Table of the arguments and sub commands declared on a command class.
+
+    It is built once per class, so the members don't have to be looked up
+    again every time a command is instantiated, parsed or displayed.
+    """
+
+    def __init__(
+        self,
+        arguments: tuple[tuple[str, Argument], ...] = (),
+        sub_commands: tuple[SubCommandSlot, ...] = (),
+    ) -> None:
+        # (attribute name, class level argument), sorted by attribute name
+        self.arguments = arguments
+
+        # sorted by attribute name
+        self.sub_commands = sub_commands
+
+        self.argument_names = tuple(key for key, _ in arguments)
+        self.argument_specs = tuple(argument.spec for _, argument in arguments)
+        self.sub_command_attributes = tuple(slot.attribute for slot in sub_commands)
+        self.sub_command_slots = {slot.attribute: slot for slot in sub_commands}
+
+        self._sub_command_index: Optional[SubCommandIndex] = None
+        self._argument_index: Optional[dict[str, int]] = None
+
+    def get_sub_command_index(self) -> SubCommandIndex:
+        if self._sub_command_index is None:
+            self._sub_command_index = SubCommandIndex(self.sub_commands)
+        return self._sub_command_index
+
+    def get_argument_index(self) -> dict[str, int]:
+        """Positions of the class arguments by name, see build_argument_index"""
+        if self._argument_index is None:
+            self._argument_index = build_argument_index(self.argument_specs)
+        return self._argument_index
+
+    @classmethod
+    def from_class(cls, command_class: type) -> "CommandSchema":
+        members = {}
+
+        # walk the mro so subclasses override their parents
+        for klass in reversed(command_class.__mro__):
+            members.update(vars(klass))
+
+        arguments = []
+        sub_commands = []
+
+        for key, value in sorted(members.items()):
+
+            if type(value) is Argument:
+                # resolve the conversion function once for the argument
+                value.spec.resolve_converter()
+
+                arguments.append((key, value))
+
+            elif isinstance(value, BaseCommand):
+                sub_commands.append(
+                    SubCommandSlot(key, value.command_name, value.command_aliases)
+                )
+
+            elif isinstance(value, LazyCommand):
+                sub_commands.append(
+                    SubCommandSlot(key, value.name, value.aliases, lazy=True)  # type: ignore
+                )
+
+        return cls(tuple(arguments), tuple(sub_commands))
+
+
 class BaseCommand:
 
     # command_details: Optional[CommandDetails] = None
 
+    _schema: CommandSchema = CommandSchema()
+
+    # sub commands added or replaced on the instance, see __setattr__
+    _instance_sub_commands = False
+    _instance_slots: Optional[tuple[tuple[SubCommandSlot, ...], SubCommandIndex]] = None
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._schema = CommandSchema.from_class(cls)
+
     def __init__(
         self,
         name: str,
@@ -92,13 +473,33 @@ class BaseCommand:
         self.command_aliases = aliases
 
         # instanciate all arguments at the instance level
-        for key, value in inspect.getmembers(self):
-
-            if type(value) is Argument:
-                setattr(self, key, copy.deepcopy(value))
+        for key, value in self._schema.arguments:
+            setattr(self, key, value.clone())
 
         self.context = Context()
 
+    def __setattr__(self, name: str, value: object) -> None:
+        super().__setattr__(name, value)
+
+        slot = self._schema.sub_command_slots.get(name)
+
+        if slot is None:
+            changed = isinstance(value, BaseCommand)
+        else:
+            # instantiated lazy commands are still described by their slot
+            changed = not slot.lazy or not isinstance(value, BaseCommand)
+
+        if changed:
+            self.__dict__["_instance_sub_commands"] = True
+            self.__dict__["_instance_slots"] = None
+
+    def __delattr__(self, name: str) -> None:
+        super().__delattr__(name)
+
+        if name in self._schema.sub_command_slots:
+            self.__dict__["_instance_sub_commands"] = True
+            self.__dict__["_instance_slots"] = None
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, self.__class__):
             return False
@@ -114,7 +515,7 @@ class BaseCommand:
 
     def __repr__(self) -> str:
         arguments = ",".join([f"{a.name}:{a.value}" for a in self.get_arguments()])
-        sub_commands = ",".join([f"{a.command_name}" for a in self.get_sub_commands()])
+        sub_commands = ",".join([s.name for s in self.get_sub_command_slots()])
         return f"{self.__class__.__name__}(name={self.command_name}, args={arguments}, sub_cmd={sub_commands})"
 
     def run(self):
@@ -122,25 +523,142 @@ class BaseCommand:
         if help in BaseCommand.__subclasses__():
             help(self).run()
 
+    def reset(self, recursive: bool = False) -> None:
+        """Put the arguments back to their default values and clear the context.
+
+        With recursive, the sub commands already instantiated are reset too,
+        the lazy ones not created yet are left alone.
+        """
+        for argument in self.get_arguments():
+            argument.reset()
+
+        self.context = Context()
+
+        if recursive:
+            instance_members = vars(self)
+
+            for slot in self.get_sub_command_slots():
+                if slot.lazy and slot.attribute not in instance_members:
+                    continue
+
+                sub_command = getattr(self, slot.attribute)
+                if isinstance(sub_command, BaseCommand):
+                    sub_command.reset(recursive=True)
+
+    def bind(
+        self, context: "Context", values: Optional[dict[str, object]] = None
+    ) -> "BaseCommand":
+        """Cheap copy of the command with its own arguments and context.
+
+        The arguments are back to their default values, or take the value
+        given for their name. The command itself is not modified.
+        """
+        bound = copy.copy(self)
+
+        for key, value in vars(self).items():
+            if type(value) is Argument:
+                argument = value.clone()
+                argument.reset()
+                if values is not None and argument.name in values:
+                    argument._value = values[argument.name]
+                bound.__dict__[key] = argument
+
+        bound.context = context
+
+        return bound
+
+    @classmethod
+    def get_schema(cls) -> CommandSchema:
+        return cls._schema
+
     def get_sub_commands(self) -> list["BaseCommand"]:
-        sub_commands = []
+        """Get all the sub commands, lazy ones are instantiated"""
+        return [getattr(self, slot.attribute) for slot in self.get_sub_command_slots()]
+
+    def get_sub_command_slots(self) -> tuple[SubCommandSlot, ...]:
+        """Get the sub command slots without instantiating the lazy ones"""
+        if not self._instance_sub_commands:
+            return self._schema.sub_commands
+
+        return self._get_instance_slots()[0]
+
+    def _get_instance_slots(self) -> tuple[tuple[SubCommandSlot, ...], SubCommandIndex]:
+        """Slots and index of the sub commands of the instance, kept until one is assigned"""
+        if self._instance_slots is not None:
+            return self._instance_slots
+
+        instance_members = vars(self)
+        slots = []
+
+        for slot in self._schema.sub_commands:
+            if slot.attribute not in instance_members:
+                slots.append(slot)
+                continue
+
+            value = instance_members[slot.attribute]
+
+            # replaced on the instance by something that is not a command
+            if not isinstance(value, BaseCommand):
+                continue
+
+            if slot.lazy:
+                slots.append(slot)
+            else:
+                slots.append(
+                    SubCommandSlot(
+                        slot.attribute, value.command_name, value.command_aliases
+                    )
+                )
+
+        # sub commands assigned on the instance (in __init__ for example) are
+        # not part of the class schema
+        for key, value in instance_members.items():
+            if (
+                isinstance(value, BaseCommand)
+                and key not in self._schema.sub_command_slots
+            ):
+                slots.append(
+                    SubCommandSlot(key, value.command_name, value.command_aliases)
+                )
 
-        for key, value in inspect.getmembers(self):
+        slots.sort(key=lambda slot: slot.attribute)
 
-            if isinstance(value, BaseCommand):
-                sub_commands.append(value)
+        instance_slots = (tuple(slots), SubCommandIndex(slots))
+        self.__dict__["_instance_slots"] = instance_slots
 
-        return sub_commands
+        return instance_slots
+
+    def get_sub_command_index(self) -> SubCommandIndex:
+        if not self._instance_sub_commands:
+            return self._schema.get_sub_command_index()
+
+        return self._get_instance_slots()[1]
 
     def get_arguments(self) -> list[Argument]:
-        arguments = []
+        return self._get_members(
+            self._schema.argument_names, lambda x: type(x) is Argument
+        )
 
-        for key, value in inspect.getmembers(self):
+    def _get_members(self, keys: tuple[str, ...], predicate) -> list:
+        members = {}
 
-            if type(value) is Argument:
-                arguments.append(value)
+        for key in keys:
+            value = getattr(self, key, None)
+            if predicate(value):
+                members[key] = value
+
+        # members assigned on the instance (in __init__ for example) are not
+        # part of the class schema
+        extra = False
+        for key, value in vars(self).items():
+            if key not in members and predicate(value):
+                members[key] = value
+                extra = True
 
-        return arguments
+        if extra:
+            return [members[key] for key in sorted(members)]
+
+        return list(members.values())
 
 
 class BaseApplication(BaseCommand):
@@ -176,6 +694,9 @@ class Context:
         self.scoped_arguments = scoped_arguments
         self.parent_command = parent_command
 
+        # the runner running the command, set by the runner
+        self.runner: Optional["Runner"] = None
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
@@ -185,3 +706,61 @@ class Context:
             and self.scoped_arguments == other.scoped_arguments
             and self.parent_command == other.parent_command
         )
+
+
+class ParseResult:
+    """Outcome of a parse, the parsed command tree is left untouched.
+
+    It holds the commands selected from the root to the one to run, the
+    converted values of its arguments by name (defaults included) and the
+    arguments given to the parser.
+    """
+
+    def __init__(
+        self,
+        commands: tuple[BaseCommand, ...],
+        values: dict[str, object],
+        original_arguments: list[str],
+        scoped_arguments: list[str],
+    ) -> None:
+        self.commands = commands
+        self.values = values
+        self.original_arguments = original_arguments
+        self.scoped_arguments = scoped_arguments
+
+    @property
+    def command(self) -> BaseCommand:
+        """The command to run"""
+        return self.commands[-1]
+
+    @property
+    def path(self) -> list[str]:
+        """Names of the selected commands, from the root"""
+        return [command.command_name for command in self.commands]
+
+    def bind(self) -> BaseCommand:
+        """Copy of the selected command with the values set, ready to run.
+
+        Its parents are copied as well so the context can walk up to the root
+        without going through the shared commands.
+        """
+        root_command: Optional[BaseCommand] = None
+        parent_command: Optional[BaseCommand] = None
+        last = len(self.commands) - 1
+
+        for i, command in enumerate(self.commands):
+            context = Context(
+                root_command=root_command,
+                original_arguments=self.original_arguments,
+                scoped_arguments=self.scoped_arguments if i == last else [],
+                parent_command=parent_command,
+            )
+            bound = command.bind(context, self.values if i == last else None)
+
+            if root_command is None:
+                root_command = bound
+                context.root_command = bound
+
+            parent_command = bound
+
+        return parent_command  # type: ignore
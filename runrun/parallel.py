@@ -0,0 +1,145 @@
+"""Runs many command lines in a pool of threads or processes, see Runner.run_parallel"""
+
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Union
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+    FIRST_COMPLETED,
+    wait,
+)
+import itertools
+import multiprocessing
+import os
+
+from runrun.runner import BatchResult, read_lines
+
+if TYPE_CHECKING:
+    from runrun.runner import Runner
+
+# chunks waiting in the pool for each worker, more is only using memory
+PENDING_PER_WORKER = 2
+
+Chunk = list[tuple[int, Union[list[str], BatchResult]]]
+
+# runner of a worker process, set by its initializer
+_worker_runner: Optional["Runner"] = None
+
+
+class RemoteError(Exception):
+    """Error raised in a worker process, only its message comes back.
+
+    The exception itself may reference commands that can't be pickled, the
+    result keeps the name of its type in error_type.
+    """
+
+
+def run_parallel(
+    runner: "Runner",
+    invocations: Iterable[Union[str, list[str]]],
+    workers: Optional[int] = None,
+    mode: str = "thread",
+    chunk_size: int = 1,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    workers = workers or os.cpu_count() or 1
+
+    executor, run_chunk = make_executor(runner, workers, mode)
+    pending: deque[Future] = deque()
+    limit = workers * PENDING_PER_WORKER
+
+    lines = read_lines(invocations)
+
+    try:
+        while True:
+            chunk: Chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                break
+
+            pending.append(executor.submit(run_chunk, chunk))
+
+            while len(pending) >= limit:
+                yield from take_results(pending, ordered)
+
+        while pending:
+            yield from take_results(pending, ordered)
+
+    finally:
+        # stopped early, don't run what is left
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def make_executor(
+    runner: "Runner", workers: int, mode: str
+) -> tuple[Executor, Callable[[Chunk], list[BatchResult]]]:
+
+    if mode == "thread":
+        executor = ThreadPoolExecutor(max_workers=workers)
+        return executor, lambda chunk: run_chunk(runner, chunk)
+
+    if mode == "process":
+        # forked workers get the tree already imported and built, others get
+        # a pickled copy of the runner
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(runner,),
+        )
+        return executor, run_worker_chunk
+
+    raise ValueError(f"Unknown mode '{mode}', use 'thread' or 'process'")
+
+
+def take_results(pending: deque[Future], ordered: bool) -> list[BatchResult]:
+    """Wait for the oldest chunk, or for any of them when not ordered"""
+
+    if ordered:
+        return pending.popleft().result()
+
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+    results = []
+    for future in done:
+        pending.remove(future)
+        results += future.result()
+
+    return results
+
+
+def run_chunk(runner: "Runner", chunk: Chunk) -> list[BatchResult]:
+    results = []
+
+    for number, args in chunk:
+        if isinstance(args, BatchResult):
+            results.append(args)
+        else:
+            results.append(runner._run_line(number, args, bind=True))
+
+    return results
+
+
+def init_worker(runner: "Runner") -> None:
+    global _worker_runner
+    _worker_runner = runner
+
+
+def run_worker_chunk(chunk: Chunk) -> list[BatchResult]:
+    results = run_chunk(_worker_runner, chunk)  # type: ignore
+
+    for result in results:
+        if result.error is not None:
+            error_type = result.error_type
+            result.error = RemoteError(str(result.error))
+            result.error_type = error_type
+
+    return results
@@ -0,0 +1,122 @@
+"""Response files: '@path' in the arguments stands for the arguments written in the file.
+
+The file has one argument per line, lines with quotes or backslashes are
+split like a shell would. Response files can include other response files,
+'@@' at the start of an argument escapes it: '@@name' gives '@name'.
+
+Lists too long for the command line can be passed this way, big files are
+memory mapped and read one line at a time.
+"""
+
+from typing import Callable, Iterator, Optional
+import os
+
+from runrun.exceptions import ResponseFileException
+
+# files bigger than this are memory mapped instead of read at once, in bytes
+MMAP_THRESHOLD = 1024 * 1024
+
+# a line with one of these is split like a shell would
+SHELL_CHARACTERS = ("'", '"', "\\")
+
+
+def is_response_file(arg: str) -> bool:
+    return len(arg) > 1 and arg[0] == "@" and arg[1] != "@"
+
+
+def expand_response_files(
+    args: list[str], keep: Optional[Callable[[list[str]], bool]] = None
+) -> list[str]:
+    """Replace the '@path' arguments by the content of their file.
+
+    The list is given back as is when there is nothing to expand. keep is
+    given the arguments before a '@' argument, when it returns True the
+    argument is left as is for the command, like the values of streams. Only
+    the '@' arguments of the command line are kept, the ones written in
+    response files are always expanded.
+    """
+
+    if not any(arg.startswith("@") for arg in args):
+        return args
+
+    expanded: list[str] = []
+
+    for arg in args:
+        if not arg.startswith("@"):
+            expanded.append(arg)
+        elif keep is not None and keep(expanded):
+            expanded.append(arg)
+        elif not is_response_file(arg):
+            # '@@name' escapes '@name', a lone '@' is kept
+            expanded.append(arg[1:] if arg.startswith("@@") else arg)
+        else:
+            expanded += read_response_file(arg[1:], ())
+
+    return expanded
+
+
+def read_response_file(path: str, including: tuple[str, ...]) -> Iterator[str]:
+    """Give the arguments of the file, the nested response files expanded"""
+
+    real_path = os.path.realpath(path)
+    if real_path in including:
+        raise ResponseFileException(path, "it includes itself")
+
+    including = including + (real_path,)
+
+    for number, line in read_lines(path):
+        try:
+            args = split_line(line)
+        except ValueError as e:
+            raise ResponseFileException(path, f"line {number}, {e}")
+
+        for arg in args:
+            if is_response_file(arg):
+                yield from read_response_file(arg[1:], including)
+            elif arg.startswith("@@"):
+                yield arg[1:]
+            else:
+                yield arg
+
+
+def read_lines(path: str) -> Iterator[tuple[int, str]]:
+    try:
+        file = open(path, "rb")
+    except OSError as e:
+        raise ResponseFileException(path, e.strerror or str(e))
+
+    with file:
+        size = os.fstat(file.fileno()).st_size
+
+        if size < MMAP_THRESHOLD:
+            lines: Iterator[bytes] = iter(file.read().splitlines())
+        else:
+            lines = mapped_lines(file.fileno())
+
+        for number, line in enumerate(lines, 1):
+            try:
+                yield number, line.decode("utf-8").rstrip("\r")
+            except UnicodeDecodeError:
+                raise ResponseFileException(path, f"line {number} is not utf-8")
+
+
+def mapped_lines(fileno: int) -> Iterator[bytes]:
+    """Lines of a memory mapped file, only the pages being read are loaded"""
+    import mmap
+
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+        while True:
+            line = mapped.readline()
+            if not line:
+                return
+            yield line.rstrip(b"\n")
+
+
+def split_line(line: str) -> list[str]:
+    if any(c in line for c in SHELL_CHARACTERS):
+        import shlex
+
+        return shlex.split(line)
+
+    line = line.strip()
+    return [line] if line != "" else []
@@ -1,6 +1,6 @@
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
 import sys
-import asyncio
-import inspect
+from collections.abc import Coroutine
 
 from runrun.models import BaseCommand
 from runrun.command_parser import CommandParser
@@ -10,29 +10,504 @@ from runrun.exceptions import (
     BaseExceptionHandler,
 )
 
+if TYPE_CHECKING:
+    import asyncio
+    from runrun.schema_cache import SchemaCache
+
+# runner.run(["--runrun-batch", "commands.txt"]) runs every line of the file
+BATCH_FLAG = "--runrun-batch"
+
+# hidden entry point of the shell completion: __complete CURSOR [WORDS...]
+COMPLETE_COMMAND = "__complete"
+
+# --runrun-completion-script SHELL [PATH] prints or writes a completion script
+COMPLETION_SCRIPT_FLAG = "--runrun-completion-script"
+
+
+class BatchResult:
+    """Outcome of one command line of a batch"""
+
+    def __init__(
+        self,
+        line: int,
+        args: list[str],
+        exit_code: int,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        self.line = line
+        self.args = args
+        self.exit_code = exit_code
+        self.error = error
+        self.error_type = type(error).__name__ if error is not None else None
+
+    def to_dict(self) -> dict:
+        return {
+            "line": self.line,
+            "args": self.args,
+            "exit_code": self.exit_code,
+            "error": str(self.error) if self.error is not None else None,
+            "error_type": self.error_type,
+        }
+
+
+def read_lines(
+    lines: Iterable[Union[str, list[str]]],
+) -> Iterator[tuple[int, Union[list[str], BatchResult]]]:
+    """Give the arguments of every line with its number.
+
+    Strings are split like a shell would, empty lines and comments are
+    skipped and lines that can't be split give a failed result instead.
+    """
+
+    for number, line in enumerate(lines, start=1):
+        if not isinstance(line, str):
+            yield number, line
+            continue
+
+        import shlex
+
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as e:
+            yield number, BatchResult(number, [line], 2, e)
+            continue
+
+        if args:
+            yield number, args
+
+
+def get_exit_code(error: SystemExit) -> int:
+    """The exit code Python gives for the SystemExit, 0 for sys.exit()"""
+
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    return 1
+
+
+def new_event_loop(use_uvloop: bool = False) -> "asyncio.AbstractEventLoop":
+    import asyncio
+
+    if use_uvloop:
+        try:
+            import uvloop  # type: ignore
+        except ImportError:
+            pass
+        else:
+            return uvloop.new_event_loop()
+
+    return asyncio.new_event_loop()
+
+
+def close_event_loop(loop: "asyncio.AbstractEventLoop") -> None:
+    """Finish the async generators and the default executor, then close"""
+
+    try:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
+    finally:
+        loop.close()
+
 
 class Runner:
     def __init__(
         self,
         command: BaseCommand,
         exception_handler: BaseExceptionHandler = DefaultExceptionHandler(),
+        allow_abbreviations: bool = False,
+        keep_loop: bool = False,
+        uvloop: bool = False,
+        schema_cache: Optional["SchemaCache"] = None,
+        response_files: bool = False,
     ):
         self.command = command
         self.exception_handler = exception_handler
+        self.allow_abbreviations = allow_abbreviations
+
+        # expand the '@path' arguments to the content of the file, opt-in
+        self.response_files = response_files
+
+        # async commands run on one event loop kept until close()
+        self.keep_loop = keep_loop
+
+        # use uvloop for the event loops of the runner when it is installed
+        self.uvloop = uvloop
+
+        # saved when stale, so the next invocations can be served from it
+        self.schema_cache = schema_cache
+        self._schema_cache_checked = False
+
+        if schema_cache is not None:
+            schema_cache.attach(command)
+
+        self._loop: Optional["asyncio.AbstractEventLoop"] = None
+        self._loop_thread: Optional[int] = None
+
+    def __enter__(self) -> "Runner":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def with_command(self, command: BaseCommand, **changes) -> "Runner":
+        """New runner of the command with the same settings, except the changed ones"""
+
+        settings = {
+            "exception_handler": self.exception_handler,
+            "allow_abbreviations": self.allow_abbreviations,
+            "keep_loop": self.keep_loop,
+            "uvloop": self.uvloop,
+            # the cache describes the tree of this runner only
+            "schema_cache": self.schema_cache if command is self.command else None,
+            "response_files": self.response_files,
+        }
+        settings.update(changes)
+
+        return Runner(command, **settings)
+
+    def run(self, args: list[str] | None = None) -> int:
+        """Run the command matching the arguments, returns the exit code"""
 
-    def run(self, args: list[str] | None = None):
         if args is None:
             args = sys.argv[1:]
 
-        try:
-            cmd = CommandParser(self.command).parse(args)
+        if len(args) == 2 and args[0] == BATCH_FLAG:
+            return self.run_batch(args[1])
 
-            is_async = inspect.iscoroutinefunction(cmd.run)
+        if len(args) > 0 and args[0] == COMPLETE_COMMAND:
+            self.update_schema_cache()
+            return self.print_completions(args[1:])
 
-            if is_async:
-                asyncio.run(cmd.run())  # type: ignore
-            else:
-                cmd.run()
+        if len(args) in (2, 3) and args[0] == COMPLETION_SCRIPT_FLAG:
+            return self.completion_script(*args[1:])
 
+        try:
+            cmd = self._parse_and_run(args)
         except CLIException as e:
             self.exception_handler.handle_exception(e)
+            return 1
+
+        # the next help can be answered by the cache
+        if self.schema_cache is not None:
+            from runrun.builtin_command import HelpCommand
+
+            if isinstance(cmd, HelpCommand):
+                self.update_schema_cache()
+
+        return 0
+
+    def update_schema_cache(self) -> None:
+        """Save the schema cache when stale, only checked once per runner"""
+
+        if self.schema_cache is None or self._schema_cache_checked:
+            return
+
+        self._schema_cache_checked = True
+        self.schema_cache.update(self.command)
+
+    def run_isolated(self, args: list[str]) -> BatchResult:
+        """Run the arguments on a bound copy of their command.
+
+        The command tree is left untouched, nothing is kept from one run to
+        the next (see CommandParser.parse_result).
+        """
+        return self._run_line(1, args, bind=True)
+
+    def run_many(self, lines: Iterable[Union[str, list[str]]]) -> list[BatchResult]:
+        """Run every command line against the same command tree.
+
+        A line is either a list of arguments or a string split like a shell
+        would, empty lines and comments are skipped. The arguments are reset
+        before the first line and after each one, a failing line does not stop
+        the others.
+        """
+
+        results = []
+
+        # values left by an earlier run must not reach the first line
+        self.command.reset(recursive=True)
+
+        for number, args in read_lines(lines):
+            if isinstance(args, BatchResult):
+                results.append(args)
+            else:
+                results.append(self._run_line(number, args))
+
+        return results
+
+    def run_parallel(
+        self,
+        invocations: Iterable[Union[str, list[str]]],
+        workers: Optional[int] = None,
+        mode: str = "thread",
+        chunk_size: int = 1,
+        ordered: bool = True,
+    ) -> Iterator[BatchResult]:
+        """Run the command lines in a pool of threads or processes.
+
+        Lines are read like with run_many and submitted by chunks, only a few
+        chunks per worker are pending at once. The results are yielded in the
+        submission order, or as soon as they complete when ordered is False.
+        The command tree is shared, each line runs on a bound copy of its
+        command (see CommandParser.parse_result).
+        """
+
+        from runrun.parallel import run_parallel
+
+        return run_parallel(self, invocations, workers, mode, chunk_size, ordered)
+
+    def run_batch(self, source: str) -> int:
+        """Run the command lines of a file, or of stdin with '-'.
+
+        A json summary of every line is written to stderr, the exit code is
+        1 if any of them failed.
+        """
+
+        if source == "-":
+            results = self.run_many(sys.stdin)
+        else:
+            with open(source, encoding="utf-8") as file:
+                results = self.run_many(file)
+
+        failed = [result for result in results if result.exit_code != 0]
+
+        import json
+
+        summary = {
+            "total": len(results),
+            "failed": len(failed),
+            "results": [result.to_dict() for result in results],
+        }
+        sys.stdout.flush()
+        print(json.dumps(summary), file=sys.stderr)
+
+        return 1 if failed else 0
+
+    def run_concurrent(
+        self, invocations: Iterable[Union[str, list[str]]], limit: int = 10
+    ) -> list[BatchResult]:
+        """Run the command lines concurrently on one event loop.
+
+        At most limit lines run at once, an I/O bound batch takes about the
+        time of its slowest lines. Lines are read like with run_many, each one
+        runs on a bound copy of its command (see CommandParser.parse_result).
+        Sync commands block the loop while they run.
+        """
+
+        import asyncio
+
+        lines = list(read_lines(invocations))
+
+        async def run_all() -> list[BatchResult]:
+            semaphore = asyncio.Semaphore(limit)
+            return await asyncio.gather(
+                *(self._run_line_async(n, args, semaphore) for n, args in lines)
+            )
+
+        # a loop of its own when the runner does not keep one
+        if not self.keep_loop:
+            loop = new_event_loop(self.uvloop)
+            try:
+                return loop.run_until_complete(run_all())
+            finally:
+                close_event_loop(loop)
+
+        return self._run_coroutine(run_all())  # type: ignore
+
+    def get_loop(self) -> "asyncio.AbstractEventLoop":
+        """Event loop kept by the runner, created on the first use"""
+
+        if self._loop is None or self._loop.is_closed():
+            import threading
+
+            self._loop = new_event_loop(self.uvloop)
+            self._loop_thread = threading.get_ident()
+
+        return self._loop
+
+    def close(self) -> None:
+        """Close the kept event loop, a new one is created if needed again"""
+
+        if self._loop is not None:
+            loop, self._loop = self._loop, None
+            close_event_loop(loop)
+
+    def print_completions(self, args: list[str]) -> int:
+        """Print the candidates of a word, one per line.
+
+        The first argument is the index of the word to complete in the others,
+        it can be after the last one to start a new word.
+        """
+
+        from runrun.completion import complete_at
+
+        try:
+            cursor = int(args[0])
+        except (IndexError, ValueError):
+            return 2
+
+        # nothing to suggest is better than a trace in the middle of the prompt
+        try:
+            candidates = complete_at(self.command, args[1:], cursor)
+        except Exception:
+            return 1
+
+        sys.stdout.write("".join(candidate + "\n" for candidate in candidates))
+
+        return 0
+
+    def completion_script(self, shell: str, path: Optional[str] = None) -> int:
+        """Print the bash, zsh or fish completion script, or write it to a file.
+
+        The file is only written again when the command tree changed.
+        """
+
+        from runrun.completion_scripts import (
+            SHELLS,
+            generate_completion_script,
+            write_completion_script,
+        )
+
+        if shell not in SHELLS:
+            print(f"Unknown shell '{shell}', use one of {', '.join(SHELLS)}")
+            return 2
+
+        if path is None:
+            sys.stdout.write(generate_completion_script(self.command, shell))
+        else:
+            write_completion_script(self.command, shell, path)
+
+        return 0
+
+    def serve(self, socket_path: str, idle_timeout: float | None = 600.0) -> None:
+        """Keep the command tree warm and run it for clients of a unix socket.
+
+        Clients connect with python -m runrun.client SOCKET_PATH [args...], the
+        server stops after idle_timeout seconds without clients.
+        """
+
+        from runrun.daemon import DaemonServer
+
+        DaemonServer(self, socket_path, idle_timeout=idle_timeout).serve()
+
+    def _parse_and_run(self, args: list[str], bind: bool = False) -> BaseCommand:
+        cmd = self._parse(args, bind)
+        self._run_command(cmd)
+        return cmd
+
+    def _parse(self, args: list[str], bind: bool = False) -> BaseCommand:
+        parser = CommandParser(
+            self.command,
+            allow_abbreviations=self.allow_abbreviations,
+            response_files=self.response_files,
+        )
+
+        # leave the shared tree untouched, run a copy of the command
+        if bind:
+            return parser.parse_result(args).bind()
+
+        return parser.parse(args)
+
+    def _run_command(self, cmd: BaseCommand) -> None:
+        cmd.context.runner = self
+        result = cmd.run()
+
+        # async commands give a coroutine to run
+        if isinstance(result, Coroutine):
+            self._run_coroutine(result)
+
+    def _run_coroutine(self, coroutine: Coroutine) -> object:
+        import asyncio
+
+        if self.keep_loop:
+            import threading
+
+            loop = self.get_loop()
+
+            # the kept loop belongs to the thread that created it
+            if self._loop_thread == threading.get_ident():
+                return loop.run_until_complete(coroutine)
+
+        return asyncio.run(coroutine)
+
+    def _run_line(
+        self, number: int, args: list[str], bind: bool = False
+    ) -> BatchResult:
+        cmd: Optional[BaseCommand] = None
+
+        try:
+            cmd = self._parse(args, bind)
+            self._run_command(cmd)
+            result = BatchResult(number, args, 0)
+        except (SystemExit, Exception) as e:
+            result = self._error_result(number, args, e)
+
+            # when the parser failed, it tells where it stopped
+            if cmd is None and isinstance(e, CLIException):
+                cmd = getattr(e, "command", None)
+
+        if not bind:
+            self._reset(cmd)
+
+        return result
+
+    async def _run_line_async(
+        self,
+        number: int,
+        args: Union[list[str], BatchResult],
+        semaphore: "asyncio.Semaphore",
+    ) -> BatchResult:
+        if isinstance(args, BatchResult):
+            return args
+
+        async with semaphore:
+            try:
+                cmd = (
+                    CommandParser(
+                        self.command,
+                        allow_abbreviations=self.allow_abbreviations,
+                        response_files=self.response_files,
+                    )
+                    .parse_result(args)
+                    .bind()
+                )
+
+                cmd.context.runner = self
+                result = cmd.run()
+                if isinstance(result, Coroutine):
+                    await result
+
+            except (SystemExit, Exception) as e:
+                return self._error_result(number, args, e)
+
+        return BatchResult(number, args, 0)
+
+    def _error_result(
+        self, number: int, args: list[str], error: BaseException
+    ) -> BatchResult:
+        if isinstance(error, CLIException):
+            self.exception_handler.handle_exception(error)
+            return BatchResult(number, args, 1, error)
+
+        if isinstance(error, SystemExit):
+            code = get_exit_code(error)
+            return BatchResult(number, args, code, error if code else None)
+
+        import traceback
+
+        traceback.print_exc()
+        return BatchResult(number, args, 1, error)
+
+    def _reset(self, cmd: Optional[BaseCommand]) -> None:
+        """Reset the commands the parser went through for the next line"""
+
+        # don't know where it stopped, reset everything instantiated
+        if cmd is None:
+            self.command.reset(recursive=True)
+            return
+
+        while cmd is not None:
+            parent = cmd.context.parent_command
+            cmd.reset()
+            cmd = parent
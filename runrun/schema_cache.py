@@ -0,0 +1,417 @@
+"""Cache of the command tree in a file, to answer help and completion without importing it.
+
+The file holds what the help shows of every command: names, aliases, display
+names, descriptions and the arguments with their types, positions, shorts and
+defaults. Its key is the version of the application and a hash of its source
+files, a cache with another key is stale and ignored. The key is alone on the
+first line, the freshness is checked without parsing the tree.
+
+    cache = SchemaCache(".myapp.cache", version=__version__, sources=["myapp"])
+
+    # before importing the commands
+    exit_code = cache.serve(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from myapp.commands import App
+    sys.exit(Runner(App(), schema_cache=cache).run())
+"""
+
+from enum import Enum
+from typing import Iterable, Optional
+import os
+import sys
+
+from runrun.models import (
+    BaseCommand,
+    Argument,
+    Context,
+    SubCommandSlot,
+    SubCommandIndex,
+)
+from runrun.converters import is_path_type
+
+# changing the content of the cache must change the keys
+CACHE_VERSION = "2"
+
+# name of the help commands, only the arguments with one can be served
+HELP_NAME = "help"
+
+
+def describe_argument(argument: Argument) -> dict:
+    """Get the details of an argument, the ones printed by the json help and more"""
+
+    t = argument.type
+    choices = None
+    if isinstance(t, type) and issubclass(t, Enum):
+        choices = list(t.__members__)
+
+    return {
+        "name": argument.name,
+        "display_name": argument.display_name,
+        "description": argument.description,
+        "position": argument.position,
+        "required": argument.required,
+        "short": argument.short,
+        "type": getattr(t, "__name__", str(t)),
+        "aliases": argument.aliases,
+        "choices": choices,
+        "path": is_path_type(t),
+        "default": to_json_value(getattr(argument, "default_value", None)),
+    }
+
+
+def describe_command(command: BaseCommand) -> dict:
+    return {
+        "name": command.command_name,
+        "display_name": command.command_display_name,
+        "description": command.command_description,
+        "aliases": command.command_aliases,
+    }
+
+
+def describe_application(command: BaseCommand) -> Optional[dict]:
+    if not hasattr(command, "application_version"):
+        return None
+
+    return {
+        **describe_command(command),
+        "version": command.application_version,
+        "author": command.application_author,
+        "website": command.application_website,
+        "copyright": command.application_copyright,
+    }
+
+
+def describe_tree(command: BaseCommand) -> dict:
+    """Get the details of the command and of all its sub commands"""
+
+    tree = describe_node(command, set())
+    tree["application"] = describe_application(command)
+    return tree
+
+
+def describe_node(command: BaseCommand, visiting: set[int]) -> dict:
+    from runrun.builtin_command import HelpCommand
+
+    node = describe_command(command)
+    node["help"] = isinstance(command, HelpCommand)
+    node["arguments"] = [describe_argument(arg) for arg in command.get_arguments()]
+    node["sub_commands"] = []
+
+    # a command containing itself would never end
+    if id(command) in visiting:
+        return node
+    visiting.add(id(command))
+
+    for sub_command in command.get_sub_commands():
+        node["sub_commands"].append(describe_node(sub_command, visiting))
+
+    visiting.discard(id(command))
+
+    return node
+
+
+def to_json_value(value: object) -> object:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, (list, tuple, set)) or hasattr(value, "typecode"):
+        # compact lists are array.array
+        return [to_json_value(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): to_json_value(v) for k, v in value.items()}
+    return str(value)
+
+
+def cache_key(version: str, sources: Iterable[str]) -> str:
+    """Hash of the version and of the source files, directories are walked for .py files"""
+
+    import hashlib
+
+    digest = hashlib.sha256(f"{CACHE_VERSION}\0{version}\0".encode())
+
+    for path in sorted(source_files(sources)):
+        digest.update(path.encode() + b"\0")
+        try:
+            with open(path, "rb") as file:
+                digest.update(file.read())
+        except OSError:
+            # a missing file is part of the key too
+            digest.update(b"\1")
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def source_files(sources: Iterable[str]) -> list[str]:
+    files = []
+
+    for source in sources:
+        if not os.path.isdir(source):
+            files.append(source)
+            continue
+
+        for directory, directories, names in os.walk(source):
+            directories[:] = [d for d in directories if d != "__pycache__"]
+            files += [os.path.join(directory, n) for n in names if n.endswith(".py")]
+
+    return files
+
+
+class CachedArgument:
+    """Argument read from the cache, its type is a stand in with the same name.
+
+    Enum stand ins have the same members, so the help and the completion can
+    list them.
+    """
+
+    def __init__(self, data: dict) -> None:
+        self.name: str = data["name"]
+        self.display_name: str = data["display_name"]
+        self.description: str = data["description"]
+        self.position: Optional[int] = data["position"]
+        self.required: bool = data["required"]
+        self.short: Optional[str] = data["short"]
+        self.aliases: list[str] = data["aliases"]
+        self.choices: Optional[list[str]] = data["choices"]
+        self.path: bool = data["path"]
+        self.default_value = data["default"]
+        self.type = stand_in_type(data["type"], self.choices)
+
+
+_stand_in_types: dict[tuple, type] = {}
+
+
+def stand_in_type(name: str, choices: Optional[list[str]]) -> type:
+    if name == "bool":
+        return bool
+
+    key = (name, tuple(choices) if choices is not None else None)
+
+    if key not in _stand_in_types:
+        if choices is not None:
+            _stand_in_types[key] = Enum(name, choices)  # type: ignore
+        else:
+            _stand_in_types[key] = type(name, (), {})
+
+    return _stand_in_types[key]
+
+
+class CachedCommand:
+    """Command read from the cache, it can be shown and completed but not run"""
+
+    def __init__(self, data: dict, parent: Optional["CachedCommand"] = None) -> None:
+        self.command_name: str = data["name"]
+        self.command_display_name: str = data["display_name"]
+        self.command_description: str = data["description"]
+        self.command_aliases: list[str] = data["aliases"]
+        self.is_help: bool = data["help"]
+
+        root = self if parent is None else parent.context.root_command
+        self.context = Context(root_command=root, parent_command=parent)
+
+        application = data.get("application")
+        if application is not None:
+            self.application_version = application["version"]
+            self.application_author = application["author"]
+            self.application_website = application["website"]
+            self.application_copyright = application["copyright"]
+
+        self._arguments = [CachedArgument(arg) for arg in data["arguments"]]
+        self._sub_commands = [CachedCommand(sub, self) for sub in data["sub_commands"]]
+
+        self._slots = tuple(
+            SubCommandSlot(cmd.command_name, cmd.command_name, cmd.command_aliases)
+            for cmd in self._sub_commands
+        )
+        self._index: Optional[SubCommandIndex] = None
+
+    def get_arguments(self) -> list[CachedArgument]:
+        return list(self._arguments)
+
+    def get_sub_commands(self) -> list["CachedCommand"]:
+        return list(self._sub_commands)
+
+    def get_sub_command_slots(self) -> tuple[SubCommandSlot, ...]:
+        return self._slots
+
+    def get_sub_command_index(self) -> SubCommandIndex:
+        if self._index is None:
+            self._index = SubCommandIndex(self._slots)
+        return self._index
+
+    def get_sub_command(self, slot: SubCommandSlot) -> "CachedCommand":
+        return self._sub_commands[self._slots.index(slot)]
+
+
+# caches attached to command trees by their runner, by the id of the command
+_attached: dict[int, tuple[BaseCommand, "SchemaCache"]] = {}
+
+ATTACHED_CACHE_SIZE = 16
+
+
+def get_attached_cache(command: BaseCommand) -> Optional["SchemaCache"]:
+    attached = _attached.get(id(command))
+    if attached is not None and attached[0] is command:
+        return attached[1]
+    return None
+
+
+class SchemaCache:
+    """Command tree saved in a file, see the module documentation"""
+
+    def __init__(self, path: str, version: str = "", sources: Iterable[str] = ()):
+        self.path = path
+        self.version = version
+        self.sources = list(sources)
+
+        self._key: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        if self._key is None:
+            self._key = cache_key(self.version, self.sources)
+        return self._key
+
+    def read(self) -> Optional[dict]:
+        """Get the saved tree, or None when there is none or when it is stale"""
+
+        import json
+
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                if file.readline().rstrip("\n") != self.key:
+                    return None
+                tree = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        return tree if isinstance(tree, dict) else None
+
+    def is_fresh(self) -> bool:
+        """Compare the key on the first line, the tree is not parsed"""
+
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return file.readline().rstrip("\n") == self.key
+        except (OSError, ValueError):
+            return False
+
+    def load(self) -> Optional[CachedCommand]:
+        tree = self.read()
+        if tree is None:
+            return None
+        return CachedCommand(tree)
+
+    def attach(self, command: BaseCommand) -> None:
+        """Describe the command tree, the suggestions read it instead of creating lazy commands"""
+
+        # forget the oldest one when full
+        if len(_attached) >= ATTACHED_CACHE_SIZE and id(command) not in _attached:
+            del _attached[next(iter(_attached))]
+        _attached[id(command)] = (command, self)
+
+    def save(self, command: BaseCommand) -> None:
+        import json
+
+        tree = describe_tree(command)
+
+        # replace the file at once, another process may be reading it
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(self.key + "\n")
+            json.dump(tree, file, separators=(",", ":"))
+        os.replace(temporary_path, self.path)
+
+    def update(self, command: BaseCommand) -> bool:
+        """Save the tree when the cache is stale, returns True when it was written"""
+
+        if self.is_fresh():
+            return False
+
+        # the cache is only a shortcut, the command still has to run
+        try:
+            self.save(command)
+        except OSError:
+            return False
+
+        return True
+
+    def serve(self, args: list[str]) -> Optional[int]:
+        """Answer the completion and help requests from the cache.
+
+        Returns the exit code, or None when the arguments must be run by the
+        real command tree: the cache is stale or they are not a help or a
+        completion request.
+        """
+
+        from runrun.runner import COMPLETE_COMMAND
+
+        # the cache is only read for the requests it can answer
+        if len(args) > 0 and args[0] == COMPLETE_COMMAND:
+            root = self.load()
+            if root is None:
+                return None
+            return serve_completion(root, args[1:])
+
+        if not is_help_request(args):
+            return None
+
+        root = self.load()
+        if root is None:
+            return None
+        return serve_help(root, args)
+
+
+def is_help_request(args: list[str]) -> bool:
+    """Cheap check of a help command in the arguments, before reading the cache"""
+    return any(arg.casefold() == HELP_NAME for arg in args)
+
+
+def serve_completion(root: CachedCommand, args: list[str]) -> int:
+    from runrun.completion import complete_at
+
+    try:
+        cursor = int(args[0])
+    except (IndexError, ValueError):
+        return 2
+
+    candidates = complete_at(root, args[1:], cursor)  # type: ignore
+    sys.stdout.write("".join(candidate + "\n" for candidate in candidates))
+
+    return 0
+
+
+def serve_help(root: CachedCommand, args: list[str]) -> Optional[int]:
+    from runrun.builtin_command import HelpCommand
+    from runrun.command_parser import CommandParser
+    from runrun.exceptions import CLIException
+
+    node = root
+    i = 0
+    while not node.is_help:
+        if i == len(args):
+            return None
+
+        slot = node.get_sub_command_index().get(args[i])
+        if slot is None:
+            return None
+
+        node = node.get_sub_command(slot)
+        i += 1
+
+    help_command = HelpCommand()
+
+    # the real command tree gives the errors, with suggestions
+    try:
+        cmd = CommandParser(
+            help_command, parent_command=node.context.parent_command  # type: ignore
+        ).parse(args[i:])
+    except CLIException:
+        return None
+
+    cmd.run()
+
+    return 0
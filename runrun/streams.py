@@ -0,0 +1,110 @@
+"""Stream[T]: list arguments whose items are read and converted one at a time.
+
+The value of the argument is where the items come from:
+
+- '-' reads stdin, one item per line
+- '@path' reads the file, one item per line
+- anything else is a list of comma separated items, like list[T]
+
+Empty lines are skipped. Nothing is read before the command iterates over
+the value, so millions of items can go through in constant memory.
+"""
+
+from typing import Callable, Generic, Iterator, Optional, TypeVar
+import typing
+import sys
+
+# the exceptions are imported when raised, they need the models which need
+# the converters importing this module
+
+T = TypeVar("T")
+
+
+class Stream(Generic[T]):
+    """Iterator over the converted items of a stream argument, it can be read once"""
+
+    def __init__(self, source: str, convert: Callable[[str], T]) -> None:
+        self.source = source
+        self.convert = convert
+
+        # number of the last line read, or of the last item of a plain value
+        self.line = 0
+
+        self._lines: Optional[Iterator[str]] = None
+        self._file = None
+
+    @property
+    def name(self) -> str:
+        """Where the items come from, for the error messages"""
+        if self.source == "-":
+            return "<stdin>"
+        if is_file_source(self.source):
+            return self.source[1:]
+        return "<value>"
+
+    def __iter__(self) -> "Stream[T]":
+        return self
+
+    def __next__(self) -> T:
+        if self._lines is None:
+            self._lines = self._open()
+
+        for text in self._lines:
+            self.line += 1
+
+            text = text.rstrip("\r\n")
+            if text.strip() == "":
+                continue
+
+            try:
+                return self.convert(text)
+            except ValueError:
+                from runrun.exceptions import InvalidStreamValueException
+
+                self.close()
+                raise InvalidStreamValueException(self.name, self.line, text)
+
+        self.close()
+        raise StopIteration
+
+    def _open(self) -> Iterator[str]:
+        if self.source == "-":
+            return iter(sys.stdin)
+
+        if is_file_source(self.source):
+            try:
+                self._file = open(self.source[1:], encoding="utf-8")
+            except OSError as e:
+                from runrun.exceptions import StreamException
+
+                raise StreamException(self.name, e.strerror or str(e))
+            return iter(self._file)
+
+        from runrun.converters import split_values, strip_brackets
+
+        # '@@' escapes a value starting with '@'
+        value = self.source[1:] if self.source.startswith("@@") else self.source
+        return iter(split_values(strip_brackets(value)))
+
+    def close(self) -> None:
+        """Close the file being read, stdin is left open"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "Stream[T]":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"Stream({self.source!r})"
+
+
+def is_file_source(source: str) -> bool:
+    return len(source) > 1 and source[0] == "@" and source[1] != "@"
+
+
+def is_stream_type(t: object) -> bool:
+    return t is Stream or typing.get_origin(t) is Stream
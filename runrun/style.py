@@ -0,0 +1,20 @@
+class _LazyStyle:
+    """Stands for one of colorama's Fore, Back or Style, imported on first use"""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __getattr__(self, attribute: str) -> str:
+        import colorama
+
+        value = getattr(getattr(colorama, self._name), attribute)
+
+        # next lookups won't go through __getattr__
+        setattr(self, attribute, value)
+
+        return value
+
+
+Fore = _LazyStyle("Fore")
+Back = _LazyStyle("Back")
+Style = _LazyStyle("Style")
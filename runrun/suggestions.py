@@ -0,0 +1,356 @@
+"""Suggestions of what was meant by a typo.
+
+The names of the command where the typo was made are compared one by one,
+without instantiating its lazy sub commands. When nothing matches, the names
+of the whole tree are searched: they are kept in BK-trees, a search only
+compares the typo with a few of them. Every name knows the full path of its
+command, so a typo can be matched with a name declared on another level: "did
+you mean app db migrate --dry-run".
+
+The tree is read from the schema cache given to the runner when it is fresh.
+Otherwise the commands are walked, a lazy command not instantiated yet is read
+from the schema of its class, like the completion does.
+"""
+
+from typing import Any, Iterator, Optional
+import heapq
+import threading
+
+# typos further away than this are not suggested
+MAX_DISTANCE = 2
+
+
+class BKTree:
+    """Metric tree of words by their Levenshtein distance.
+
+    The children of a node are keyed by their distance to it, by the triangle
+    inequality only the children within max_distance of the distance between
+    the node and the searched word can hold a match.
+    """
+
+    def __init__(self) -> None:
+        # word, values, children by distance
+        self.root: Optional[tuple[str, list, dict[int, tuple]]] = None
+
+    def add(self, word: str, value: Any) -> None:
+        import Levenshtein
+
+        if self.root is None:
+            self.root = (word, [value], {})
+            return
+
+        node = self.root
+        while True:
+            distance = Levenshtein.distance(word, node[0])
+            if distance == 0:
+                node[1].append(value)
+                return
+
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (word, [value], {})
+                return
+
+            node = child
+
+    def search(self, word: str, max_distance: int) -> list[tuple[int, list]]:
+        """Get the values of each word within max_distance, with its distance"""
+        import Levenshtein
+
+        results: list[tuple[int, list]] = []
+        stack = [self.root] if self.root is not None else []
+
+        while len(stack) > 0:
+            node_word, values, children = stack.pop()
+            distance = Levenshtein.distance(word, node_word)
+
+            if distance <= max_distance:
+                results.append((distance, values))
+
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+
+        return results
+
+
+class Suggestion:
+    """A command or an argument, with the command declaring it and its full path.
+
+    The target of a lazy command not instantiated yet is a view of its class,
+    or its slot when it is made by another factory.
+    """
+
+    def __init__(
+        self,
+        path: tuple[str, ...],
+        owner: Any,
+        target: Any,
+        order: int,
+        is_argument: bool,
+    ):
+        self.path = path
+        self.owner = owner
+        self.target = target
+        self.is_argument = is_argument
+
+        # position in the tree, to keep the suggestions in declaration order
+        self.order = order
+
+    @property
+    def text(self) -> str:
+        """The full command line of the suggestion"""
+        if self.is_argument:
+            return " ".join(self.path + ("--" + self.target.name,))
+        return " ".join(self.path)
+
+
+class SuggestionIndex:
+    """Names, aliases and shorts of a command and of everything under it.
+
+    Anything with the attributes of a command can be indexed, like the tree
+    read from a SchemaCache. The sub commands of help commands are left out,
+    they are the same at every level. Lazy commands not instantiated yet are
+    read from the schema of their class, the ones made by another factory are
+    only indexed by their names.
+    """
+
+    def __init__(self, command: Any) -> None:
+        self.commands = BKTree()
+        self.arguments = BKTree()
+        self.shorts: dict[str, list[Suggestion]] = {}
+
+        self._count = 0
+        self._add(command, (command.command_name,), set())
+
+    def _add(self, command: Any, path: tuple[str, ...], visiting: set[int]) -> None:
+        # a command containing itself would never end, the views of a class
+        # are new objects every time
+        key = id(getattr(command, "command_class", command))
+        if key in visiting:
+            return
+        visiting.add(key)
+
+        for argument in command.get_arguments():
+            suggestion = self._suggestion(path, command, argument, True)
+
+            for name in {
+                argument.name.casefold(),
+                *map(str.casefold, argument.aliases),
+            }:
+                self.arguments.add(name, suggestion)
+
+            if argument.short is not None:
+                short = argument.short.casefold()
+                self.shorts.setdefault(short, []).append(suggestion)
+
+        for slot in command.get_sub_command_slots():
+            sub_command = get_created_sub_command(command, slot)
+            sub_path = path + (slot.name,)
+            target = sub_command if sub_command is not None else slot
+            suggestion = self._suggestion(sub_path, command, target, False)
+
+            for name in {name.casefold() for name in [slot.name, *slot.aliases]}:
+                self.commands.add(name, suggestion)
+
+            if sub_command is not None and not is_help(sub_command):
+                self._add(sub_command, sub_path, visiting)
+
+        visiting.discard(key)
+
+    def _suggestion(
+        self, path: tuple[str, ...], owner: Any, target: Any, is_argument: bool
+    ) -> Suggestion:
+        self._count += 1
+        return Suggestion(path, owner, target, self._count, is_argument)
+
+    def search_arguments(
+        self, word: str, max_distance: int = MAX_DISTANCE
+    ) -> Iterator[Suggestion]:
+        """Get the arguments close to '--word', or having the short of '-w'"""
+
+        if word.startswith("-") and not word.startswith("--"):
+            return iter(self.shorts.get(word[1:].casefold(), []))
+
+        word = word.removeprefix("--").casefold()
+        return ranked(self.arguments.search(word, max_distance))
+
+    def search_commands(
+        self, word: str, max_distance: int = MAX_DISTANCE
+    ) -> Iterator[Suggestion]:
+        """Get the commands close to the word"""
+        return ranked(self.commands.search(word.casefold(), max_distance))
+
+
+def search_level_arguments(
+    command: Any, word: str, max_distance: int = MAX_DISTANCE
+) -> list[Any]:
+    """Get the arguments of the command close to '--word', or having the short of '-w'.
+
+    Closest first, then in declaration order.
+    """
+
+    arguments = command.get_arguments()
+
+    if word.startswith("-") and not word.startswith("--"):
+        short = word[1:].casefold()
+        return [
+            argument
+            for argument in arguments
+            if argument.short is not None and argument.short.casefold() == short
+        ]
+
+    import Levenshtein
+
+    word = word.removeprefix("--").casefold()
+    distances: dict[int, int] = {}
+
+    for i, argument in enumerate(arguments):
+        for name in [argument.name, *argument.aliases]:
+            distance = Levenshtein.distance(
+                word, name.casefold(), score_cutoff=max_distance
+            )
+            if distance <= max_distance and distance < distances.get(i, distance + 1):
+                distances[i] = distance
+
+    return [arguments[i] for i in sorted(distances, key=distances.__getitem__)]
+
+
+def search_level_commands(
+    command: Any, word: str, max_distance: int = MAX_DISTANCE
+) -> list[Any]:
+    """Get the sub commands of the command close to the word.
+
+    The names are read from the index of the command, only the matching lazy
+    commands are instantiated. Closest first, then in declaration order.
+    """
+
+    import Levenshtein
+
+    word = word.casefold()
+    distances: dict[Any, int] = {}
+
+    # the names of a slot are next to each other, in declaration order
+    for name, slot in command.get_sub_command_index().names.items():
+        distance = Levenshtein.distance(word, name, score_cutoff=max_distance)
+        if distance <= max_distance and distance < distances.get(slot, distance + 1):
+            distances[slot] = distance
+
+    return [
+        get_sub_command(command, slot)
+        for slot in sorted(distances, key=distances.__getitem__)
+    ]
+
+
+def get_sub_command(command: Any, slot: Any) -> Any:
+    # commands read from a SchemaCache are not attributes
+    get = getattr(command, "get_sub_command", None)
+    if get is not None:
+        return get(slot)
+    return getattr(command, slot.attribute)
+
+
+def get_created_sub_command(command: Any, slot: Any) -> Any:
+    """The sub command of the slot, without instantiating a lazy command.
+
+    A lazy command declared by its class is seen through a CommandClassView,
+    None for the ones made by another factory.
+    """
+    from runrun.completion import CommandClassView, get_sub_command as get_node
+    from runrun.models import BaseCommand, LazyCommand
+
+    if isinstance(command, CommandClassView):
+        owner = command.command_class
+    elif slot.lazy and slot.attribute not in vars(command):
+        owner = type(command)
+    else:
+        return get_node(command, slot)
+
+    value = getattr(owner, slot.attribute, None)
+
+    if isinstance(value, LazyCommand):
+        factory = value.factory
+        if isinstance(factory, type) and issubclass(factory, BaseCommand):
+            return CommandClassView(factory)
+        return None
+
+    return get_node(command, slot)
+
+
+def ranked(matches: list[tuple[int, list[Suggestion]]]) -> Iterator[Suggestion]:
+    """Closest first, then in declaration order, once each.
+
+    A name used all over the tree matches many suggestions, they are only
+    ordered as far as they are taken.
+    """
+
+    by_distance: dict[int, list[list[Suggestion]]] = {}
+    for distance, suggestions in matches:
+        by_distance.setdefault(distance, []).append(suggestions)
+
+    seen = set()
+
+    for distance in sorted(by_distance):
+        # the suggestions of a word are already in declaration order
+        for suggestion in heapq.merge(*by_distance[distance], key=order_of):
+            if id(suggestion) not in seen:
+                seen.add(id(suggestion))
+                yield suggestion
+
+
+def order_of(suggestion: Suggestion) -> int:
+    return suggestion.order
+
+
+def is_help(command: Any) -> bool:
+    from runrun.builtin_command import HelpCommand
+
+    # a lazy help command is seen through the view of its class
+    command_class = getattr(command, "command_class", type(command))
+
+    return issubclass(command_class, HelpCommand) or getattr(command, "is_help", False)
+
+
+# built indexes, the command is kept to make sure the id is not reused, with
+# the number of lazy commands created at the time
+_indexes: dict[int, tuple[Any, SuggestionIndex, int]] = {}
+_indexes_lock = threading.Lock()
+
+INDEX_CACHE_SIZE = 16
+
+
+def get_suggestion_index(command: Any) -> SuggestionIndex:
+    """Get the index of the command tree, built on the first call.
+
+    The tree of the schema cache attached to the command is indexed instead
+    when it is fresh, see SchemaCache.attach. The index is built again once a
+    lazy command was created, it may have more than its class declares.
+    """
+
+    from runrun.models import LazyCommand
+
+    created = LazyCommand.created
+
+    with _indexes_lock:
+        cached = _indexes.get(id(command))
+
+    if cached is not None and cached[0] is command and cached[2] == created:
+        return cached[1]
+
+    from runrun.schema_cache import get_attached_cache
+
+    tree = None
+    cache = get_attached_cache(command)
+    if cache is not None:
+        tree = cache.load()
+
+    index = SuggestionIndex(tree if tree is not None else command)
+
+    # forget the oldest index when full, the runners of a pool share them
+    with _indexes_lock:
+        _indexes.pop(id(command), None)
+        if len(_indexes) >= INDEX_CACHE_SIZE:
+            del _indexes[next(iter(_indexes))]
+        _indexes[id(command)] = (command, index, created)
+
+    return index
@@ -1,8 +1,21 @@
+import io
+import os
+import tempfile
 import unittest
-
-from runrun.builtin_command import HelpCommand, InfoCommand, VersionCommand
+import contextlib
+from unittest import mock
+
+from runrun import Application, ShellMixin
+from runrun.runner import Runner
+from runrun.builtin_command import (
+    HelpCommand,
+    InfoCommand,
+    VersionCommand,
+    ShellCommand,
+)
 from runrun.command_parser import CommandParser
-from runrun.models import BaseCommand, Argument, Context
+from runrun.models import BaseCommand, Argument, Context, LazyCommand
+from runrun.exceptions import BaseExceptionHandler
 
 
 class TestHelpCommand(unittest.TestCase):
@@ -267,3 +280,215 @@ class TestHelpCommand(unittest.TestCase):
 
         command = CommandParser(RootCommand()).parse(["version"])
         command.run()
+
+    def test_help_written_once_pass(self):
+        class RootCommand(BaseCommand):
+            arg = Argument(str, "arg", description="Some argument")
+            help = HelpCommand()
+
+            def __init__(self):
+                super().__init__(name="root")
+
+        command = CommandParser(RootCommand()).parse(["help"])
+
+        with mock.patch("sys.stdout") as stdout:
+            command.run()
+
+        self.assertEqual(stdout.write.call_count, 1)
+        self.assertIn("--arg <str>", stdout.write.call_args[0][0])
+
+    def test_help_rendered_once_pass(self):
+        class RootCommand(BaseCommand):
+            arg = Argument(str, "arg", description="Some argument")
+            help = HelpCommand()
+
+            def __init__(self):
+                super().__init__(name="root")
+
+        runner = Runner(RootCommand())
+
+        # the mocked renders must not stay in the cache
+        HelpCommand._rendered.clear()
+        self.addCleanup(HelpCommand._rendered.clear)
+
+        with mock.patch.object(
+            HelpCommand, "render_std_text", autospec=True, return_value=""
+        ) as render:
+            runner.run_isolated(["help"])
+            runner.run_isolated(["help"])
+            runner.run_isolated(["help", "--filter", "a"])
+
+        # bound copies share the rendered help, other filters don't
+        self.assertEqual(render.call_count, 2)
+
+    def test_help_rendered_from_threads_pass(self):
+        class RootCommand(BaseCommand):
+            arg = Argument(str, "arg", description="Some argument")
+            help = HelpCommand()
+
+            def __init__(self):
+                super().__init__(name="root")
+
+        runner = Runner(RootCommand())
+
+        HelpCommand._rendered.clear()
+        self.addCleanup(HelpCommand._rendered.clear)
+
+        # every filter is another help, the oldest are forgotten all along
+        lines = [["help", "--filter", str(i)] for i in range(200)]
+
+        with mock.patch("runrun.builtin_command.RENDERED_CACHE_SIZE", 4):
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = list(runner.run_parallel(lines, workers=8))
+
+        self.assertEqual([r.exit_code for r in results], [0] * 200)
+        self.assertLessEqual(len(HelpCommand._rendered), 4)
+
+    def test_wrapped_description_pass(self):
+        argument = Argument(
+            str, "arg", description="one two three four five six seven eight"
+        )
+
+        text = HelpCommand().render_argument(argument, [4, 12, 8, 10])
+
+        # every wrapped line keeps its part of the description
+        self.assertEqual(len(text.splitlines()), 5)
+        for word in argument.description.split():
+            self.assertIn(word, text)
+
+    def test_column_widths_pass(self):
+        help = HelpCommand()
+        rows = [["a", "--a <str>", "", "short"], ["bb", "--bb <int>", "", "x" * 100]]
+
+        # fitted to the content, the last column takes what is left
+        self.assertEqual(
+            help.get_column_widths(rows, help.argument_widths, 8, 80), [2, 10, 1, 59]
+        )
+        self.assertEqual(
+            help.get_column_widths(rows, help.argument_widths, 8, 200), [2, 10, 1, 60]
+        )
+
+        # never narrower than the minimum on tiny terminals
+        self.assertEqual(
+            help.get_column_widths(rows, help.argument_widths, 8, 10)[3], 20
+        )
+
+
+class TestShellCommand(unittest.TestCase):
+
+    def make_app(self):
+        class GreetCommand(BaseCommand):
+            name = Argument(str, "name", default_value="world")
+            loud = Argument(bool, "loud", default_value=False)
+
+            def __init__(self):
+                super().__init__(name="greet")
+
+            def run(self):
+                text = f"hello {self.name.value}"
+                print(text.upper() if self.loud.value else text)
+
+        class App(ShellMixin, Application):
+            greet = GreetCommand()
+
+            def __init__(self):
+                super().__init__(name="app")
+
+            def run(self):
+                pass
+
+        return App()
+
+    def run_shell(self, app, lines: list[str], runner=None) -> str:
+        output = io.StringIO()
+        with mock.patch("builtins.input", side_effect=lines + [EOFError]):
+            with contextlib.redirect_stdout(output):
+                (runner or Runner(app)).run(["shell"])
+        return output.getvalue()
+
+    def test_lines_isolated_pass(self):
+        app = self.make_app()
+
+        output = self.run_shell(
+            app, ["greet --name bob --loud", "greet", "", "# comment", "greet"]
+        )
+
+        self.assertEqual(
+            output.splitlines(), ["HELLO BOB", "hello world", "hello world", ""]
+        )
+        self.assertEqual(app.greet.name.value, "world")
+
+    def test_errors_do_not_stop_pass(self):
+        output = self.run_shell(
+            self.make_app(), ["greet --nope", "greet 'unclosed", "greet"]
+        )
+
+        self.assertIn("Unknown argument '--nope'", output)
+        self.assertIn("No closing quotation", output)
+        self.assertIn("hello world", output)
+
+    def test_exit_pass(self):
+        output = self.run_shell(self.make_app(), ["exit", "greet"])
+
+        self.assertNotIn("hello", output)
+
+    def test_runner_settings_kept_pass(self):
+        class Handler(BaseExceptionHandler):
+            def handle_exception(self, exception):
+                print("handled", exception)
+
+        app = self.make_app()
+        runner = Runner(app, exception_handler=Handler(), allow_abbreviations=True)
+
+        output = self.run_shell(app, ["gre --name bob", "greet --nope"], runner)
+
+        self.assertIn("hello bob", output)
+        self.assertIn("handled Unknown argument '--nope'", output)
+
+    def test_history_file_pass(self):
+        try:
+            import readline
+        except ImportError:
+            self.skipTest("needs readline")
+
+        self.addCleanup(readline.clear_history)
+
+        class App(Application):
+            shell = LazyCommand(lambda: ShellCommand(history_file="~/.app_history"))
+
+            def __init__(self):
+                super().__init__(name="app")
+
+        lines = iter(["info"])
+
+        # what readline does with a line typed in input()
+        def typed(prompt: str) -> str:
+            line = next(lines, None)
+            if line is None:
+                raise EOFError
+            readline.add_history(line)
+            return line
+
+        with tempfile.TemporaryDirectory() as home:
+            path = os.path.join(home, ".app_history")
+            with open(path, "w") as file:
+                file.write("version\n")
+
+            with mock.patch.dict(os.environ, {"HOME": home}):
+                readline.clear_history()
+                with mock.patch("builtins.input", side_effect=typed):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        Runner(App()).run(["shell"])
+
+            with open(path) as file:
+                history = file.read().splitlines()
+
+        # read back at the start, the typed line added at the end
+        self.assertEqual(history[-2:], ["version", "info"])
+
+    def test_shell_opt_in_pass(self):
+        class App(Application):
+            def __init__(self):
+                super().__init__(name="app")
+
+        self.assertIsNone(App().get_sub_command_index().get("shell"))
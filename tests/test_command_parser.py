@@ -3,13 +3,15 @@ from enum import Enum
 from pathlib import Path
 from dataclasses import dataclass
 
-from runrun.models import Argument, BaseCommand, Context
+from runrun.models import Argument, BaseCommand, Context, LazyCommand
 from runrun.command_parser import CommandParser
 from runrun.exceptions import (
     ValidationException,
     InvalidValueException,
     MissingArgumentException,
     UnknownArgumentException,
+    AmbiguousCommandException,
+    ResponseFileException,
 )
 
 
@@ -642,6 +644,24 @@ class TestCommandParser(unittest.TestCase):
 
         self.assertEqual(returned_command, expected_command)
 
+    def test_parse_cmd_with_alias_and_short_arg_pass(self):
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            arg1 = Argument(str, "arg1", aliases=["first"])
+            arg2 = Argument(int, "arg2", short="S")
+
+        returned_command = CommandParser(RootCommand()).parse(
+            ["--FIRST", "a", "-s", "2"]
+        )
+        expected_command = RootCommand()
+        expected_command.arg1.value = "a"
+        expected_command.arg2.value = 2
+
+        self.assertEqual(returned_command, expected_command)
+
     def test_parse_cmd_with_required_arg_pass(self):
 
         class RootCommand(BaseCommand):
@@ -732,6 +752,120 @@ class TestCommandParser(unittest.TestCase):
 
         self.assertEqual(returned_command, expected_command)
 
+    def test_parse_lazy_subcmd_only_instantiate_selected_pass(self):
+
+        instantiated = []
+
+        class TestCommand(BaseCommand):
+            def __init__(self, name):
+                instantiated.append(name)
+                super().__init__(name=name)
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            test1 = LazyCommand(lambda: TestCommand("test1"))
+            test2 = LazyCommand(lambda: TestCommand("test2"), aliases=["t2"])
+            test3 = LazyCommand(lambda: TestCommand("test3"))
+
+        returned_command = CommandParser(RootCommand()).parse(["t2"])
+
+        self.assertEqual(returned_command.command_name, "test2")
+        self.assertEqual(instantiated, ["test2"])
+
+    def test_parse_lazy_subcmd_class_pass(self):
+
+        class TestCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="test")
+
+            arg = Argument(int, "arg")
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            test = LazyCommand(TestCommand)
+
+        returned_command = CommandParser(RootCommand()).parse(["test", "--arg", "5"])
+        expected_command = TestCommand()
+        expected_command.arg.value = 5
+
+        self.assertEqual(returned_command, expected_command)
+
+    def test_parse_lazy_subcmd_name_mismatch_fail(self):
+
+        class TestCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="other")
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            test = LazyCommand(TestCommand)
+
+        with self.assertRaises(ValidationException):
+            CommandParser(RootCommand()).parse(["test"])
+
+    def test_parse_abbreviated_subcmd_pass(self):
+
+        class StatusCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="status")
+
+        class StopCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="stop")
+
+        class DeployCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="deploy")
+
+            status = StatusCommand()
+            stop = StopCommand()
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            deploy = DeployCommand()
+
+        returned_command = CommandParser(RootCommand(), allow_abbreviations=True).parse(
+            ["dep", "sta"]
+        )
+
+        self.assertEqual(returned_command, StatusCommand())
+
+        with self.assertRaises(AmbiguousCommandException) as context:
+            CommandParser(RootCommand(), allow_abbreviations=True).parse(["dep", "st"])
+
+        self.assertEqual(context.exception.candidates, ["status", "stop"])
+
+        # abbreviations are opt-in
+        with self.assertRaises(UnknownArgumentException):
+            CommandParser(RootCommand()).parse(["dep"])
+
+    def test_parse_exact_subcmd_over_abbreviation_pass(self):
+
+        class TestCommand(BaseCommand):
+            def __init__(self, name):
+                super().__init__(name=name)
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            test1 = TestCommand("run")
+            test2 = TestCommand("runner")
+
+        returned_command = CommandParser(RootCommand(), allow_abbreviations=True).parse(
+            ["run"]
+        )
+
+        self.assertEqual(returned_command.command_name, "run")
+
     def test_parse_subcmd_with_string_arg_pass(self):
 
         class TestCommand(BaseCommand):
@@ -926,6 +1060,48 @@ class TestCommandParser(unittest.TestCase):
         with self.assertRaises(ValidationException):
             CommandParser(RootCommand())
 
+    def test_validate_command_duplicate_name_fail(self):
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            arg1 = Argument(str, "arg")
+            arg2 = Argument(str, "other", aliases=["ARG"])
+
+        with self.assertRaises(ValidationException):
+            CommandParser(RootCommand())
+
+    def test_validate_command_duplicate_short_fail(self):
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            arg1 = Argument(str, "arg1", short="a")
+            arg2 = Argument(str, "arg2", short="a")
+
+        with self.assertRaises(ValidationException):
+            CommandParser(RootCommand())
+
+    def test_argument_index_shared_pass(self):
+        class RootCommand(BaseCommand):
+            def __init__(self, extra: bool = False):
+                super().__init__(name="root")
+                if extra:
+                    self.other = Argument(str, "other", required=False)
+
+            arg = Argument(str, "arg", short="a", required=False)
+
+        first = CommandParser(RootCommand())
+        second = CommandParser(RootCommand())
+
+        # built once for the class
+        self.assertIs(first._argument_index, second._argument_index)
+        self.assertEqual(second.parse(["-a", "x"]).arg.value, "x")
+
+        # arguments of the instance get an index of their own
+        command = CommandParser(RootCommand(extra=True)).parse(["--other", "y"])
+        self.assertEqual(command.other.value, "y")
+
     def test_validate_command_position_only_pass(self):
         class RootCommand(BaseCommand):
             def __init__(self):
@@ -1076,3 +1252,293 @@ class TestCommandParser(unittest.TestCase):
         self.assertEqual(returned_command.context.scoped_arguments, ["--arg1", "test"])
 
     # endregion
+
+    # region parse_result method
+
+    def make_tree(self):
+        class SubCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="sub")
+
+            arg1 = Argument(str, "arg1", position=0)
+            arg2 = Argument(int, "arg2", default_value=3)
+            arg3 = Argument(bool, "arg3", required=False)
+
+            def run(self):
+                return (self.arg1.value, self.arg2.value, self.context.parent_command)
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            sub = SubCommand()
+
+        return RootCommand()
+
+    def test_parse_result_values_pass(self):
+        root = self.make_tree()
+
+        result = CommandParser(root).parse_result(["sub", "a", "--arg3"])
+
+        self.assertEqual(result.path, ["root", "sub"])
+        self.assertIs(result.command, root.sub)
+        self.assertEqual(result.values, {"arg1": "a", "arg2": 3, "arg3": True})
+        self.assertEqual(result.original_arguments, ["sub", "a", "--arg3"])
+        self.assertEqual(result.scoped_arguments, ["a", "--arg3"])
+
+    def test_parse_result_leaves_tree_untouched_pass(self):
+        root = self.make_tree()
+
+        CommandParser(root).parse_result(["sub", "a", "--arg2", "5"])
+
+        self.assertIsNone(root.sub.arg1._value)
+        self.assertEqual(root.sub.arg2.value, 3)
+        self.assertEqual(root.context, Context())
+        self.assertEqual(root.sub.context, Context())
+
+    def test_parse_result_missing_argument_fail(self):
+        root = self.make_tree()
+
+        with self.assertRaises(MissingArgumentException):
+            CommandParser(root).parse_result(["sub", "--arg2", "5"])
+
+        self.assertEqual(root.sub.arg2.value, 3)
+
+    def test_parse_result_bind_pass(self):
+        root = self.make_tree()
+        parser = CommandParser(root)
+
+        first = parser.parse_result(["sub", "a"]).bind()
+        second = parser.parse_result(["sub", "b", "--arg2", "7"]).bind()
+
+        arg1, arg2, parent = first.run()
+        self.assertEqual((arg1, arg2), ("a", 3))
+        self.assertEqual(second.run()[:2], ("b", 7))
+
+        # the bound commands have their own context up to the root
+        self.assertIsNot(parent, root)
+        self.assertIs(first.context.root_command, parent)
+        self.assertEqual(parent.command_name, "root")
+        self.assertIsNone(root.sub.arg1._value)
+
+    def test_parse_result_default_copied_pass(self):
+        class SubCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="sub")
+
+            ids = Argument(list[int], "ids", default_value=[1, 2])
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            sub = SubCommand()
+
+        root = RootCommand()
+        parser = CommandParser(root)
+
+        result = parser.parse_result(["sub"])
+        result.values["ids"].append(5)
+
+        self.assertEqual(parser.parse_result(["sub"]).values["ids"], [1, 2])
+        self.assertEqual(RootCommand().sub.ids.value, [1, 2])
+        self.assertEqual(result.bind().ids.value, [1, 2, 5])
+
+    def test_parse_result_threads_pass(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        root = self.make_tree()
+
+        def parse(i: int):
+            command = CommandParser(root).parse_result(["sub", str(i)]).bind()
+            return command.run()[0]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            values = list(executor.map(parse, range(200)))
+
+        self.assertEqual(values, [str(i) for i in range(200)])
+
+    # endregion
+
+    # region response files
+
+    def make_files(self, files: dict[str, str]) -> str:
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        for name, content in files.items():
+            with open(f"{directory.name}/{name}", "w") as file:
+                file.write(content.replace("DIR", directory.name))
+
+        return directory.name
+
+    def make_response_tree(self) -> BaseCommand:
+        class SubCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="sub")
+
+            name = Argument(str, "name")
+            ids = Argument(list[int], "ids", required=False)
+            tag = Argument(str, "tag", position=0, required=False)
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            sub = SubCommand()
+
+        return RootCommand()
+
+    def test_response_file_pass(self):
+        directory = self.make_files({"args.txt": "sub\n--name\n'first last'\n"})
+
+        command = CommandParser(self.make_response_tree(), response_files=True).parse(
+            [f"@{directory}/args.txt"]
+        )
+
+        self.assertEqual(command.command_name, "sub")
+        self.assertEqual(command.name.value, "first last")
+
+        # the arguments as given are kept, not the expanded ones
+        self.assertEqual(command.context.original_arguments, [f"@{directory}/args.txt"])
+        self.assertEqual(command.context.scoped_arguments, ["--name", "first last"])
+
+    def test_response_file_nested_pass(self):
+        directory = self.make_files(
+            {
+                "outer.txt": "--name\nsome name\n@DIR/inner.txt\n",
+                "inner.txt": "--ids\n1,2,3\n",
+            }
+        )
+
+        result = CommandParser(
+            self.make_response_tree(), response_files=True
+        ).parse_result(["sub", f"@{directory}/outer.txt"])
+
+        self.assertEqual(result.values["name"], "some name")
+        self.assertEqual(result.values["ids"], [1, 2, 3])
+        self.assertEqual(result.original_arguments, ["sub", f"@{directory}/outer.txt"])
+
+    def test_response_file_escape_pass(self):
+        directory = self.make_files({"args.txt": "--name\n@@inside\n"})
+
+        command = CommandParser(self.make_response_tree(), response_files=True).parse(
+            ["sub", "--name", "x", "@@home"]
+        )
+        self.assertEqual(command.tag.value, "@home")
+
+        command = CommandParser(self.make_response_tree(), response_files=True).parse(
+            ["sub", f"@{directory}/args.txt"]
+        )
+        self.assertEqual(command.name.value, "@inside")
+
+    def test_response_file_memory_mapped_pass(self):
+        from unittest import mock
+
+        ids = ",".join(str(i) for i in range(1000))
+        directory = self.make_files({"args.txt": f"sub\n--name\nx\n--ids\n{ids}\n"})
+
+        with mock.patch("runrun.response_files.MMAP_THRESHOLD", 0):
+            command = CommandParser(
+                self.make_response_tree(), response_files=True
+            ).parse([f"@{directory}/args.txt"])
+
+        self.assertEqual(command.ids.value, list(range(1000)))
+
+    def test_response_file_disabled_pass(self):
+        # off by default
+        command = CommandParser(self.make_response_tree()).parse(
+            ["sub", "--name", "@someone"]
+        )
+
+        self.assertEqual(command.name.value, "@someone")
+
+    def test_response_file_option_value_pass(self):
+        command = CommandParser(self.make_response_tree(), response_files=True).parse(
+            ["sub", "--name", "@someone"]
+        )
+
+        self.assertEqual(command.name.value, "@someone")
+
+    def test_response_file_missing_fail(self):
+        with self.assertRaises(ResponseFileException):
+            CommandParser(self.make_response_tree(), response_files=True).parse(
+                ["sub", "@/does/not/exist"]
+            )
+
+    def test_response_file_cycle_fail(self):
+        directory = self.make_files({"a.txt": "@DIR/b.txt\n", "b.txt": "@DIR/a.txt\n"})
+
+        with self.assertRaises(ResponseFileException):
+            CommandParser(self.make_response_tree(), response_files=True).parse(
+                [f"@{directory}/a.txt"]
+            )
+
+    def test_response_file_bad_quotes_fail(self):
+        directory = self.make_files({"args.txt": "--name\n'unclosed\n"})
+
+        with self.assertRaises(ResponseFileException) as context:
+            CommandParser(self.make_response_tree(), response_files=True).parse(
+                ["sub", f"@{directory}/args.txt"]
+            )
+
+        self.assertIn("line 2", str(context.exception))
+
+    # endregion
+
+    # region repeated lists
+
+    def make_list_tree(self) -> BaseCommand:
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            ids = Argument(list[int], "ids", short="i", required=False)
+            weights = Argument(list[float], "weights", required=False, compact=True)
+            name = Argument(str, "name", required=False)
+
+        return RootCommand()
+
+    def test_repeated_list_appends_pass(self):
+        command = CommandParser(self.make_list_tree()).parse(
+            ["--ids", "1,2", "-i", "3", "--ids", "4"]
+        )
+
+        self.assertEqual(command.ids.value, [1, 2, 3, 4])
+
+    def test_repeated_other_overwrites_pass(self):
+        command = CommandParser(self.make_list_tree()).parse(
+            ["--name", "a", "--name", "b"]
+        )
+
+        self.assertEqual(command.name.value, "b")
+
+    def test_compact_list_pass(self):
+        from array import array
+
+        command = CommandParser(self.make_list_tree()).parse(
+            ["--weights", "0.5", "--weights", "1.5,2"]
+        )
+
+        self.assertEqual(command.weights.value, array("d", [0.5, 1.5, 2.0]))
+
+    def test_repeated_list_parse_result_pass(self):
+        result = CommandParser(self.make_list_tree()).parse_result(
+            ["--ids", "1", "--ids", "2"]
+        )
+
+        self.assertEqual(result.values["ids"], [1, 2])
+
+    def test_compact_not_numeric_fail(self):
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            names = Argument(list[str], "names", compact=True)
+
+        with self.assertRaises(ValidationException):
+            CommandParser(RootCommand()).parse(["--names", "a"])
+
+    # endregion
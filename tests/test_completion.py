@@ -0,0 +1,131 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+from enum import Enum
+from pathlib import Path
+
+from runrun import Command, LazyCommand
+from runrun.models import Argument, BaseCommand
+from runrun.completion import complete
+from runrun.runner import Runner
+
+
+class Color(Enum):
+    RED = 0
+    GREEN = 1
+
+
+class PaintCommand(Command):
+    color = Argument(Color, "color", short="c", aliases=["colour"])
+    force = Argument(bool, "force", required=False)
+    name = Argument(str, "name", required=False)
+
+    def __init__(self, name: str = "paint", aliases: list[str] = ["p"]):
+        super().__init__(name=name, aliases=aliases)
+
+
+class RootCommand(Command):
+    paint = PaintCommand()
+    publish = LazyCommand(lambda: PaintCommand("publish", []), name="publish")
+
+    def __init__(self):
+        super().__init__(name="root")
+
+
+class TestComplete(unittest.TestCase):
+
+    def test_sub_commands_pass(self):
+        self.assertEqual(complete(RootCommand(), [], "p"), ["p", "paint", "publish"])
+        self.assertEqual(
+            complete(RootCommand(), [], ""), ["help", "p", "paint", "publish"]
+        )
+
+    def test_lazy_sub_command_not_instantiated_pass(self):
+        root = RootCommand()
+
+        complete(root, [], "pu")
+        options = complete(root, ["publish"], "--c")
+
+        self.assertEqual(options, ["--color", "--colour"])
+        self.assertNotIn("publish", vars(root))
+
+    def test_options_pass(self):
+        self.assertEqual(
+            complete(RootCommand(), ["paint"], "--c"), ["--color", "--colour"]
+        )
+        self.assertEqual(
+            complete(RootCommand(), ["p"], "-"),
+            [
+                "--color",
+                "--colour",
+                "--force",
+                "--name",
+                "-c",
+            ],
+        )
+
+    def test_enum_values_pass(self):
+        self.assertEqual(complete(RootCommand(), ["paint", "-c"], ""), ["green", "red"])
+        self.assertEqual(complete(RootCommand(), ["paint", "--COLOR"], "G"), ["green"])
+
+    def test_no_candidates_pass(self):
+        self.assertEqual(complete(RootCommand(), ["paint", "--name"], ""), [])
+        self.assertEqual(complete(RootCommand(), ["paint", "--force"], "p"), [])
+
+    def test_positional_values_pass(self):
+        class MixCommand(BaseCommand):
+            first = Argument(Color, "first", position=0)
+            second = Argument(Path, "second", position=1)
+            force = Argument(bool, "force", required=False)
+            name = Argument(str, "name", required=False)
+
+            def __init__(self):
+                super().__init__(name="mix")
+
+        self.assertEqual(complete(MixCommand(), [], "r"), ["red"])
+        self.assertEqual(
+            complete(MixCommand(), ["--name", "x", "--force", "green"], "zz"), []
+        )
+
+    def test_path_values_pass(self):
+        class CopyCommand(BaseCommand):
+            source = Argument(Path, "source", short="s")
+
+            def __init__(self):
+                super().__init__(name="copy")
+
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, "data"))
+            open(os.path.join(directory, "dance.txt"), "w").close()
+            open(os.path.join(directory, ".hidden"), "w").close()
+
+            self.assertEqual(
+                complete(CopyCommand(), ["-s"], directory + "/d"),
+                [directory + "/dance.txt", directory + "/data/"],
+            )
+            self.assertEqual(
+                complete(CopyCommand(), ["-s"], directory + "/."),
+                [directory + "/.hidden"],
+            )
+
+
+class TestCompleteEntryPoint(unittest.TestCase):
+
+    def run_complete(self, args: list[str]) -> tuple[int, list[str]]:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = Runner(RootCommand()).run(["__complete"] + args)
+        return code, output.getvalue().splitlines()
+
+    def test_cursor_pass(self):
+        self.assertEqual(
+            self.run_complete(["1", "paint", "--co"]), (0, ["--color", "--colour"])
+        )
+        self.assertEqual(self.run_complete(["2", "paint", "-c"]), (0, ["green", "red"]))
+        self.assertEqual(self.run_complete(["0", "pa", "--color"]), (0, ["paint"]))
+
+    def test_invalid_cursor_fail(self):
+        self.assertEqual(self.run_complete(["x"]), (2, []))
+        self.assertEqual(self.run_complete([]), (2, []))
@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+from enum import Enum
+from pathlib import Path
+
+from runrun import Command, LazyCommand
+from runrun.models import Argument, BaseCommand
+from runrun.runner import Runner
+from runrun.completion_scripts import (
+    SHELLS,
+    CompletionTables,
+    generate_completion_script,
+    write_completion_script,
+)
+
+
+class Env(Enum):
+    PROD = 0
+    STAGING = 1
+
+
+class DeployCommand(BaseCommand):
+    env = Argument(Env, "env", short="e")
+    file = Argument(Path, "file", required=False)
+    name = Argument(str, "name", required=False)
+    force = Argument(bool, "force", required=False)
+
+    def __init__(self):
+        super().__init__(name="deploy", aliases=["dep"])
+
+
+class AppCommand(BaseCommand):
+    deploy = LazyCommand(DeployCommand)
+    status = Command(name="status")
+
+    def __init__(self):
+        super().__init__(name="app")
+
+
+class TestCompletionTables(unittest.TestCase):
+
+    def test_tables_pass(self):
+        tables = CompletionTables(AppCommand())
+
+        self.assertEqual(tables.subs["app"], ["deploy", "dep", "status"])
+        self.assertEqual(tables.next["app dep"], "app deploy")
+        self.assertEqual(
+            tables.opts["app deploy"], ["--env", "-e", "--file", "--force", "--name"]
+        )
+        self.assertEqual(tables.vals["app deploy -e"], ["prod", "staging"])
+        self.assertEqual(tables.vals["app deploy --file"], ["@path"])
+        self.assertEqual(tables.vals["app deploy --name"], [])
+        self.assertNotIn("app deploy --force", tables.vals)
+
+    def test_fingerprint_pass(self):
+        class OtherCommand(AppCommand):
+            other = Command(name="other")
+
+        self.assertEqual(
+            CompletionTables(AppCommand()).fingerprint(),
+            CompletionTables(AppCommand()).fingerprint(),
+        )
+        self.assertNotEqual(
+            CompletionTables(AppCommand()).fingerprint(),
+            CompletionTables(OtherCommand()).fingerprint(),
+        )
+
+    def test_every_shell_pass(self):
+        for shell in SHELLS:
+            script = generate_completion_script(AppCommand(), shell)
+            self.assertIn("_runrun_app", script)
+
+    def test_unknown_shell_fail(self):
+        with self.assertRaises(ValueError):
+            generate_completion_script(AppCommand(), "cmd.exe")
+
+    def test_write_skipped_when_unchanged_pass(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "app.bash")
+
+            self.assertTrue(write_completion_script(AppCommand(), "bash", path))
+            self.assertFalse(write_completion_script(AppCommand(), "bash", path))
+            self.assertTrue(write_completion_script(AppCommand(), "zsh", path))
+
+    def test_runner_flag_pass(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "app.fish")
+
+            code = Runner(AppCommand()).run(
+                ["--runrun-completion-script", "fish", path]
+            )
+
+            self.assertEqual(code, 0)
+            with open(path, encoding="utf-8") as file:
+                self.assertIn("complete -c 'app'", file.read())
+
+
+@unittest.skipIf(shutil.which("bash") is None, "needs bash")
+class TestBashScript(unittest.TestCase):
+
+    def complete(self, *words: str) -> list[str]:
+        script = generate_completion_script(AppCommand(), "bash")
+
+        with tempfile.NamedTemporaryFile("w", suffix=".bash", delete=False) as file:
+            file.write(script)
+
+        try:
+            process = subprocess.run(
+                [
+                    "bash",
+                    "-c",
+                    'source "$0"; COMP_WORDS=("${@}"); COMP_CWORD=$(($# - 1));'
+                    ' _runrun_app; printf "%s\\n" "${COMPREPLY[@]}"',
+                    file.name,
+                    *words,
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        finally:
+            os.unlink(file.name)
+
+        return [line for line in process.stdout.splitlines() if line]
+
+    def test_sub_commands_pass(self):
+        self.assertEqual(self.complete("app", "de"), ["deploy", "dep"])
+
+    def test_options_pass(self):
+        self.assertEqual(self.complete("app", "DEP", "--f"), ["--file", "--force"])
+
+    def test_enum_values_pass(self):
+        self.assertEqual(self.complete("app", "deploy", "-e", "st"), ["staging"])
+
+    def test_after_arguments_pass(self):
+        self.assertEqual(self.complete("app", "deploy", "--force", "st"), [])
+
+
+class TestScriptSyntax(unittest.TestCase):
+
+    def check(self, shell: str):
+        script = generate_completion_script(AppCommand(), shell)
+
+        with tempfile.NamedTemporaryFile("w", suffix=f".{shell}", delete=False) as file:
+            file.write(script)
+
+        try:
+            process = subprocess.run(
+                [shell, "-n", file.name], capture_output=True, text=True
+            )
+        finally:
+            os.unlink(file.name)
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+
+    @unittest.skipIf(shutil.which("bash") is None, "needs bash")
+    def test_bash_syntax_pass(self):
+        self.check("bash")
+
+    @unittest.skipIf(shutil.which("zsh") is None, "needs zsh")
+    def test_zsh_syntax_pass(self):
+        self.check("zsh")
+
+    @unittest.skipIf(shutil.which("fish") is None, "needs fish")
+    def test_fish_syntax_pass(self):
+        self.check("fish")
+
+    def test_zsh_path_not_shadowed_pass(self):
+        script = generate_completion_script(AppCommand(), "zsh")
+
+        # zsh ties the path array to PATH, commands could not be found
+        self.assertNotIn(" path=", script)
+        self.assertNotIn("$path", script)
@@ -0,0 +1,175 @@
+import unittest
+from enum import Enum
+from pathlib import Path
+
+from runrun.converters import (
+    ConverterRegistry,
+    ConstructorConverter,
+    registry,
+    split_values,
+    split_key_values,
+    strip_brackets,
+)
+from runrun.models import Argument, BaseCommand
+from runrun.command_parser import CommandParser
+
+
+class TestConverterRegistry(unittest.TestCase):
+
+    def test_resolve_builtin_types_pass(self):
+        class TestEnum(Enum):
+            A = 1
+            B = 2
+
+        converters = ConverterRegistry()
+
+        self.assertEqual(converters.resolve(str)("text"), "text")
+        self.assertEqual(converters.resolve(int)("12"), 12)
+        self.assertEqual(converters.resolve(float)("1.5"), 1.5)
+        self.assertEqual(converters.resolve(bool)("Yes"), True)
+        self.assertEqual(converters.resolve(Path)("/bin"), Path("/bin"))
+        self.assertEqual(converters.resolve(TestEnum)("b"), TestEnum.B)
+        self.assertEqual(converters.resolve(list[int])("1,2"), [1, 2])
+        self.assertEqual(converters.resolve(dict[str, int])("a=1"), {"a": 1})
+
+    def test_resolve_is_cached_pass(self):
+        converters = ConverterRegistry()
+
+        self.assertIs(converters.resolve(list[int]), converters.resolve(list[int]))
+
+    def test_array_converter_pass(self):
+        from array import array
+
+        convert = ConverterRegistry().array_converter(list[int])
+
+        self.assertEqual(convert("[1, 2,3]"), array("q", [1, 2, 3]))
+
+        with self.assertRaises(ValueError):
+            convert("1,a")
+        with self.assertRaises(ValueError):
+            convert(str(2**64))
+        with self.assertRaises(ValueError):
+            ConverterRegistry().array_converter(list[str])
+
+    def test_invalid_enum_fail(self):
+        class TestEnum(Enum):
+            A = 1
+
+        with self.assertRaises(ValueError):
+            ConverterRegistry().resolve(TestEnum)("C")
+
+    def test_register_pass(self):
+        class Point:
+            def __init__(self, x: int, y: int):
+                self.x = x
+                self.y = y
+
+        converters = ConverterRegistry()
+
+        @converters.register(Point)
+        def string_to_point(string_value: str) -> Point:
+            x, y = string_value.split(":")
+            return Point(int(x), int(y))
+
+        points = converters.resolve(list[Point])("1:2,3:4")
+
+        self.assertEqual([(p.x, p.y) for p in points], [(1, 2), (3, 4)])
+
+    def test_converter_resolved_with_schema_pass(self):
+        class Version:
+            def __init__(self, text: str):
+                self.parts = tuple(int(part) for part in text.split("."))
+
+        registry.register(Version, Version)
+        self.addCleanup(registry._resolved.clear)
+        self.addCleanup(registry._converters.pop, Version)
+
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            version = Argument(Version, "version")
+
+        self.assertIs(RootCommand.version.converter, Version)
+
+        returned_command = CommandParser(RootCommand()).parse(["--version", "1.2.3"])
+
+        self.assertEqual(returned_command.version.value.parts, (1, 2, 3))
+
+    def test_argument_converter_pass(self):
+        class RootCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="root")
+
+            name = Argument(str, "name", converter=str.upper)
+
+        returned_command = CommandParser(RootCommand()).parse(["--name", "abc"])
+
+        self.assertEqual(returned_command.name.value, "ABC")
+
+
+class TestConstructorConverter(unittest.TestCase):
+
+    def test_constructor_converter_cached_pass(self):
+        class Point:
+            def __init__(self, x: float, y: float):
+                self.x = x
+                self.y = y
+
+        converters = ConverterRegistry()
+        converter = converters.resolve(Point)
+
+        self.assertIsInstance(converter, ConstructorConverter)
+        self.assertIs(converter, converters.unknown_converter(Point))
+
+        points = converters.resolve(list[Point])("1\\,2,3\\,y=4")
+        point = converter("1,y=2")
+
+        self.assertEqual((points[0].x, points[0].y), (1.0, 2.0))
+        self.assertEqual((points[1].x, points[1].y), (3.0, 4.0))
+        self.assertEqual((point.x, point.y), (1.0, 2.0))
+
+    def test_constructor_converter_var_args_pass(self):
+        class Group:
+            def __init__(self, name: str, *members: int, **tags: bool):
+                self.name = name
+                self.members = members
+                self.tags = tags
+
+        group = ConverterRegistry().resolve(Group)("team,1,2,active=yes")
+
+        self.assertEqual(group.name, "team")
+        self.assertEqual(group.members, (1, 2))
+        self.assertEqual(group.tags, {"active": True})
+
+
+class TestScanner(unittest.TestCase):
+
+    def test_split_values_pass(self):
+        for string_value, expected in [
+            ("", [""]),
+            ("a,b,c", ["a", "b", "c"]),
+            ("a\\,b,c", ["a,b", "c"]),
+            ("a\\=b", ["a\\=b"]),
+            ("C:\\dir,D:\\", ["C:\\dir", "D:\\"]),
+            ("[1,2],[3]", ["[1,2]", "[3]"]),
+            ("a[,b", ["a[", "b"]),
+        ]:
+            self.assertEqual(split_values(string_value), expected)
+
+    def test_split_key_values_pass(self):
+        self.assertEqual(
+            split_key_values("a=1,b=[1,2],c\\=d=e\\=f,pos"),
+            [("a", "1"), ("b", "[1,2]"), ("c=d", "e=f"), (None, "pos")],
+        )
+
+    def test_strip_brackets_pass(self):
+        self.assertEqual(strip_brackets("[1,2]"), "1,2")
+        self.assertEqual(strip_brackets("[[1],[2]]"), "[1],[2]")
+        self.assertEqual(strip_brackets("[1],[2]"), "[1],[2]")
+        self.assertEqual(strip_brackets("1,2"), "1,2")
+
+    def test_nested_values_pass(self):
+        converter = ConverterRegistry().resolve(dict[str, list[int]])
+
+        self.assertEqual(converter("a=[1,2],b=[3]"), {"a": [1, 2], "b": [3]})
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import signal
+import socket
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from runrun.models import BaseCommand, Argument
+from runrun.runner import Runner
+from runrun.client import run_client
+from runrun.daemon import send_request
+
+
+class EchoCommand(BaseCommand):
+    text = Argument(str, "text", default_value="")
+    fail = Argument(bool, "fail", default_value=False)
+    quit = Argument(bool, "quit", default_value=False)
+    wait = Argument(float, "wait", default_value=0.0)
+
+    def __init__(self):
+        super().__init__(name="echo")
+
+    def run(self):
+        time.sleep(self.wait.value)
+        if self.fail.value:
+            sys.exit(3)
+        if self.quit.value:
+            sys.exit()
+        print(self.text.value, os.getcwd(), os.environ.get("RUNRUN_TEST", ""))
+
+
+@unittest.skipUnless(
+    hasattr(os, "fork") and hasattr(socket, "AF_UNIX"), "needs fork and unix sockets"
+)
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, "app.sock")
+        self.start_server()
+
+    def start_server(self):
+        self.server_pid = os.fork()
+        if self.server_pid == 0:
+            code = 0
+            try:
+                Runner(EchoCommand()).serve(self.socket_path, idle_timeout=10)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+
+        # wait for the server to listen
+        deadline = time.monotonic() + 5
+        while not self.is_listening():
+            if time.monotonic() > deadline:
+                self.fail("The server did not start")
+            time.sleep(0.01)
+
+    def is_listening(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            return probe.connect_ex(self.socket_path) == 0
+
+    def tearDown(self):
+        # some tests already stopped the server
+        try:
+            os.kill(self.server_pid, signal.SIGTERM)
+            os.waitpid(self.server_pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        self.directory.cleanup()
+
+    def call(self, args: list[str]) -> tuple[int, str]:
+        with tempfile.TemporaryFile("w+") as out:
+            code = run_client(self.socket_path, args, stdout=out.fileno())
+            out.seek(0)
+            return code, out.read()
+
+    def test_output_and_exit_code_pass(self):
+        os.environ["RUNRUN_TEST"] = "from-client"
+        try:
+            code, output = self.call(["--text", "hello"])
+        finally:
+            del os.environ["RUNRUN_TEST"]
+
+        self.assertEqual(code, 0)
+        self.assertEqual(output, f"hello {os.getcwd()} from-client\n")
+
+    def test_failing_command_pass(self):
+        code, _ = self.call(["--fail", "true"])
+
+        self.assertEqual(code, 3)
+
+    def test_exit_without_code_pass(self):
+        code, output = self.call(["--quit", "true"])
+
+        self.assertEqual(code, 0)
+        self.assertEqual(output, "")
+
+    def test_parse_error_pass(self):
+        code, _ = self.call(["--unknown"])
+
+        self.assertEqual(code, 1)
+
+    def test_several_clients_pass(self):
+        start = time.monotonic()
+
+        with ThreadPoolExecutor(5) as executor:
+            results = list(
+                executor.map(
+                    lambda i: self.call(["--text", str(i), "--wait", "0.5"]), range(5)
+                )
+            )
+
+        # one after the other would take 2.5 seconds
+        self.assertLess(time.monotonic() - start, 2)
+
+        for i, (code, output) in enumerate(results):
+            self.assertEqual(code, 0)
+            self.assertTrue(output.startswith(f"{i} "))
+
+    def test_client_leaving_pass(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        send_request(sock, ["--wait", "5"], os.getcwd(), {}, [0, 1, 2])
+        sock.close()
+
+        # the server keeps answering the other clients
+        code, output = self.call(["--text", "still"])
+
+        self.assertEqual(code, 0)
+        self.assertTrue(output.startswith("still "))
+
+    def test_shutdown_removes_socket_pass(self):
+        os.kill(self.server_pid, signal.SIGTERM)
+        os.waitpid(self.server_pid, 0)
+
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_stale_socket_replaced_pass(self):
+        os.kill(self.server_pid, signal.SIGKILL)
+        os.waitpid(self.server_pid, 0)
+
+        # the socket file is left behind by the killed server
+        self.assertTrue(os.path.exists(self.socket_path))
+
+        self.start_server()
+        code, _ = self.call(["--text", "again"])
+
+        self.assertEqual(code, 0)
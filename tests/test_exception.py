@@ -186,3 +186,60 @@ class TestDefaultExceptionHandler(unittest.TestCase):
         )
 
         self.assertListEqual([], returned_suggestions)
+
+    def test_get_argument_suggestions_aliases_pass(self):
+        arg1 = Argument(int, "count", aliases=["number"])
+        arg2 = Argument(int, "size")
+
+        class TCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="test")
+
+            _arg1 = arg1
+            _arg2 = arg2
+
+        exception = UnknownArgumentException(
+            command=TCommand(), unknown_argument="--numbr"
+        )
+
+        returned_suggestions = DefaultExceptionHandler().get_argument_suggestions(
+            exception
+        )
+
+        self.assertListEqual([arg1], returned_suggestions)
+
+    def test_get_tree_suggestions_pass(self):
+        class MigrateCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="migrate")
+
+            dry_run = Argument(bool, "dry-run")
+
+        class DbCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="db")
+
+            migrate = MigrateCommand()
+
+        class AppCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="app")
+
+            db = DbCommand()
+
+        command = AppCommand()
+        default_exception_handler = DefaultExceptionHandler()
+
+        for unknown, expected_matches in [
+            ("--dry-rum", ["app db migrate --dry-run"]),
+            ("migrat", ["app db migrate"]),
+            ("nothing", []),
+        ]:
+            exception = UnknownArgumentException(
+                command=command, unknown_argument=unknown
+            )
+
+            self.assertListEqual(
+                expected_matches,
+                default_exception_handler.get_tree_suggestions(exception),
+            )
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# only needed when printing styled output, suggestions or running coroutines
+LAZY_MODULES = [
+    "colorama",
+    "Levenshtein",
+    "asyncio",
+    "json",
+    "textwrap",
+    "inspect",
+    "pathlib",
+    "importlib.metadata",
+    "runrun.daemon",
+    "runrun.schema_cache",
+    "socket",
+]
+
+# in microseconds, generous to not fail on slow machines
+IMPORT_BUDGET = 150_000
+
+
+def import_times(statement: str) -> dict[str, int]:
+    """Cumulative import time of every module imported by the statement"""
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=env,
+        check=True,
+    )
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # import time: self | cumulative | name
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_lazy_modules_not_imported_pass(self):
+        times = import_times("import runrun, runrun.runner")
+
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_import_budget_pass(self):
+        # the first run may have to write the bytecode cache
+        import_times("import runrun.runner")
+
+        times = import_times("import runrun.runner")
+
+        self.assertLess(times["runrun"] + times["runrun.runner"], IMPORT_BUDGET)
@@ -1,6 +1,6 @@
 import unittest
 
-from runrun.models import Argument, BaseCommand, Context
+from runrun.models import Argument, BaseCommand, Context, CommandSchema
 
 
 class TestCommand(unittest.TestCase):
@@ -88,6 +88,75 @@ class TestCommand(unittest.TestCase):
 
         self.assertEqual(returned_commands, expected_commands)
 
+    def test_get_sub_commands_instance_level_pass(self):
+        class SubCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="sub")
+
+        class TCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="test")
+                self.sub = SubCommand()
+
+        self.assertEqual(TCommand().get_sub_commands(), [SubCommand()])
+
+    def test_instance_sub_command_index_kept_pass(self):
+        class SubCommand(BaseCommand):
+            def __init__(self, name):
+                super().__init__(name=name)
+
+        class TCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="test")
+                self.sub = SubCommand("sub")
+
+        command = TCommand()
+        index = command.get_sub_command_index()
+
+        # kept until a sub command is assigned
+        self.assertIs(command.get_sub_command_index(), index)
+
+        command.other = SubCommand("other")
+
+        self.assertIsNot(command.get_sub_command_index(), index)
+        self.assertIsNotNone(command.get_sub_command_index().get("other"))
+
+
+class TestCommandSchema(unittest.TestCase):
+
+    def test_schema_built_per_class_pass(self):
+        class SubCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="sub")
+
+        class TCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="test")
+
+            b_arg = Argument(str, "b")
+            a_arg = Argument(str, "a")
+            sub = SubCommand()
+
+        schema = TCommand.get_schema()
+
+        self.assertIsInstance(schema, CommandSchema)
+        self.assertIs(schema, TCommand().get_schema())
+        self.assertEqual(schema.argument_names, ("a_arg", "b_arg"))
+        self.assertEqual(schema.sub_command_attributes, ("sub",))
+
+    def test_schema_inherits_members_pass(self):
+        class ParentCommand(BaseCommand):
+            arg1 = Argument(str, "arg1")
+
+        class TCommand(ParentCommand):
+            def __init__(self):
+                super().__init__(name="test")
+
+            arg2 = Argument(str, "arg2")
+
+        self.assertEqual(TCommand.get_schema().argument_names, ("arg1", "arg2"))
+        self.assertEqual(ParentCommand.get_schema().argument_names, ("arg1",))
+
 
 class TestContext(unittest.TestCase):
 
@@ -138,3 +207,41 @@ class TestArgument(unittest.TestCase):
         year_arg = Argument(int, "year")
         year_arg.value = 1234
         self.assertEqual(str(year_arg), "1234")
+
+    def test_clone_shares_spec_pass(self):
+        arg = Argument(int, "year", aliases=["y"], default_value=2000)
+
+        clone = arg.clone()
+        clone.value = 1234
+
+        self.assertIs(clone.spec, arg.spec)
+        self.assertEqual(clone.aliases, ["y"])
+        self.assertEqual(arg.value, 2000)
+
+    def test_spec_immutable_fail(self):
+        arg = Argument(int, "year")
+
+        with self.assertRaises(AttributeError):
+            arg.spec.name = "month"
+
+        with self.assertRaises(AttributeError):
+            arg.unknown = 1
+
+    def test_mutable_default_copied_on_access_pass(self):
+        class TCommand(BaseCommand):
+            ids = Argument(list[int], "ids", default_value=[1, 2])
+
+            def __init__(self):
+                super().__init__(name="test")
+
+        command1 = TCommand()
+        command2 = TCommand()
+
+        # not copied until given out
+        self.assertIs(command1.ids._value, TCommand.ids.default_value)
+
+        command1.ids.value.append(3)
+
+        self.assertEqual(command1.ids.value, [1, 2, 3])
+        self.assertEqual(command2.ids.value, [1, 2])
+        self.assertEqual(TCommand.ids.default_value, [1, 2])
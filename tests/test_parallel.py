@@ -0,0 +1,99 @@
+import io
+import time
+import unittest
+import contextlib
+import multiprocessing
+
+from runrun.models import BaseCommand, Argument
+from runrun.runner import Runner
+from runrun.exceptions import BaseExceptionHandler
+
+
+class SleepCommand(BaseCommand):
+    seconds = Argument(float, "seconds", position=0)
+
+    def __init__(self):
+        super().__init__(name="sleep")
+
+    def run(self):
+        if self.seconds.value < 0:
+            raise RuntimeError("negative sleep")
+        time.sleep(self.seconds.value)
+
+
+class RootCommand(BaseCommand):
+    sleep = SleepCommand()
+
+    def __init__(self):
+        super().__init__(name="root")
+
+    def run(self):
+        pass
+
+
+def quiet_runner() -> Runner:
+    handler = BaseExceptionHandler()
+    handler.handle_exception = lambda e: None
+    return Runner(RootCommand(), exception_handler=handler)
+
+
+class TestRunParallel(unittest.TestCase):
+
+    def test_thread_ordered_pass(self):
+        lines = [f"sleep {0.02 * (i % 3)}" for i in range(20)]
+
+        results = list(quiet_runner().run_parallel(lines, workers=4, chunk_size=3))
+
+        self.assertEqual([r.line for r in results], list(range(1, 21)))
+        self.assertEqual([r.exit_code for r in results], [0] * 20)
+
+    def test_thread_unordered_streams_pass(self):
+        lines = ["sleep 0.3", "sleep 0"]
+
+        results = list(quiet_runner().run_parallel(lines, workers=2, ordered=False))
+
+        # the fast line is given back first
+        self.assertEqual([r.line for r in results], [2, 1])
+
+    def test_thread_runs_concurrently_pass(self):
+        start = time.perf_counter()
+        list(quiet_runner().run_parallel(["sleep 0.1"] * 8, workers=8))
+
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_thread_errors_pass(self):
+        lines = ["sleep nope", ["sleep", "-1"], "sleep 'unclosed", "sleep 0"]
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = list(quiet_runner().run_parallel(lines, workers=2))
+
+        self.assertEqual([r.exit_code for r in results], [1, 1, 2, 0])
+        self.assertEqual(results[0].error_type, "InvalidValueException")
+        self.assertEqual(results[1].error_type, "RuntimeError")
+
+    def test_tree_left_untouched_pass(self):
+        runner = quiet_runner()
+
+        list(runner.run_parallel(["sleep 0"], workers=1))
+
+        self.assertIsNone(runner.command.sleep.seconds._value)
+
+    def test_unknown_mode_fail(self):
+        with self.assertRaises(ValueError):
+            list(quiet_runner().run_parallel(["sleep 0"], mode="fiber"))
+
+    @unittest.skipUnless(
+        "fork" in multiprocessing.get_all_start_methods(), "needs fork"
+    )
+    def test_process_pass(self):
+        lines = ["sleep 0", "sleep nope", ["sleep", "-1"], "sleep 0.01"]
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = list(
+                quiet_runner().run_parallel(lines, workers=2, mode="process")
+            )
+
+        self.assertEqual([r.exit_code for r in results], [0, 1, 1, 0])
+        self.assertEqual(results[1].error_type, "InvalidValueException")
+        self.assertEqual(results[2].error_type, "RuntimeError")
+        self.assertEqual(str(results[2].error), "negative sleep")
@@ -1,7 +1,15 @@
+import io
+import time
+import asyncio
+import os
+import json
+import tempfile
 import unittest
+import contextlib
 
-from runrun.models import BaseCommand
+from runrun.models import BaseCommand, Argument
 from runrun.runner import Runner
+from runrun.exceptions import BaseExceptionHandler
 
 
 class TestRunner(unittest.TestCase):
@@ -34,3 +42,204 @@ class TestRunner(unittest.TestCase):
         Runner(cmd).run([])
 
         self.assertTrue(cmd.called)
+
+    def test_runner_returns_exit_code(self):
+        class TCommand(BaseCommand):
+            def __init__(self):
+                super().__init__(name="a")
+
+            def run(self):
+                pass
+
+        handler = BaseExceptionHandler()
+        handler.handle_exception = lambda e: None
+
+        self.assertEqual(Runner(TCommand(), exception_handler=handler).run([]), 0)
+        self.assertEqual(
+            Runner(TCommand(), exception_handler=handler).run(["--nope"]), 1
+        )
+
+
+class TestRunMany(unittest.TestCase):
+
+    def setUp(self):
+        class SubCommand(BaseCommand):
+            count = Argument(int, "count", default_value=1)
+            names = Argument(list[str], "names", required=False)
+            flag = Argument(bool, "flag", default_value=False)
+
+            def __init__(self):
+                super().__init__(name="sub")
+                self.calls = []
+                self.flags = []
+
+            def run(self):
+                names = self.names._value
+                self.calls.append((self.count.value, names))
+                self.flags.append(self.flag.value)
+                if self.count.value < 0:
+                    raise RuntimeError("negative count")
+
+        class RootCommand(BaseCommand):
+            sub = SubCommand()
+
+            def __init__(self):
+                super().__init__(name="root")
+
+            def run(self):
+                pass
+
+        self.root = RootCommand()
+        handler = BaseExceptionHandler()
+        handler.handle_exception = lambda e: None
+        self.runner = Runner(self.root, exception_handler=handler)
+
+    def test_arguments_reset_between_lines_pass(self):
+        results = self.runner.run_many(
+            [["sub", "--count", "5", "--names", "a,b"], ["sub"], "sub --count 2"]
+        )
+
+        self.assertEqual([r.exit_code for r in results], [0, 0, 0])
+        self.assertEqual(self.root.sub.calls, [(5, ["a", "b"]), (1, None), (2, None)])
+
+    def test_failing_line_does_not_stop_batch_pass(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = self.runner.run_many(
+                [
+                    "sub --count nope",
+                    "sub --unknown",
+                    "sub --count -1",
+                    "sub 'unclosed",
+                    "",
+                    "# comment",
+                    "sub --count 3",
+                ]
+            )
+
+        self.assertEqual([r.line for r in results], [1, 2, 3, 4, 7])
+        self.assertEqual([r.exit_code for r in results], [1, 1, 1, 2, 0])
+        self.assertEqual(results[0].to_dict()["error_type"], "InvalidValueException")
+        self.assertEqual(results[2].to_dict()["error"], "negative count")
+        self.assertEqual(self.root.sub.calls, [(-1, None), (3, None)])
+
+    def test_raising_line_is_reset_pass(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = self.runner.run_many(["sub --flag --count -1", "sub"])
+
+        self.assertEqual([r.exit_code for r in results], [1, 0])
+        self.assertEqual(self.root.sub.flags, [True, False])
+        self.assertEqual(self.root.sub.calls, [(-1, None), (1, None)])
+
+    def test_earlier_run_is_reset_pass(self):
+        self.runner.run(["sub", "--flag", "--count", "7"])
+        results = self.runner.run_many(["sub"])
+
+        self.assertEqual([r.exit_code for r in results], [0])
+        self.assertEqual(self.root.sub.flags, [True, False])
+        self.assertEqual(self.root.sub.calls, [(7, None), (1, None)])
+
+    def test_run_batch_file_pass(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+            file.write("sub --count 4\nsub --count x\n")
+
+        try:
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                code = self.runner.run(["--runrun-batch", file.name])
+        finally:
+            os.unlink(file.name)
+
+        summary = json.loads(stderr.getvalue())
+
+        self.assertEqual(code, 1)
+        self.assertEqual(summary["total"], 2)
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(summary["results"][0]["args"], ["sub", "--count", "4"])
+        self.assertEqual(summary["results"][1]["exit_code"], 1)
+
+
+class TestEventLoop(unittest.TestCase):
+
+    def setUp(self):
+        class PingCommand(BaseCommand):
+            delay = Argument(float, "delay", default_value=0.0)
+            fail = Argument(bool, "fail", default_value=False)
+
+            loops = []
+            running = 0
+            most_running = 0
+
+            def __init__(self):
+                super().__init__(name="ping")
+
+            async def run(self):
+                PingCommand.loops.append(asyncio.get_running_loop())
+                PingCommand.running += 1
+                PingCommand.most_running = max(
+                    PingCommand.most_running, PingCommand.running
+                )
+                await asyncio.sleep(self.delay.value)
+                PingCommand.running -= 1
+                if self.fail.value:
+                    raise RuntimeError("unreachable")
+
+        class RootCommand(BaseCommand):
+            ping = PingCommand()
+
+            def __init__(self):
+                super().__init__(name="root")
+
+            def run(self):
+                pass
+
+        self.ping_class = PingCommand
+        self.root = RootCommand()
+
+    def test_keep_loop_pass(self):
+        with Runner(self.root, keep_loop=True) as runner:
+            runner.run(["ping"])
+            runner.run(["ping"])
+            loop = runner.get_loop()
+
+        first, second = self.ping_class.loops
+        self.assertIs(first, second)
+        self.assertTrue(loop.is_closed())
+
+    def test_new_loop_per_run_pass(self):
+        runner = Runner(self.root)
+        runner.run(["ping"])
+        runner.run(["ping"])
+
+        first, second = self.ping_class.loops
+        self.assertIsNot(first, second)
+
+    def test_run_concurrent_pass(self):
+        lines = [["ping", "--delay", "0.1"] for _ in range(20)]
+
+        start = time.perf_counter()
+        results = Runner(self.root).run_concurrent(lines, limit=20)
+
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual([r.exit_code for r in results], [0] * 20)
+        self.assertEqual(self.ping_class.most_running, 20)
+
+    def test_run_concurrent_limit_pass(self):
+        lines = ["ping --delay 0.01"] * 10
+
+        with Runner(self.root, keep_loop=True) as runner:
+            runner.run_concurrent(lines, limit=3)
+
+        self.assertEqual(self.ping_class.most_running, 3)
+
+    def test_run_concurrent_errors_pass(self):
+        handler = BaseExceptionHandler()
+        handler.handle_exception = lambda e: None
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = Runner(self.root, exception_handler=handler).run_concurrent(
+                ["ping --fail", "ping --delay nope", "ping"]
+            )
+
+        self.assertEqual([r.exit_code for r in results], [1, 1, 0])
+        self.assertEqual(results[0].error_type, "RuntimeError")
+        self.assertEqual(results[1].error_type, "InvalidValueException")
@@ -0,0 +1,192 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+from enum import Enum
+from pathlib import Path
+
+from runrun import Command, Application
+from runrun.models import Argument
+from runrun.runner import Runner
+from runrun.schema_cache import SchemaCache, CachedCommand, cache_key, describe_tree
+
+
+class Env(Enum):
+    PROD = 0
+    STAGING = 1
+
+
+class DeployCommand(Command):
+    env = Argument(Env, "env", short="e", default_value=Env.STAGING)
+    file = Argument(Path, "file", required=False)
+    count = Argument(int, "count", position=0, description="How many")
+
+    def __init__(self):
+        super().__init__(name="deploy", aliases=["dep"], description="Deploy it")
+
+    def run(self):
+        print("deployed")
+
+
+class App(Application):
+    deploy = DeployCommand()
+
+    def __init__(self):
+        super().__init__(name="app", version="1.2.3", author="someone")
+
+
+def run_output(function, *args) -> tuple[object, str]:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = function(*args)
+    return result, output.getvalue()
+
+
+class TestSchemaCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, "app.py")
+        with open(self.source, "w") as file:
+            file.write("# version 1\n")
+
+        self.path = os.path.join(self.directory.name, "app.cache")
+        self.cache = SchemaCache(self.path, version="1.2.3", sources=[self.source])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_describe_tree_pass(self):
+        tree = describe_tree(App())
+
+        deploy = tree["sub_commands"][0]
+        self.assertEqual(deploy["name"], "deploy")
+        self.assertEqual(deploy["aliases"], ["dep"])
+
+        arguments = {arg["name"]: arg for arg in deploy["arguments"]}
+        env = arguments["env"]
+        self.assertEqual(env["type"], "Env")
+        self.assertEqual(env["choices"], ["PROD", "STAGING"])
+        self.assertEqual(env["default"], "STAGING")
+        self.assertTrue(arguments["file"]["path"])
+        self.assertEqual(arguments["count"]["position"], 0)
+        self.assertEqual(tree["application"]["version"], "1.2.3")
+
+    def test_key_changes_with_sources_pass(self):
+        key = cache_key("1.2.3", [self.directory.name])
+
+        self.assertEqual(key, cache_key("1.2.3", [self.directory.name]))
+        self.assertNotEqual(key, cache_key("1.2.4", [self.directory.name]))
+
+        with open(self.source, "w") as file:
+            file.write("# version 2\n")
+
+        self.assertNotEqual(key, cache_key("1.2.3", [self.directory.name]))
+
+    def test_save_and_load_pass(self):
+        self.cache.save(App())
+
+        root = self.cache.load()
+
+        self.assertIsInstance(root, CachedCommand)
+        self.assertEqual(root.application_version, "1.2.3")
+        deploy = root.get_sub_command(root.get_sub_command_index().get("dep"))
+        self.assertEqual(deploy.command_description, "Deploy it")
+        env = [arg for arg in deploy.get_arguments() if arg.name == "env"][0]
+        self.assertEqual(list(env.type.__members__), ["PROD", "STAGING"])
+        self.assertIs(deploy.context.root_command, root)
+
+    def test_stale_cache_fail(self):
+        self.cache.save(App())
+
+        with open(self.source, "w") as file:
+            file.write("# version 2\n")
+
+        stale = SchemaCache(self.path, version="1.2.3", sources=[self.source])
+
+        self.assertFalse(stale.is_fresh())
+        self.assertIsNone(stale.load())
+        self.assertIsNone(stale.serve(["help"]))
+
+    def test_broken_file_fail(self):
+        with open(self.path, "w") as file:
+            file.write("{nope")
+
+        self.assertIsNone(self.cache.load())
+
+    def test_runner_saves_stale_cache_pass(self):
+        runner = Runner(App(), schema_cache=self.cache)
+
+        self.assertFalse(self.cache.is_fresh())
+        run_output(runner.run, ["help"])
+        self.assertTrue(self.cache.is_fresh())
+
+    def test_runner_other_commands_skip_cache_pass(self):
+        runner = Runner(App(), schema_cache=self.cache)
+
+        with mock.patch.object(SchemaCache, "read") as read:
+            with mock.patch.object(SchemaCache, "is_fresh") as is_fresh:
+                run_output(runner.run, ["deploy", "1"])
+
+        read.assert_not_called()
+        is_fresh.assert_not_called()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_update_fresh_cache_not_parsed_pass(self):
+        self.cache.save(App())
+
+        # only the key on the first line is compared
+        with mock.patch("json.load") as load:
+            self.assertFalse(self.cache.update(App()))
+        load.assert_not_called()
+
+        stale = SchemaCache(self.path, version="1.2.4", sources=[self.source])
+        self.assertFalse(stale.is_fresh())
+        self.assertTrue(stale.update(App()))
+        self.assertTrue(stale.is_fresh())
+        self.assertIsNotNone(stale.load())
+
+    def test_serve_completion_pass(self):
+        self.cache.save(App())
+
+        code, output = run_output(self.cache.serve, ["__complete", "2", "dep", "-e"])
+
+        self.assertEqual(code, 0)
+        self.assertEqual(output.split(), ["prod", "staging"])
+
+        _, output = run_output(self.cache.serve, ["__complete", "0", "d"])
+
+        self.assertEqual(output.split(), ["dep", "deploy"])
+
+    def test_serve_help_pass(self):
+        self.cache.save(App())
+
+        _, expected = run_output(Runner(App()).run, ["deploy", "help"])
+        code, output = run_output(self.cache.serve, ["deploy", "help"])
+
+        self.assertEqual(code, 0)
+        self.assertEqual(output, expected)
+
+    def test_serve_help_json_pass(self):
+        self.cache.save(App())
+
+        _, expected = run_output(Runner(App()).run, ["help", "-f", "json"])
+        code, output = run_output(self.cache.serve, ["help", "-f", "json"])
+
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output), json.loads(expected))
+
+    def test_serve_other_commands_fail(self):
+        self.cache.save(App())
+
+        # not even read
+        with mock.patch.object(SchemaCache, "load") as load:
+            self.assertIsNone(self.cache.serve(["deploy", "1"]))
+        load.assert_not_called()
+
+        self.assertIsNone(self.cache.serve(["deploy", "1"]))
+        self.assertIsNone(self.cache.serve([]))
+        self.assertIsNone(self.cache.serve(["help", "--nope"]))
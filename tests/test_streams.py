@@ -0,0 +1,147 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from runrun import Command, Stream
+from runrun.models import Argument
+from runrun.runner import Runner
+from runrun.command_parser import CommandParser
+from runrun.exceptions import (
+    BaseExceptionHandler,
+    StreamException,
+    InvalidStreamValueException,
+)
+
+
+class SumCommand(Command):
+    numbers = Argument(Stream[int], "numbers", position=0)
+    label = Argument(str, "label", required=False)
+
+    def __init__(self):
+        super().__init__(name="sum")
+
+    def run(self):
+        self.total = sum(self.numbers.value)
+
+
+class RootCommand(Command):
+    sum = SumCommand()
+
+    def __init__(self):
+        super().__init__(name="root")
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_file_pass(self):
+        path = self.write("numbers.txt", "1\n2\n\n3\n")
+
+        command = CommandParser(RootCommand()).parse(["sum", f"@{path}"])
+
+        # nothing is read before iterating
+        self.assertIsInstance(command.numbers.value, Stream)
+        self.assertEqual(command.numbers.value.line, 0)
+
+        command.run()
+        self.assertEqual(command.total, 6)
+
+    def test_lazy_pass(self):
+        path = self.write("numbers.txt", "".join(f"{i}\n" for i in range(100_000)))
+
+        command = CommandParser(RootCommand()).parse(["sum", f"@{path}"])
+        stream = command.numbers.value
+
+        self.assertEqual(next(stream), 0)
+        self.assertEqual(next(stream), 1)
+        self.assertEqual(stream.line, 2)
+        stream.close()
+
+    def test_stdin_pass(self):
+        with mock.patch("sys.stdin", io.StringIO("4\n5\n")):
+            command = CommandParser(RootCommand()).parse(["sum", "-"])
+            command.run()
+
+        self.assertEqual(command.total, 9)
+
+    def test_plain_value_pass(self):
+        command = CommandParser(RootCommand()).parse(["sum", "1,2,3"])
+        command.run()
+
+        self.assertEqual(command.total, 6)
+
+    def test_not_expanded_as_response_file_pass(self):
+        path = self.write("numbers.txt", "1\n2\n")
+        arguments = self.write("arguments.txt", "--label\ntotal\n")
+
+        result = CommandParser(RootCommand(), response_files=True).parse_result(
+            ["sum", "--label", "x", f"@{path}", f"@{arguments}"]
+        )
+
+        # the stream reads its file, the response file is expanded
+        self.assertEqual(result.values["numbers"].source, f"@{path}")
+        self.assertEqual(result.values["label"], "total")
+
+    def test_abbreviated_command_not_expanded_pass(self):
+        path = self.write("numbers.txt", "1\n2\n")
+
+        result = CommandParser(
+            RootCommand(), allow_abbreviations=True, response_files=True
+        ).parse_result(["su", f"@{path}"])
+
+        self.assertEqual(result.values["numbers"].source, f"@{path}")
+
+    def test_response_file_content_expanded_pass(self):
+        numbers = self.write("numbers.txt", "--label\nnumbers\n")
+        arguments = self.write("arguments.txt", f"sum\n@{numbers}\n1,2\n")
+
+        result = CommandParser(RootCommand(), response_files=True).parse_result(
+            [f"@{arguments}"]
+        )
+
+        # only the '@' of the command line can be streams
+        self.assertEqual(result.values["label"], "numbers")
+        self.assertEqual(result.values["numbers"].source, "1,2")
+
+    def test_invalid_value_line_fail(self):
+        path = self.write("numbers.txt", "1\n2\nthree\n4\n")
+
+        command = CommandParser(RootCommand()).parse(["sum", f"@{path}"])
+
+        with self.assertRaises(InvalidStreamValueException) as context:
+            command.run()
+
+        self.assertEqual(context.exception.line, 3)
+        self.assertEqual(context.exception.given_value, "three")
+
+    def test_missing_file_fail(self):
+        command = CommandParser(RootCommand()).parse(["sum", "@/does/not/exist"])
+
+        with self.assertRaises(StreamException):
+            command.run()
+
+    def test_runner_exit_code_fail(self):
+        path = self.write("numbers.txt", "nope\n")
+
+        handler = BaseExceptionHandler()
+        handler.handle_exception = mock.Mock()
+
+        exit_code = Runner(RootCommand(), exception_handler=handler).run(
+            ["sum", f"@{path}"]
+        )
+
+        self.assertEqual(exit_code, 1)
+        self.assertIsInstance(
+            handler.handle_exception.call_args[0][0], InvalidStreamValueException
+        )
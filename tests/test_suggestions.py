@@ -0,0 +1,202 @@
+import io
+import os
+import random
+import string
+import tempfile
+import unittest
+import contextlib
+
+import Levenshtein
+
+from runrun import Command, LazyCommand
+from runrun.models import Argument
+from runrun.runner import Runner
+from runrun.schema_cache import SchemaCache
+from runrun.suggestions import BKTree, SuggestionIndex, get_suggestion_index
+
+
+class MigrateCommand(Command):
+    dry_run = Argument(bool, "dry-run", aliases=["simulate"], short="n")
+    target = Argument(str, "target")
+
+    def __init__(self):
+        super().__init__(name="migrate", aliases=["mig"])
+
+
+class DbCommand(Command):
+    migrate = MigrateCommand()
+
+    def __init__(self):
+        super().__init__(name="db")
+
+
+class AppCommand(Command):
+    db = DbCommand()
+    verbose = Argument(bool, "verbose", short="v")
+
+    def __init__(self):
+        super().__init__(name="app")
+
+
+class TestBKTree(unittest.TestCase):
+
+    def test_search_pass(self):
+        tree = BKTree()
+        for word in ["chrono", "cmd1", "cmd2", "argument", "chrome"]:
+            tree.add(word, word)
+
+        self.assertEqual(
+            sorted(tree.search("chrone", 2)), [(1, ["chrome"]), (1, ["chrono"])]
+        )
+        self.assertEqual(tree.search("nothing", 2), [])
+
+    def test_same_as_linear_search_pass(self):
+        words = [
+            "".join(random.choices(string.ascii_lowercase[:6], k=random.randint(2, 8)))
+            for _ in range(500)
+        ]
+
+        tree = BKTree()
+        for word in words:
+            tree.add(word, word)
+
+        for query in words[:50]:
+            expected = sorted(
+                (Levenshtein.distance(query, w), w)
+                for w in words
+                if Levenshtein.distance(query, w) <= 2
+            )
+            found = sorted(
+                (d, w) for d, values in tree.search(query, 2) for w in values
+            )
+            self.assertEqual(found, expected)
+
+
+class TestSuggestionIndex(unittest.TestCase):
+
+    def test_paths_pass(self):
+        index = SuggestionIndex(AppCommand())
+
+        self.assertEqual(
+            [s.text for s in index.search_arguments("--dry-rn")],
+            ["app db migrate --dry-run"],
+        )
+        self.assertEqual(
+            [s.text for s in index.search_commands("migrat")], ["app db migrate"]
+        )
+
+    def test_aliases_and_shorts_pass(self):
+        index = SuggestionIndex(AppCommand())
+
+        self.assertEqual(
+            [s.target.name for s in index.search_arguments("--simulat")], ["dry-run"]
+        )
+        self.assertEqual(
+            [s.target.name for s in index.search_arguments("-N")], ["dry-run"]
+        )
+        self.assertEqual(
+            [s.target.command_name for s in index.search_commands("MIG")], ["migrate"]
+        )
+
+    def test_help_not_walked_pass(self):
+        index = SuggestionIndex(AppCommand())
+
+        self.assertEqual(list(index.search_arguments("--format")), [])
+        self.assertEqual(len(list(index.search_commands("help"))), 3)
+
+
+class LeafCommand(Command):
+    dry_run = Argument(bool, "dry-run")
+
+    def __init__(self):
+        super().__init__(name="leaf")
+
+
+class OtherCommand(Command):
+    quiet = Argument(bool, "quiet", required=False)
+
+    def __init__(self):
+        super().__init__(name="other")
+
+
+class LazyAppCommand(Command):
+    leaf = LazyCommand(LeafCommand, name="leaf")
+    other = LazyCommand(lambda: OtherCommand(), name="other")
+    verbose = Argument(bool, "verbose", required=False)
+
+    def __init__(self):
+        super().__init__(name="app")
+
+
+class TestLazySuggestions(unittest.TestCase):
+
+    def handle(self, runner: Runner, args: list[str]) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            runner.run(args)
+        return output.getvalue()
+
+    def test_level_suggestions_stay_lazy_pass(self):
+        app = LazyAppCommand()
+
+        output = self.handle(Runner(app), ["--verbos"])
+        self.assertIn("--verbose", output)
+        self.assertNotIn("leaf", vars(app))
+
+        output = self.handle(Runner(app), ["lef"])
+
+        # only the matching command is instantiated
+        self.assertIn("leaf", output)
+        self.assertIn("leaf", vars(app))
+        self.assertNotIn("other", vars(app))
+
+    def test_tree_suggestions_stay_lazy_pass(self):
+        app = LazyAppCommand()
+
+        output = self.handle(Runner(app), ["--dry-rn"])
+
+        # read from the class of the leaf, without instantiating it
+        self.assertIn("app leaf --dry-run", output)
+        self.assertEqual(
+            [s.text for s in SuggestionIndex(app).search_commands("lef")], ["app leaf"]
+        )
+        self.assertNotIn("leaf", vars(app))
+
+        # made by a lambda, only its name is known
+        self.assertNotIn("app other --quiet", self.handle(Runner(app), ["--quiett"]))
+        self.assertNotIn("other", vars(app))
+
+    def test_tree_index_rebuilt_after_lazy_created_pass(self):
+        app = LazyAppCommand()
+
+        self.assertEqual(
+            list(get_suggestion_index(app).search_arguments("--quiett")), []
+        )
+
+        app.other
+
+        self.assertEqual(
+            [s.text for s in get_suggestion_index(app).search_arguments("--quiett")],
+            ["app other --quiet"],
+        )
+
+    def test_tree_suggestions_isolated_pass(self):
+        runner = Runner(AppCommand())
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            runner.run_isolated(["db", "migrate", "--verbos"])
+
+        # declared above the command that failed
+        self.assertIn("app --verbose", output.getvalue())
+
+    def test_tree_suggestions_from_schema_cache_pass(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SchemaCache(os.path.join(directory, "app.cache"))
+            cache.save(LazyAppCommand())
+
+            app = LazyAppCommand()
+            output = self.handle(Runner(app, schema_cache=cache), ["--dry-rn"])
+
+        self.assertIn("app leaf --dry-run", output)
+        self.assertNotIn("leaf", vars(app))